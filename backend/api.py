@@ -1,32 +1,113 @@
-from flask import Flask, request, jsonify
+import time
+_import_start = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from PIL import Image
-from inference import img_to_smiles
-from ic50_model import predict_ic50
+from inference import img_to_smiles_with_timings
+from ic50_model import predict_ic50, predict_ic50_mol, predict_ic50_batch, nearest_known_compounds
+from live_sketch import LiveSketchHub, Superseded
+from model_registry import registry
+from leaderboard_store import LeaderboardStore, migrate_json
+from serving_limits import Overloaded, cpu_executor, image_executor, ROUTE_TIMEOUTS
+from concurrent.futures import TimeoutError
+from metrics import metrics, ic50_stage_seconds
 from rdkit import Chem
 import os
 import json
 
+registry.record_stage('imports', time.perf_counter() - _import_start)
+
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+# 서버는 바로 뜨고, 모델은 백그라운드에서 미리 불러온다 (MODEL_WARMUP=0 이면 첫 요청 때 로드)
+if os.environ.get('MODEL_WARMUP', '1') != '0':
+    registry.warm()
+
+request_seconds = metrics.histogram('http_request_duration_seconds', 'HTTP request latency.', ['route'])
+requests_total = metrics.counter('http_requests_total', 'HTTP requests by route and status.', ['route', 'status'])
+requests_in_flight = metrics.gauge('http_requests_in_flight', 'HTTP requests being handled.', ['route'])
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.in_flight_route = _route_label()
+    requests_in_flight.inc(route=g.in_flight_route)
+
+@app.after_request
+def record_request_metrics(response):
+    route = _route_label()
+    request_seconds.observe(time.perf_counter() - g.request_start, route=route)
+    requests_total.inc(route=route, status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # 스트리밍 응답은 teardown이 두 번 불릴 수 있어서 한 번만 줄인다
+    route = g.pop('in_flight_route', None)
+    if route is not None:
+        requests_in_flight.dec(route=route)
+
 @app.route("/image-to-smiles", methods=["POST"])
 def convert_image():
     if 'image' not in request.files:
         return jsonify({'error': '이미지가 없습니다!'}), 400
 
-    image = Image.open(request.files['image'].stream)
-    smiles = img_to_smiles(image)
+    # PIL로 다시 열지 않고 업로드된 바이트를 그대로 전처리 단계에 넘긴다
+    data = request.files['image'].read()
+    try:
+        smiles, timings = image_executor.run(img_to_smiles_with_timings, data,
+                                             timeout=ROUTE_TIMEOUTS['image-to-smiles'])
+    except (Overloaded, TimeoutError):
+        raise
+    except Exception as e:
+        print(f"예측 중 오류 발생: {e}")
+        smiles, timings = "", {}
 
     if not smiles:
         return jsonify({'error': 'SMILES 변환 실패'}), 500
 
+    print(f"[image-to-smiles timings ms] {timings}")
     try:
-        ic50 = predict_ic50(smiles)
-        return jsonify({'smiles': smiles, 'ic50': ic50})
+        ic50 = cpu_executor.run(predict_ic50, smiles, timeout=ROUTE_TIMEOUTS['mol-to-smiles'])
+        return jsonify({'smiles': smiles, 'ic50': ic50, 'timings': timings})
+    except (Overloaded, TimeoutError):
+        raise
     except Exception as e:
         print(f"[ic50 예측 실패] {e}")
-        return jsonify({'smiles': smiles, 'ic50': '예측 실패'}), 200
+        return jsonify({'smiles': smiles, 'ic50': '예측 실패', 'timings': timings}), 200
+
+def mol_block_to_mol(mol_block):
+    with ic50_stage_seconds.time(stage='molblock_sanitize'):
+        mol = Chem.MolFromMolBlock(mol_block, sanitize=False)
+        if mol is None:
+            raise ValueError("Invalid MolBlock")
+        Chem.SanitizeMol(mol)
+        return mol
+
+def mol_block_to_smiles(mol_block):
+    mol = mol_block_to_mol(mol_block)
+    with ic50_stage_seconds.time(stage='molblock_to_smiles'):
+        return Chem.MolToSmiles(mol)
+
+def _predict_mol(mol, check=lambda stage: None):
+    # SMILES로 다시 파싱하지 않고 정리된 Mol을 그대로 특징화한다.
+    # SMILES 파싱과 같은 분자가 되도록 명시적 수소만 제거한다.
+    with ic50_stage_seconds.time(stage='molblock_to_smiles'):
+        smiles = Chem.MolToSmiles(mol)
+    heavy = Chem.RemoveHs(mol)
+    canonical = smiles if heavy.GetNumAtoms() == mol.GetNumAtoms() else None
+    check('predict')
+    ic50 = predict_ic50_mol(heavy, canonical)
+    check('nearest')
+    nearest = nearest_known_compounds(heavy, k=1)
+    return smiles, ic50, (nearest[0] if nearest else None)
+
+def _predict_mol_block(mol_block):
+    return _predict_mol(mol_block_to_mol(mol_block))
 
 @app.route("/mol-to-smiles", methods=["POST"])
 def mol_to_smiles():
@@ -37,26 +118,115 @@ def mol_to_smiles():
         return jsonify({"error": "Mol 데이터 없음"}), 400
 
     try:
-        mol = Chem.MolFromMolBlock(mol_block, sanitize=False)
-        Chem.SanitizeMol(mol)
-        smiles = Chem.MolToSmiles(mol)
-
-        ic50 = predict_ic50(smiles)
-        return jsonify({"smiles": smiles, "ic50": ic50})
+        smiles, ic50, nearest = cpu_executor.run(_predict_mol_block, mol_block,
+                                                 timeout=ROUTE_TIMEOUTS['mol-to-smiles'])
+        return jsonify({"smiles": smiles, "ic50": ic50, "nearest": nearest})
+    except (Overloaded, TimeoutError):
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-LEADERBOARD_FILE = "leaderboard.json"
+def _live_sketch_compute(mol_block, check):
+    mol = mol_block_to_mol(mol_block)
+    smiles, ic50, nearest = _predict_mol(mol, check)
+    return {"smiles": smiles, "ic50": ic50, "nearest": nearest}
 
-def load_leaderboard():
-    if not os.path.exists(LEADERBOARD_FILE):
-        return []
-    with open(LEADERBOARD_FILE, "r") as f:
-        return json.load(f)
+# 스케치 편집마다 요청을 새로 보내는 대신, 세션별 SSE 스트림으로 최신 편집의 결과만 받는다
+live_sketch = LiveSketchHub(_live_sketch_compute, cpu_executor)
 
-def save_leaderboard(data):
-    with open(LEADERBOARD_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+@app.route("/sketch/<session_id>", methods=["POST"])
+def sketch_update(session_id):
+    mol_block = (request.get_json(silent=True) or {}).get("mol")
+    if not mol_block:
+        return jsonify({"error": "Mol 데이터 없음"}), 400
+
+    if live_sketch.has_listener(session_id):
+        # 결과는 /sketch/<session_id>/events 스트림으로 전달된다
+        return jsonify({"version": live_sketch.submit(session_id, mol_block), "queued": True}), 202
+
+    # 이 프로세스에 열린 스트림이 없으면(serve.py의 다른 워커에 연결된 경우 등) 바로 계산해서 응답한다
+    try:
+        return jsonify(cpu_executor.run(live_sketch.compute_now, session_id, mol_block,
+                                        timeout=ROUTE_TIMEOUTS['mol-to-smiles']))
+    except Superseded:
+        return jsonify({"superseded": True}), 409
+    except (Overloaded, TimeoutError):
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/sketch/<session_id>/events", methods=["GET"])
+def sketch_events(session_id):
+    return Response(live_sketch.events(session_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+BATCH_CHUNK_SIZE = 256
+MAX_BATCH_ITEMS = 10000
+
+def _batch_chunk_results(items, is_mol_block, start):
+    # MolBlock은 먼저 SMILES로 바꾸고, 실패한 항목은 개별 에러로 돌려준다
+    records = []
+    smiles_list = []
+    for offset, item in enumerate(items):
+        record = {"index": start + offset}
+        if not is_mol_block:
+            record["input"] = item
+        try:
+            if not isinstance(item, str) or not item:
+                raise ValueError("Empty or non-string input")
+            record["smiles"] = mol_block_to_smiles(item) if is_mol_block else item
+        except Exception as e:
+            record["error"] = str(e)
+        records.append(record)
+        smiles_list.append(record.get("smiles"))
+
+    predictions = predict_ic50_batch(smiles_list)
+    for record, ic50 in zip(records, predictions):
+        if "error" in record:
+            continue
+        if ic50 is None:
+            record["error"] = "Invalid SMILES"
+        else:
+            record["ic50"] = ic50
+    return records
+
+@app.route("/predict-batch", methods=["POST"])
+def predict_batch():
+    data = request.get_json(silent=True) or {}
+    if "mols" in data:
+        items, is_mol_block = data["mols"], True
+    else:
+        items, is_mol_block = data.get("smiles"), False
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty 'smiles' or 'mols' list"}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"Too many items (max {MAX_BATCH_ITEMS})"}), 413
+
+    def generate():
+        # chunk 단위로 예측하고, 끝나는 대로 NDJSON 한 줄씩 흘려보낸다
+        for start in range(0, len(items), BATCH_CHUNK_SIZE):
+            chunk = items[start:start + BATCH_CHUNK_SIZE]
+            try:
+                records = cpu_executor.run(_batch_chunk_results, chunk, is_mol_block, start,
+                                           timeout=ROUTE_TIMEOUTS['predict-batch-chunk'])
+            except (Overloaded, TimeoutError):
+                records = [{"index": start + i, "error": "Server busy"} for i in range(len(chunk))]
+            except Exception as e:
+                print(f"[batch 예측 실패] {e}")
+                records = [{"index": start + i, "error": "Prediction failed"}
+                           for i in range(len(chunk))]
+            yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+LEADERBOARD_FILE = "leaderboard.json"
+LEADERBOARD_LOG = "leaderboard.jsonl"
+SUBMIT_RESPONSE_TOP = 100
+
+# 예전 leaderboard.json 이 있으면 처음 한 번 append-only 로그로 옮긴다
+migrate_json(LEADERBOARD_FILE, LEADERBOARD_LOG)
+leaderboard = LeaderboardStore(LEADERBOARD_LOG)
 
 @app.route("/submit-score", methods=["POST"])
 def submit_score():
@@ -67,20 +237,51 @@ def submit_score():
 
     if not nickname or not smiles or ic50 is None:
         return jsonify({"error": "Missing required fields"}), 400
+    try:
+        ic50 = float(ic50)
+    except (TypeError, ValueError):
+        return jsonify({"error": "ic50 must be a number"}), 400
 
-    leaderboard = load_leaderboard()
-    leaderboard.append({
+    rank = leaderboard.add({
         "nickname": nickname,
         "smiles": smiles,
         "ic50": ic50
     })
-    save_leaderboard(leaderboard)
-    return jsonify({"message": "Success", "leaderboard": leaderboard})
+    return jsonify({"message": "Success", "rank": rank,
+                    "leaderboard": leaderboard.top(SUBMIT_RESPONSE_TOP)})
 
 @app.route("/leaderboard", methods=["GET"])
 def get_leaderboard():
-    leaderboard = load_leaderboard()
-    return jsonify({"leaderboard": leaderboard})
+    # ?top=N&offset=M 이면 해당 구간만, 없으면 전체를 순위순으로 돌려준다
+    top = request.args.get("top", type=int)
+    offset = request.args.get("offset", default=0, type=int)
+    if (top is not None and top < 0) or offset < 0:
+        return jsonify({"error": "top and offset must be non-negative"}), 400
+    return jsonify({"leaderboard": leaderboard.top(top, offset), "total": len(leaderboard)})
+
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    # 대기열이 꽉 차면 기다리게 하지 않고 바로 503을 돌려준다
+    response = jsonify({"error": "Server busy, try again later"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
+
+@app.errorhandler(TimeoutError)
+def handle_timeout(e):
+    return jsonify({"error": "Request timed out"}), 504
+
+@app.route("/health", methods=["GET"])
+def health():
+    status = registry.status()
+    status['executors'] = {'cpu': cpu_executor.stats(), 'image': image_executor.stats()}
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/", methods=["GET"])
@@ -90,8 +291,13 @@ def home():
         "endpoints": [
             "/image-to-smiles (POST)",
             "/mol-to-smiles (POST)",
+            "/predict-batch (POST)",
+            "/sketch/<session_id> (POST)",
+            "/sketch/<session_id>/events (GET, text/event-stream)",
             "/submit-score (POST)",
-            "/leaderboard (GET)"
+            "/leaderboard (GET)",
+            "/health (GET)",
+            "/metrics (GET)"
         ]
     })
 
@@ -1,4 +1,5 @@
 import streamlit as st
+from smiles_prediction import preload
 
 st.title("Predict SMILES encodings of chemical structure depictions in images")
 
@@ -38,4 +39,7 @@ We welcome suggestions and contributions to this web application. If you found a
 a suggestion, please create an issue in the app's GitHub repository. Those who wish are also welcome to submit 
 pull requests.
 '''
-st.markdown(app_info)
\ No newline at end of file
+st.markdown(app_info)
+
+# 첫 화면을 그린 뒤 모델을 미리 올려 두어, 페이지에서 첫 예측을 기다리지 않게 한다
+preload()
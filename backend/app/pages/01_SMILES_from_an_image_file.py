@@ -1,6 +1,6 @@
 import streamlit as st
 from streamlit_ketcher import st_ketcher
-from DECIMER import predict_SMILES
+from smiles_prediction import predict_smiles
 from PIL import Image
 
 st.header("Predict SMILES encodings of chemical structure depictions in an image file")
@@ -33,7 +33,7 @@ if uploaded_file is not None:
     container.image(image, caption="Uploaded image")
 
     # Run SMILES prediction
-    SMILES = predict_SMILES(uploaded_file)
+    SMILES = predict_smiles(uploaded_file)
     
     # Display the prediction
     st.subheader("Step 2. See the prediction", divider="gray")
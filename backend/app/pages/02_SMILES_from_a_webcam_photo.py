@@ -1,6 +1,6 @@
 import streamlit as st
 from streamlit_ketcher import st_ketcher
-from DECIMER import predict_SMILES
+from smiles_prediction import predict_smiles
 from PIL import Image
 
 st.header("Predict SMILES encodings of chemical structure depictions in a webcam photo")
@@ -25,7 +25,7 @@ if webcam_photo is not None:
     container.image(image, caption="Uploaded image")
 
     # Run SMILES prediction
-    SMILES = predict_SMILES(webcam_photo)
+    SMILES = predict_smiles(webcam_photo)
     
     # Display the prediction
     st.subheader("Step 2. See the prediction", divider="gray")
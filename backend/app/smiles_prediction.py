@@ -0,0 +1,48 @@
+# smiles_prediction.py
+# 두 페이지가 함께 쓰는 SMILES 예측 헬퍼.
+# Streamlit은 위젯을 조작할 때마다(예: Ketcher 편집) 페이지 스크립트 전체를 다시 실행하므로,
+# 모델은 프로세스당 한 번만 올리고(cache_resource) 같은 이미지의 결과는 내용 해시로 캐시한다(cache_data).
+import hashlib
+import io
+import os
+import streamlit as st
+
+# 설정하면 이 프로세스에 TF/DECIMER를 올리지 않고 백엔드(api.py)의 /image-to-smiles로 보낸다.
+# 백엔드는 모델을 프로세스마다 한 번만 올리고 디코딩을 한 번에 하나씩 처리한다. 예: SMILES_BACKEND_URL=http://localhost:5000
+SMILES_BACKEND_URL = os.environ.get('SMILES_BACKEND_URL', '').rstrip('/')
+SMILES_BACKEND_TIMEOUT = float(os.environ.get('SMILES_BACKEND_TIMEOUT', '120'))
+
+
+@st.cache_resource(show_spinner="Loading the DECIMER model...")
+def load_decimer():
+    """DECIMER's predict_SMILES, imported once per process and shared by all pages and sessions."""
+    from DECIMER import predict_SMILES
+    return predict_SMILES
+
+
+def preload():
+    """Load the model ahead of the first prediction (no-op when predictions go to the backend)."""
+    if not SMILES_BACKEND_URL:
+        load_decimer()
+
+
+def _predict_with_backend(data):
+    import requests
+    response = requests.post(f"{SMILES_BACKEND_URL}/image-to-smiles", files={'image': ('image', data)},
+                             timeout=SMILES_BACKEND_TIMEOUT)
+    response.raise_for_status()
+    return response.json()['smiles']
+
+
+# _data는 해시 대상에서 빠지고 image_hash만 캐시 키가 된다
+@st.cache_data(show_spinner="Predicting SMILES...", max_entries=256)
+def _predict_cached(image_hash, _data):
+    if SMILES_BACKEND_URL:
+        return _predict_with_backend(_data)
+    return load_decimer()(io.BytesIO(_data))
+
+
+def predict_smiles(uploaded_file):
+    """Predicted SMILES for an uploaded image; unchanged images are not decoded again."""
+    data = uploaded_file.getvalue()
+    return _predict_cached(hashlib.sha256(data).hexdigest(), data)
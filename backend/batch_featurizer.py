@@ -0,0 +1,135 @@
+# batch_featurizer.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from compact_features import CompactFeatures
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# 워커 프로세스마다 한 번만 만들어 두는 featurizer (모델/스케일러 없이 설정만 복사)
+_worker_predictor = None
+
+
+def _init_worker(config):
+    global _worker_predictor
+    from ic50_predictor_class import SMILEStoIC50Predictor
+    _worker_predictor = SMILEStoIC50Predictor(**config)
+
+
+def _allocate(predictor, n_rows, compact):
+    if compact:
+        n_descriptors = len(predictor.descriptor_names) if predictor.use_descriptors else 0
+        return CompactFeatures.empty(n_rows, predictor.fingerprint_nbits, n_descriptors)
+    return np.empty((n_rows, predictor.n_features))
+
+
+def _featurize_into(predictor, smiles_chunk, out, offset=0):
+    """
+    Featurize a chunk of SMILES, writing valid rows contiguously into `out`
+    starting at row `offset`. Returns the chunk-local indices of the valid molecules.
+    """
+    valid = []
+    for i, smiles in enumerate(smiles_chunk):
+        mol = predictor._smiles_to_mol(smiles)
+        if mol is not None and _write_row(predictor, mol, out, offset + len(valid)) is not None:
+            valid.append(i)
+    return valid
+
+
+def _write_row(predictor, mol, out, row):
+    if isinstance(out, CompactFeatures):
+        return predictor._mol_to_compact(mol, out.bits[row], out.descriptors[row])
+    return predictor._mol_to_features(mol, out=out[row])
+
+
+def featurize_mols(predictor, mols, compact=False):
+    """
+    Featurize already parsed (and sanitized) RDKit Mols serially, skipping None.
+    Returns (X, valid_indices) like featurize_smiles.
+    """
+    X = _allocate(predictor, len(mols), compact)
+    valid_indices = []
+    for i, mol in enumerate(mols):
+        if mol is not None and mol.GetNumAtoms() and _write_row(predictor, mol, X, len(valid_indices)) is not None:
+            valid_indices.append(i)
+    return X[:len(valid_indices)], valid_indices
+
+
+def _featurize_chunk_worker(smiles_chunk, compact):
+    block = _allocate(_worker_predictor, len(smiles_chunk), compact)
+    valid = _featurize_into(_worker_predictor, smiles_chunk, block)
+    return valid, block[:len(valid)]
+
+
+def _resolve_n_jobs(n_jobs):
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count + 1 + n_jobs)
+    return n_jobs
+
+
+def featurizer_pool(predictor, n_jobs=-1):
+    """
+    Process pool whose workers hold a copy of predictor's featurizer, to pass as
+    `pool` to several featurize_smiles calls instead of starting a pool per call.
+    None if n_jobs resolves to a single process. Close it with shutdown().
+    """
+    n_workers = _resolve_n_jobs(n_jobs)
+    if n_workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                               initargs=(predictor.featurizer_config(),))
+
+
+def _featurize_in_pool(executor, chunks, X, compact):
+    valid_indices = []
+    # map은 입력 순서를 유지하므로 chunk 결과를 차례대로 이어 붙이면 된다
+    results = executor.map(_featurize_chunk_worker, [chunk for _, chunk in chunks],
+                           [compact] * len(chunks))
+    for (start, _), (valid, block) in zip(chunks, results):
+        rows = slice(len(valid_indices), len(valid_indices) + len(valid))
+        if compact:
+            X.bits[rows] = block.bits
+            X.descriptors[rows] = block.descriptors
+        else:
+            X[rows] = block
+        valid_indices.extend(start + i for i in valid)
+    return valid_indices
+
+
+def featurize_smiles(predictor, smiles_list, n_jobs=-1, chunk_size=DEFAULT_CHUNK_SIZE, compact=False,
+                     pool=None):
+    """
+    Featurize SMILES strings into one preallocated feature matrix.
+
+    The input is split into chunks of `chunk_size`; with more than one chunk and
+    n_jobs != 1 the chunks are featurized across a process pool. Rows are written
+    in input order, so the result is identical to featurizing serially. A `pool`
+    from featurizer_pool(predictor) is used as is (n_jobs is then ignored).
+
+    Returns:
+        X (ndarray or CompactFeatures): Features of the n_valid molecules; a dense
+            (n_valid, predictor.n_features) matrix, or packed bits + descriptors if compact.
+        valid_indices (list): Indices into smiles_list of the rows in X.
+    """
+    smiles_list = list(smiles_list)
+    n = len(smiles_list)
+    X = _allocate(predictor, n, compact)
+    chunks = [(start, smiles_list[start:start + chunk_size]) for start in range(0, n, chunk_size)]
+    n_workers = min(_resolve_n_jobs(n_jobs), len(chunks))
+
+    valid_indices = []
+    if pool is not None and len(chunks) > 1:
+        valid_indices = _featurize_in_pool(pool, chunks, X, compact)
+    elif pool is not None or n_workers <= 1:
+        # 직렬 경로: 최종 행렬에 바로 기록
+        for start, chunk in chunks:
+            valid = _featurize_into(predictor, chunk, X, offset=len(valid_indices))
+            valid_indices.extend(start + i for i in valid)
+    else:
+        with featurizer_pool(predictor, n_workers) as executor:
+            valid_indices = _featurize_in_pool(executor, chunks, X, compact)
+
+    return X[:len(valid_indices)], valid_indices
@@ -0,0 +1,277 @@
+# benchmark.py
+# 성능 측정 스크립트. 결과는 JSON으로 저장하고, 기준 결과와 비교해 느려진 항목을 표시한다.
+# 사용법:
+#   python benchmark.py --output bench.json                       # 전체 측정
+#   python benchmark.py --only featurize predict --quick          # 일부만, 짧게
+#   python benchmark.py --output new.json --compare bench.json    # 기준과 비교 (느려지면 exit 1)
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BACKEND_DIR, 'sorted_f_avg_IC50.csv')
+EXAMPLE_IMAGE = os.path.join(BACKEND_DIR, 'app', 'test_predictions', 'example_structure.png')
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+
+def load_smiles():
+    import pandas as pd
+    data = pd.read_csv(DATA_PATH).dropna(subset=['f_avg_IC50'])
+    return data['SMILES'].tolist(), data['f_avg_IC50'].tolist()
+
+
+def latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)), 'mean_ms': float(ms.mean())}
+
+
+def repeat_smiles(smiles, n):
+    return [smiles[i % len(smiles)] for i in range(n)]
+
+
+def load_or_train_model(model_path, smiles, ic50):
+    import joblib
+    from ic50_predictor_class import SMILEStoIC50Predictor
+    from serving_artifact import is_artifact, load_artifact
+    if model_path and is_artifact(model_path):
+        return load_artifact(model_path)
+    if model_path and os.path.exists(model_path):
+        return joblib.load(model_path)
+    print("  (모델 파일이 없어 벤치마크용 모델을 학습합니다)")
+    model = SMILEStoIC50Predictor()
+    X, y, _ = model.prepare_data(smiles, ic50, compact=True)
+    model.train(X, y)
+    return model
+
+
+def bench_featurize(args, smiles, ic50):
+    from rdkit import Chem
+    from ic50_predictor_class import SMILEStoIC50Predictor
+    from batch_featurizer import featurize_smiles
+    predictor = SMILEStoIC50Predictor()
+    sample = smiles[:200 if args.quick else 2000]
+    mols = [m for m in (Chem.MolFromSmiles(s) for s in sample) if m is not None]
+
+    start = time.perf_counter()
+    for mol in mols:
+        predictor._mol_to_features(mol)
+    elapsed = time.perf_counter() - start
+    results = {'featurize.mol_to_features': {'mols_per_s': len(mols) / elapsed,
+                                             'per_mol_ms': elapsed / len(mols) * 1000}}
+    for n_jobs in (1, -1):
+        start = time.perf_counter()
+        featurize_smiles(predictor, sample, n_jobs=n_jobs, chunk_size=250, compact=True)
+        elapsed = time.perf_counter() - start
+        results[f'featurize.batch_n_jobs_{n_jobs}'] = {'smiles_per_s': len(sample) / elapsed,
+                                                       'total_s': elapsed}
+    return results
+
+
+def bench_predict(args, smiles, ic50):
+    model = load_or_train_model(args.model, smiles, ic50)
+    model.set_inference_backend(args.backend)
+    results = {}
+    for batch_size in BATCH_SIZES:
+        if args.quick and batch_size > 1000:
+            continue
+        batch = repeat_smiles(smiles, batch_size)
+        repeats = max(3, min(50, 2000 // batch_size)) if not args.quick else 3
+        model.predict(batch, n_jobs=1)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict(batch, n_jobs=1)
+            timings.append(time.perf_counter() - start)
+        summary = latency_summary(timings)
+        summary['mols_per_s'] = batch_size / (summary['p50_ms'] / 1000)
+        results[f'predict.batch_{batch_size}'] = summary
+    return results
+
+
+def bench_train(args, smiles, ic50):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(DATA_PATH, workdir)
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        # 첫 실행은 feature store가 비어 있고, 두 번째는 캐시된 특징을 사용한다
+        for label in ('cold', 'warm'):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(BACKEND_DIR, 'save_ic50_model.py')],
+                           cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            results[f'train.save_ic50_model_{label}'] = {'total_s': time.perf_counter() - start}
+            if args.quick:
+                break
+    return results
+
+
+def _http_load(url, make_request, n_requests, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(make_request(url), timeout=120) as response:
+                response.read()
+                ok = response.status == 200
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    summary = latency_summary([t for t, _ in outcomes])
+    summary['requests_per_s'] = n_requests / elapsed
+    summary['error_rate'] = sum(not ok for _, ok in outcomes) / n_requests
+    return summary
+
+
+def _multipart(field, filename, payload):
+    boundary = 'benchmarkboundary'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def bench_http(args, smiles, ic50):
+    from rdkit import Chem
+    workdir = tempfile.mkdtemp()
+    os.environ['IMAGE_MODEL'] = 'stub'
+    os.environ['MODEL_WARMUP'] = '0'
+    os.environ['IC50_INFERENCE_BACKEND'] = args.backend
+    if args.model:
+        os.environ['IC50_MODEL_PATH'] = os.path.abspath(args.model)
+    cwd = os.getcwd()
+    os.chdir(workdir)  # leaderboard 로그가 임시 폴더에 쓰이도록
+    try:
+        from werkzeug.serving import make_server
+        import api
+        from model_registry import registry
+        if not os.path.exists(os.environ.get('IC50_MODEL_PATH', '')):
+            model = load_or_train_model(None, smiles, ic50)
+            registry._models['ic50'] = model
+            registry._status['ic50'] = {'state': 'ready'}
+        registry.warm(background=False)
+
+        server = make_server('127.0.0.1', 0, api.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}'
+
+        mol_block = Chem.MolToMolBlock(Chem.MolFromSmiles(smiles[0]))
+        with open(EXAMPLE_IMAGE, 'rb') as f:
+            image_body, image_type = _multipart('image', 'example.png', f.read())
+        batch_body = json.dumps({'smiles': smiles[:100]}).encode()
+
+        def post_json(path, payload):
+            return lambda base: urllib.request.Request(base + path, data=payload,
+                                                       headers={'Content-Type': 'application/json'})
+
+        routes = {
+            'mol-to-smiles': post_json('/mol-to-smiles', json.dumps({'mol': mol_block}).encode()),
+            'image-to-smiles': lambda base: urllib.request.Request(base + '/image-to-smiles', data=image_body,
+                                                                   headers={'Content-Type': image_type}),
+            'predict-batch-100': post_json('/predict-batch', batch_body),
+            'leaderboard': lambda base: urllib.request.Request(base + '/leaderboard?top=10'),
+        }
+        n_requests = 20 if args.quick else 200
+        results = {}
+        for name, make_request in routes.items():
+            results[f'http.{name}'] = _http_load(url, make_request, n_requests, args.concurrency)
+        server.shutdown()
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'featurize': bench_featurize,
+    'predict': bench_predict,
+    'train': bench_train,
+    'http': bench_http,
+}
+
+
+def lower_is_better(metric):
+    if metric.endswith('per_s'):
+        return False
+    return metric.endswith('_ms') or metric.endswith('_s') or metric == 'error_rate'
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions (worse than baseline by more than tolerance)."""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if base is None or not isinstance(value, (int, float)):
+                continue
+            if lower_is_better(metric):
+                worse = value > base * (1 + tolerance) and value - base > 1e-9
+            else:
+                worse = value < base * (1 - tolerance)
+            if worse:
+                change = (value - base) / base * 100 if base else float('inf')
+                regressions.append(f"{name}.{metric}: {base:.4g} -> {value:.4g} ({change:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark featurization, prediction, training and the HTTP API.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Run only these benchmarks.")
+    parser.add_argument('--model', default=os.path.join(BACKEND_DIR, 'ic50_model.pkl'),
+                        help="Pickled predictor to benchmark (trained on the fly if missing).")
+    parser.add_argument('--backend', default='flat', choices=['flat', 'sklearn', 'xgboost'],
+                        help="Forest inference backend for the predict benchmark.")
+    parser.add_argument('--output', help="Write results as JSON to this file.")
+    parser.add_argument('--compare', help="Baseline JSON to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative slowdown (default 0.2).")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent HTTP clients.")
+    parser.add_argument('--quick', action='store_true', help="Smaller inputs and fewer repeats.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from rdkit import RDLogger
+    RDLogger.DisableLog('rdApp.*')
+    smiles, ic50 = load_smiles()
+
+    results = {}
+    for name in args.only or list(BENCHMARKS):
+        print(f"▶ {name}")
+        results.update(BENCHMARKS[name](args, smiles, ic50))
+
+    report = {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'quick': args.quick},
+        'results': results,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ 기준보다 느려진 항목:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("✅ 기준 대비 성능 저하 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+# decimer_optimized.py
+# DECIMER(이미지 → SMILES)를 GPU 없는 서버에서 가볍게 돌리기 위한 선택적 추론 경로.
+# 원본 TensorFlow SavedModel을 float16/int8로 양자화한 TFLite 모델로 내보내고, TF 스레드 수를 조정한다.
+#
+#   python decimer_optimized.py export --quantization float16     # decimer_tflite/ 생성
+#   python decimer_optimized.py check                              # 원본 DECIMER와 비교, 통과하면 check.json 기록
+#   DECIMER_RUNTIME=tflite python serve.py                         # 서빙에서 사용 (check 통과한 모델만 로드)
+import argparse
+import glob
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageEnhance, UnidentifiedImageError
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TFLITE_PATH = os.path.join(BACKEND_DIR, 'decimer_tflite')
+TEST_IMAGES_DIR = os.path.join(BACKEND_DIR, 'app', 'test_predictions')
+QUANTIZATIONS = ('float16', 'int8', 'none')
+RUNTIMES = ('tf', 'savedmodel', 'tflite')
+IMAGE_SIZE = 512
+# 이 버전부터 DECIMER의 predict_SMILES가 파일 경로 외에 이미지 배열도 받는다 (config.decode_image)
+DECIMER_ARRAY_INPUT = (2, 7, 1)
+
+TFLITE_PATH = os.environ.get('DECIMER_TFLITE_PATH', DEFAULT_TFLITE_PATH)
+# 비워 두면 TensorFlow 기본값(코어 수만큼). serve.py는 워커 수에 맞춰 기본값을 정한다
+INTRA_OP_THREADS = int(os.environ.get('DECIMER_INTRA_OP_THREADS', 0))
+INTER_OP_THREADS = int(os.environ.get('DECIMER_INTER_OP_THREADS', 0))
+
+# DECIMER가 고리 번호 숫자 대신 쓰는 토큰 (DECIMER utils.decoder)
+_RING_DIGITS = str.maketrans({'!': '1', '$': '2', '^': '3', '<': '4', '>': '5',
+                              '?': '6', '£': '7', '¢': '8', '€': '9', '§': '0'})
+
+
+def configure_threads(intra=None, inter=None):
+    """
+    Size TensorFlow's intra-/inter-op thread pools (0 or None keeps the default).
+    Only takes effect before TensorFlow runs its first op, i.e. before DECIMER is imported.
+    """
+    import tensorflow as tf
+    intra = INTRA_OP_THREADS if intra is None else intra
+    inter = INTER_OP_THREADS if inter is None else inter
+    try:
+        if intra:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError as e:
+        print(f"⚠️ TensorFlow 스레드 설정을 적용하지 못했습니다 (이미 초기화됨): {e}")
+
+
+def decode_image(image):
+    """
+    DECIMER's input preprocessing (DECIMER 2.7 config.decode_image, MIT license):
+    the same steps and library calls, giving the same float32 (512, 512, 3) input.
+
+    Importing anything from the DECIMER package runs its __init__, which loads both
+    full TensorFlow models, so the TFLite runtime cannot borrow DECIMER's own copy.
+    `image` is a path, a file-like object or a decoded uint8 array.
+    """
+    import cv2
+    import tensorflow as tf
+    import efficientnet.tfkeras as efn
+    if isinstance(image, np.ndarray):
+        png = Image.fromarray(image).convert('RGBA')
+    else:
+        try:
+            png = Image.open(image).convert('RGBA')
+        except UnidentifiedImageError:
+            from pillow_heif import register_heif_opener
+            register_heif_opener()
+            png = Image.open(image).convert('RGBA')
+    rgba = np.asarray(Image.alpha_composite(Image.new('RGBA', png.size, (255, 255, 255)), png))
+
+    # 밝기 범위를 0-255로 늘린다
+    low, high = int(rgba.min()), int(rgba.max())
+    lut = np.zeros(256, dtype=np.uint8)
+    lut[low:high + 1] = np.linspace(0, 255, high - low + 1, endpoint=True, dtype=np.uint8)
+    gray = Image.fromarray(cv2.cvtColor(lut[rgba], cv2.COLOR_BGR2GRAY))
+    image = ImageEnhance.Contrast(gray).enhance(1.8)
+
+    width, height = image.size
+    if width == height and width < IMAGE_SIZE:
+        image = image.resize((IMAGE_SIZE, IMAGE_SIZE), resample=Image.LANCZOS)
+    elif width < IMAGE_SIZE and height < IMAGE_SIZE:
+        ratio = IMAGE_SIZE / max(width, height)
+        image = image.resize((int(width * ratio), int(height * ratio)), resample=Image.LANCZOS)
+
+    # 흰 여백을 잘라내고, 긴 변의 1.2배(최소 512) 정사각형 가운데에 놓는다
+    array = np.asarray(image.convert('L'))
+    ink = ~(array > 200)
+    rows, cols = np.flatnonzero(ink.sum(axis=1)), np.flatnonzero(ink.sum(axis=0))
+    image = Image.fromarray(array[rows.min():rows.max() + 1, cols.min():cols.max() + 1])
+    side = max(int(1.2 * max(image.size)), IMAGE_SIZE)
+    square = Image.new(image.mode, (side, side), 'white')
+    square.paste(image, (int((side - image.size[0]) / 2), int((side - image.size[1]) / 2)))
+    image = ImageEnhance.Brightness(square).enhance(1.6)
+
+    # DECIMER는 PNG로 저장했다가 3채널로 다시 읽는다 (회색조 값을 세 채널에 복사하는 것과 같다)
+    channels = np.repeat(np.asarray(image)[:, :, None], 3, axis=2)
+    resized = tf.image.resize(channels, (IMAGE_SIZE, IMAGE_SIZE), method='gaussian', antialias=True)
+    return efn.preprocess_input(resized)
+
+
+def installed_decimer_version():
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version('decimer')
+    except PackageNotFoundError:
+        return None
+
+
+def accepts_arrays(runtime='tf'):
+    """
+    Whether the predictor load_predictor(runtime) returns takes a decoded uint8 image
+    array as well as a file. The TFLite and SavedModel runtimes use decode_image above;
+    stock DECIMER only does from DECIMER_ARRAY_INPUT on and otherwise needs a file.
+    """
+    if runtime != 'tf':
+        return True
+    installed = installed_decimer_version()
+    if installed is None:
+        return False
+    parts = [int(part) if part.isdigit() else 0 for part in installed.split('.')[:3]]
+    return tuple(parts) >= DECIMER_ARRAY_INPUT
+
+
+def default_saved_model_path():
+    """Where the DECIMER package keeps the full (non hand-drawn) SavedModel."""
+    import pystow
+    return str(pystow.join('DECIMER-V2', 'DECIMER_model'))
+
+
+def _concrete_function(model):
+    # DECIMER의 SavedModel은 input_signature 없는 @tf.function으로 저장돼 serving 시그니처가 없다
+    import tensorflow as tf
+    return model.__call__.get_concrete_function(tf.TensorSpec((IMAGE_SIZE, IMAGE_SIZE, 3), tf.float32))
+
+
+def export_tflite(path=TFLITE_PATH, quantization='float16', saved_model=None):
+    """
+    Convert the DECIMER SavedModel to TFLite in directory `path`: model.tflite,
+    tokens.json (the SMILES tokenizer's index → token table) and header.json.
+
+    quantization: 'float16' stores weights as float16 (half the size, computed in
+    float32 on CPU); 'int8' quantizes weights to int8 with dynamic-range
+    quantization (activations stay float); 'none' keeps float32.
+
+    The decoder's autoregressive loop needs TensorFlow ops that have no TFLite
+    builtin (SELECT_TF_OPS), so the model runs with tf.lite.Interpreter from the
+    full tensorflow package rather than the standalone tflite-runtime.
+    """
+    import tensorflow as tf
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization: {quantization}")
+    saved_model = saved_model or default_saved_model_path()
+    if not os.path.isdir(saved_model):
+        import DECIMER  # noqa: F401  처음 import할 때 모델을 내려받는다
+
+    start = time.perf_counter()
+    model = tf.saved_model.load(saved_model)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([_concrete_function(model)], model)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    # 디코더 while 루프의 TensorList 연산을 그대로 둔다 (낮추면 변환이 실패한다)
+    converter._experimental_lower_tensor_list_ops = False
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    flatbuffer = converter.convert()
+
+    with open(os.path.join(saved_model, 'assets', 'tokenizer_SMILES.pkl'), 'rb') as f:
+        tokenizer = pickle.load(f)
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'model.tflite'), 'wb') as f:
+        f.write(flatbuffer)
+    with open(os.path.join(path, 'tokens.json'), 'w') as f:
+        json.dump({str(i): token for i, token in tokenizer.index_word.items()}, f)
+    if os.path.exists(os.path.join(path, 'check.json')):
+        os.remove(os.path.join(path, 'check.json'))  # 새 모델은 다시 검증해야 한다
+    header = {
+        'quantization': quantization,
+        'source': os.path.abspath(saved_model),
+        'tensorflow': tf.__version__,
+        'decimer': installed_decimer_version(),
+        'size_bytes': len(flatbuffer),
+        'convert_s': round(time.perf_counter() - start, 1),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(os.path.join(path, 'header.json'), 'w') as f:
+        json.dump(header, f, indent=2)
+    return header
+
+
+class _TokenDecoder:
+    def __init__(self, index_word):
+        self.index_word = index_word
+
+    def __call__(self, tokens):
+        text = ''.join(self.index_word[int(i)] for i in np.ravel(tokens))
+        return text.replace('<start>', '').replace('<end>', '').translate(_RING_DIGITS)
+
+
+class SavedModelDecimer(_TokenDecoder):
+    """
+    The full-precision DECIMER SavedModel with the same pre/post-processing as
+    TFLiteDecimer, i.e. the exported model's graph before conversion.
+    """
+
+    def __init__(self, saved_model):
+        import tensorflow as tf
+        with open(os.path.join(saved_model, 'assets', 'tokenizer_SMILES.pkl'), 'rb') as f:
+            super().__init__(pickle.load(f).index_word)
+        self.model = tf.saved_model.load(saved_model)
+
+    def predict(self, image):
+        import tensorflow as tf
+        tokens, _ = self.model(tf.constant(decode_image(image)))
+        return self(tokens.numpy())
+
+
+class TFLiteDecimer(_TokenDecoder):
+    """
+    DECIMER on the TFLite interpreter; `predict(image)` is called like DECIMER's
+    predict_SMILES(image). Refuses to load a model that has not passed `check`.
+    Not thread-safe: the serving path calls it from the single DECIMER worker.
+    """
+
+    def __init__(self, path=TFLITE_PATH, num_threads=None, require_check=True):
+        import tensorflow as tf
+        with open(os.path.join(path, 'header.json')) as f:
+            self.header = json.load(f)
+        if require_check:
+            verified = read_check(path)
+            if verified is None or not verified['passed']:
+                raise RuntimeError(f"{path} has not passed the accuracy check against the full model; "
+                                   f"run `python decimer_optimized.py check --model {path}` first")
+        with open(os.path.join(path, 'tokens.json')) as f:
+            super().__init__({int(i): token for i, token in json.load(f).items()})
+        self.interpreter = tf.lite.Interpreter(model_path=os.path.join(path, 'model.tflite'),
+                                               num_threads=num_threads or INTRA_OP_THREADS or None)
+        self.runner = self.interpreter.get_signature_runner()
+        self.input_name = next(iter(self.runner.get_input_details()))
+
+    def predict(self, image):
+        outputs = self.runner(**{self.input_name: np.asarray(decode_image(image), dtype=np.float32)})
+        # 출력은 (토큰, 신뢰도) 두 개 — 정수형인 쪽이 토큰
+        tokens = next(value for _, value in sorted(outputs.items()) if np.issubdtype(value.dtype, np.integer))
+        return self(tokens)
+
+
+def load_predictor(runtime='tf', path=TFLITE_PATH):
+    """
+    predict_SMILES-compatible callable for `runtime`: 'tf' (stock DECIMER), 'tflite'
+    (the exported model in `path`) or 'savedmodel' (the model `path` was exported from).
+    """
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown DECIMER runtime: {runtime}")
+    configure_threads()
+    if runtime == 'tflite':
+        return TFLiteDecimer(path).predict
+    if runtime == 'savedmodel':
+        with open(os.path.join(path, 'header.json')) as f:
+            return SavedModelDecimer(json.load(f)['source']).predict
+    from DECIMER import predict_SMILES
+    return predict_SMILES
+
+
+def read_check(path):
+    check_path = os.path.join(path, 'check.json')
+    if not os.path.exists(check_path):
+        return None
+    with open(check_path) as f:
+        return json.load(f)
+
+
+def test_images():
+    return sorted(p for p in glob.glob(os.path.join(TEST_IMAGES_DIR, '*'))
+                  if p.lower().endswith(('.png', '.jpg', '.jpeg')))
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(runtime, path, images, repeats):
+    """Load one runtime and time it on `images` (run in its own process so peak RSS is its own)."""
+    start = time.perf_counter()
+    if runtime == 'tflite':
+        configure_threads()
+        predict = TFLiteDecimer(path, require_check=False).predict
+    else:
+        predict = load_predictor(runtime, path)
+    report = {'runtime': runtime, 'load_s': time.perf_counter() - start, 'load_rss_mb': _peak_rss_mb(),
+              'smiles': {}, 'first_ms': {}, 'p50_ms': {}}
+    for image in images:
+        name = os.path.basename(image)
+        start = time.perf_counter()
+        report['smiles'][name] = predict(image)
+        report['first_ms'][name] = (time.perf_counter() - start) * 1000
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict(image)
+            timings.append((time.perf_counter() - start) * 1000)
+        report['p50_ms'][name] = float(np.median(timings)) if timings else report['first_ms'][name]
+    report['peak_rss_mb'] = _peak_rss_mb()
+    return report
+
+
+def _run_measure(runtime, path, images, repeats):
+    command = [sys.executable, os.path.abspath(__file__), 'measure', '--runtime', runtime,
+               '--model', path, '--repeats', str(repeats), *images]
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _same_molecule(a, b):
+    """(same molecule, Morgan Tanimoto similarity) for two predicted SMILES."""
+    from rdkit import Chem, DataStructs
+    from rdkit.Chem import AllChem
+    mol_a, mol_b = Chem.MolFromSmiles(a or ''), Chem.MolFromSmiles(b or '')
+    if mol_a is None or mol_b is None:
+        # RDKit이 못 읽는 예측은 문자열이 똑같을 때만 일치로 본다
+        return a == b, float(a == b)
+    fp_a = AllChem.GetMorganFingerprintAsBitVect(mol_a, 2, nBits=2048)
+    fp_b = AllChem.GetMorganFingerprintAsBitVect(mol_b, 2, nBits=2048)
+    return Chem.MolToSmiles(mol_a) == Chem.MolToSmiles(mol_b), DataStructs.TanimotoSimilarity(fp_a, fp_b)
+
+
+def check(path=TFLITE_PATH, images=None, repeats=3, min_match=1.0):
+    """
+    Compare the TFLite model in `path` with stock DECIMER (DECIMER.predict_SMILES,
+    the 'tf' runtime) on `images` (the bundled app/test_predictions images by
+    default). The reference therefore runs DECIMER's own preprocessing and decoding,
+    so differences in the ported decode_image or token decoding count against the
+    export just like quantization error does.
+
+    Reported per image and overall: exact agreement of the predicted SMILES strings,
+    agreement of the molecules (canonical SMILES), Morgan Tanimoto similarity, and
+    latency and peak memory of both. The report is saved as `path`/check.json; the
+    serving runtime only loads the model once a report with passed=True (molecule
+    match rate >= min_match) is there.
+    """
+    with open(os.path.join(path, 'header.json')) as f:
+        header = json.load(f)
+    stock_model = default_saved_model_path()
+    if os.path.abspath(header['source']) != os.path.abspath(stock_model):
+        raise ValueError(f"{path} was exported from {header['source']}, but stock DECIMER runs {stock_model}; "
+                         f"the comparison is only meaningful for an export of the stock model")
+    images = images or test_images()
+    full = _run_measure('tf', path, images, repeats)
+    lite = _run_measure('tflite', path, images, repeats)
+    rows = []
+    for image in images:
+        name = os.path.basename(image)
+        full_smiles, lite_smiles = full['smiles'][name], lite['smiles'][name]
+        match, similarity = _same_molecule(full_smiles, lite_smiles)
+        rows.append({'image': name, 'exact_match': full_smiles == lite_smiles, 'match': match,
+                     'tanimoto': similarity, 'full_smiles': full_smiles, 'tflite_smiles': lite_smiles,
+                     'full_p50_ms': full['p50_ms'][name], 'tflite_p50_ms': lite['p50_ms'][name]})
+    report = {
+        'quantization': header['quantization'],
+        'source': header['source'],
+        'reference': f"DECIMER.predict_SMILES (decimer {installed_decimer_version()})",
+        'images': rows,
+        'exact_match_rate': sum(row['exact_match'] for row in rows) / len(rows),
+        'match_rate': sum(row['match'] for row in rows) / len(rows),
+        'mean_tanimoto': float(np.mean([row['tanimoto'] for row in rows])),
+        'min_tanimoto': float(np.min([row['tanimoto'] for row in rows])),
+        'full': {key: full[key] for key in ('load_s', 'load_rss_mb', 'peak_rss_mb')},
+        'tflite': {key: lite[key] for key in ('load_s', 'load_rss_mb', 'peak_rss_mb')},
+        'speedup': float(np.mean([row['full_p50_ms'] / row['tflite_p50_ms'] for row in rows])),
+        'min_match': min_match,
+        'checked': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    report['passed'] = report['match_rate'] >= min_match
+    with open(os.path.join(path, 'check.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DECIMER TFLite export and comparison with the full model")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="SavedModel → 양자화된 TFLite 모델")
+    export.add_argument('-o', '--output', default=TFLITE_PATH)
+    export.add_argument('--quantization', choices=QUANTIZATIONS, default='float16')
+    export.add_argument('--saved-model', help="DECIMER SavedModel 디렉터리 (기본값: DECIMER가 내려받은 위치)")
+
+    compare = commands.add_parser('check', help="원본 DECIMER(predict_SMILES)와 정확도/지연/메모리 비교")
+    compare.add_argument('images', nargs='*', help="비교할 이미지 (기본값: app/test_predictions)")
+    compare.add_argument('--model', default=TFLITE_PATH)
+    compare.add_argument('--repeats', type=int, default=3)
+    compare.add_argument('--min-match', type=float, default=1.0, help="통과에 필요한 최소 일치율 (미달 시 exit 1)")
+
+    single = commands.add_parser('measure', help=argparse.SUPPRESS)
+    single.add_argument('images', nargs='+')
+    single.add_argument('--runtime', choices=RUNTIMES, required=True)
+    single.add_argument('--model', default=TFLITE_PATH)
+    single.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        header = export_tflite(args.output, args.quantization, args.saved_model)
+        print(f"✅ TFLite 모델 저장 완료: {args.output} ({header['quantization']}, "
+              f"{header['size_bytes'] / 1e6:.1f} MB, {header['convert_s']}초)")
+    elif args.command == 'measure':
+        print(json.dumps(measure(args.runtime, args.model, args.images, args.repeats)))
+    else:
+        report = check(args.model, args.images, args.repeats, args.min_match)
+        for row in report['images']:
+            status = '✅' if row['match'] else '❌'
+            print(f"{status} {row['image']}: tanimoto {row['tanimoto']:.3f}, "
+                  f"{row['full_p50_ms']:.0f} ms → {row['tflite_p50_ms']:.0f} ms")
+            if not row['exact_match']:
+                print(f"    DECIMER: {row['full_smiles']}\n    tflite:  {row['tflite_smiles']}")
+        print(f"분자 일치율 {report['match_rate']:.0%}, SMILES 완전 일치율 {report['exact_match_rate']:.0%}, "
+              f"평균 tanimoto {report['mean_tanimoto']:.3f} ({report['quantization']}), 평균 {report['speedup']:.2f}배 빠름, "
+              f"최대 메모리 {report['full']['peak_rss_mb']:.0f} MB → {report['tflite']['peak_rss_mb']:.0f} MB "
+              f"→ {os.path.join(args.model, 'check.json')}")
+        if not report['passed']:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# descriptor_engine.py
+import time
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import Descriptors, GraphDescriptors, rdMolDescriptors
+
+# 기술자 이름 -> fn(mol, shared). shared는 분자 하나에 대한 중간 결과 캐시로,
+# 여러 기술자가 같은 계산을 공유할 때 사용한다. 지금 공유되는 것은 Crippen logP/MR뿐이다
+# (고리 정보는 RDKit이 sanitize 때 분자에 저장해 두고, TPSA/LabuteASA는 서로 다른 원자 기여도를 쓰며,
+# BalabanJ/BertzCT는 결합 차수를 반영한 거리 행렬과 반영하지 않은 거리 행렬을 따로 쓴다).
+DESCRIPTORS = {}
+
+
+def register_descriptor(name):
+    """Decorator registering fn(mol, shared) as descriptor `name`."""
+    def decorator(fn):
+        DESCRIPTORS[name] = fn
+        return fn
+    return decorator
+
+
+def _crippen(mol, shared):
+    if 'crippen' not in shared:
+        shared['crippen'] = rdMolDescriptors.CalcCrippenDescriptors(mol)
+    return shared['crippen']
+
+
+register_descriptor('MolWt')(lambda mol, shared: rdMolDescriptors._CalcMolWt(mol))
+register_descriptor('MolLogP')(lambda mol, shared: _crippen(mol, shared)[0])
+register_descriptor('MolMR')(lambda mol, shared: _crippen(mol, shared)[1])
+register_descriptor('NumHDonors')(lambda mol, shared: rdMolDescriptors.CalcNumHBD(mol))
+register_descriptor('NumHAcceptors')(lambda mol, shared: rdMolDescriptors.CalcNumHBA(mol))
+register_descriptor('NumRotatableBonds')(lambda mol, shared: rdMolDescriptors.CalcNumRotatableBonds(mol))
+register_descriptor('NumAromaticRings')(lambda mol, shared: rdMolDescriptors.CalcNumAromaticRings(mol))
+register_descriptor('HeavyAtomCount')(lambda mol, shared: mol.GetNumHeavyAtoms())
+register_descriptor('TPSA')(lambda mol, shared: rdMolDescriptors.CalcTPSA(mol))
+register_descriptor('LabuteASA')(lambda mol, shared: rdMolDescriptors.CalcLabuteASA(mol))
+register_descriptor('FractionCSP3')(lambda mol, shared: rdMolDescriptors.CalcFractionCSP3(mol))
+register_descriptor('BalabanJ')(lambda mol, shared: GraphDescriptors.BalabanJ(mol))
+register_descriptor('BertzCT')(lambda mol, shared: GraphDescriptors.BertzCT(mol))
+
+
+def resolve_descriptor(name):
+    """The function for descriptor `name`; names not registered above fall back to RDKit's descriptor list."""
+    if name in DESCRIPTORS:
+        return DESCRIPTORS[name]
+    rdkit_functions = dict(Descriptors.descList)
+    if name not in rdkit_functions:
+        raise ValueError(f"Unknown descriptor: {name}")
+    fn = rdkit_functions[name]
+    return lambda mol, shared: fn(mol)
+
+
+class DescriptorEngine:
+    """
+    Computes a fixed, declared list of RDKit descriptors.
+
+    The descriptor functions are resolved once when the engine is built, and an
+    unknown name is an error rather than a silently shorter vector, so the column
+    schema (`names`) never depends on the RDKit version.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self._functions = [resolve_descriptor(name) for name in self.names]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # 람다는 피클할 수 없으므로 이름만 저장하고 불러올 때 다시 해석한다
+        return {'names': self.names}
+
+    def __setstate__(self, state):
+        self.__init__(state['names'])
+
+    def compute(self, mol, out=None):
+        """Descriptor values of one molecule, in schema order (written into `out` if given)."""
+        if out is None:
+            out = np.empty(len(self.names))
+        shared = {}
+        for column, fn in enumerate(self._functions):
+            out[column] = fn(mol, shared)
+        return out
+
+    def cost_report(self, mols):
+        """
+        Mean time in microseconds of each descriptor over `mols`, most expensive first.
+        Each descriptor is timed on its own, on a fresh copy of the molecule, so the
+        numbers are what dropping it from the list would save at most.
+
+        The only computation shared between descriptors is the Crippen contribution
+        pass behind MolLogP and MolMR. Both are charged for it here, but dropping
+        one of them saves almost nothing while the other stays. Every other
+        descriptor costs the same with or without the rest of the list.
+        """
+        mols = [mol for mol in mols if mol is not None]
+        if mols:
+            # 첫 호출의 파라미터 로딩 등이 한 기술자에 몰리지 않도록 먼저 한 번 계산
+            self.compute(mols[0])
+        totals = np.zeros(len(self.names))
+        for mol in mols:
+            for column, fn in enumerate(self._functions):
+                # RDKit은 일부 결과(Crippen 기여도 등)를 분자에 캐시하므로 매번 새 복사본으로 잰다
+                fresh = Chem.Mol(mol.ToBinary())
+                start = time.perf_counter()
+                fn(fresh, {})
+                totals[column] += time.perf_counter() - start
+        mean_us = totals / max(len(mols), 1) * 1e6
+        order = np.argsort(mean_us)[::-1]
+        return [(self.names[column], float(mean_us[column])) for column in order]
+
+
+if __name__ == '__main__':
+    # 기술자별 계산 비용 확인: python descriptor_engine.py [csv] [n]
+    import sys
+    import pandas as pd
+    from ic50_predictor_class import SMILEStoIC50Predictor
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'sorted_f_avg_IC50.csv'
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    smiles = pd.read_csv(csv_path)['SMILES'].head(n)
+    engine = DescriptorEngine(SMILEStoIC50Predictor().descriptor_names)
+    report = engine.cost_report([Chem.MolFromSmiles(s) for s in smiles])
+    total = sum(us for _, us in report)
+    for name, us in report:
+        print(f"{name:<20} {us:9.1f} us  {us / total:6.1%}")
+    print(f"{'total':<20} {total:9.1f} us")
@@ -0,0 +1,77 @@
+# fast_forest.py
+import numpy as np
+from scipy import sparse
+
+ROW_BLOCK = 1024
+
+
+class FlatForest:
+    """
+    A fitted sklearn forest regressor exported into flat NumPy node arrays.
+
+    All trees are concatenated into one set of arrays (feature, threshold, left,
+    right, value) and traversed together with vectorized indexing, one level per
+    step. There is no joblib dispatch or per-call input validation, which is what
+    dominates RandomForestRegressor.predict for a single row.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.n_features = n_features
+        self.is_leaf = left == np.arange(len(left))
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            # 잎 노드는 자기 자신을 가리키게 해서 깊이가 다른 트리도 같은 횟수만큼 돌릴 수 있게 한다
+            lefts.append(np.where(leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(leaf, node_ids, tree.children_right) + offset)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            offset += tree.node_count
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            n_features=forest.n_features_in_,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _predict_block(self, X):
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        while not self.is_leaf[nodes].all():
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X):
+        """Predict for a dense array or sparse matrix of shape (n_samples, n_features)."""
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features}.")
+        # sklearn 트리와 같은 비교 결과를 얻도록 float32로 맞춘다
+        if sparse.issparse(X):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= ROW_BLOCK:
+            return self._predict_block(X)
+        return np.concatenate([self._predict_block(X[start:start + ROW_BLOCK])
+                               for start in range(0, X.shape[0], ROW_BLOCK)])
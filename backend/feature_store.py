@@ -0,0 +1,138 @@
+# feature_store.py
+import hashlib
+import json
+import os
+import numpy as np
+from rdkit import Chem
+from batch_featurizer import featurize_smiles, DEFAULT_CHUNK_SIZE
+from compact_features import CompactFeatures
+
+
+class FeatureStore:
+    """
+    Persistent, memory-mapped store of feature rows keyed by canonical SMILES.
+
+    Each featurizer configuration (fingerprint radius, nBits, descriptor list) gets its
+    own directory under `root`, holding (rows beyond n_rows are spare capacity):
+        bits.npy        - memory-mapped uint8 matrix of packed fingerprint bits
+        descriptors.npy - memory-mapped float64 descriptor matrix
+        index.json      - canonical SMILES -> row, raw SMILES -> row (-1 for invalid) and n_rows
+    Only rows that are not in the store yet are featurized. Intended for a single writer.
+    """
+
+    def __init__(self, root, predictor):
+        self.config = self.config_for(predictor)
+        self.nbits = predictor.fingerprint_nbits
+        self.n_descriptors = len(self.config['descriptor_names'])
+        digest = hashlib.sha1(json.dumps(self.config, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(root, digest)
+        self.bits_path = os.path.join(self.path, 'bits.npy')
+        self.descriptors_path = os.path.join(self.path, 'descriptors.npy')
+        self.index_path = os.path.join(self.path, 'index.json')
+        os.makedirs(self.path, exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                index = json.load(f)
+            self.n_rows = index['n_rows']
+            self.canonical_rows = index['canonical']
+            self.aliases = index['aliases']
+            # 유효한 SMILES가 하나도 없었으면 index.json만 있고 행렬 파일은 아직 없다
+            self._bits = self._open(self.bits_path)
+            self._descriptors = self._open(self.descriptors_path)
+        else:
+            with open(os.path.join(self.path, 'config.json'), 'w') as f:
+                json.dump(self.config, f, indent=2)
+            self.n_rows = 0
+            self.canonical_rows = {}
+            self.aliases = {}
+            self._bits = None
+            self._descriptors = None
+
+    @staticmethod
+    def config_for(predictor):
+        config = dict(predictor.featurizer_config())
+        config['descriptor_names'] = list(predictor.descriptor_names) if predictor.use_descriptors else []
+        config['layout'] = 'packed'
+        return config
+
+    def __len__(self):
+        return self.n_rows
+
+    def _open(self, path):
+        if not self.n_rows and not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r+')
+
+    def _grow(self, path, current, shape, dtype):
+        tmp_path = path + '.tmp'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+        if self.n_rows:
+            grown[:self.n_rows] = current[:self.n_rows]
+        grown.flush()
+        del grown
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode='r+')
+
+    def _reserve(self, n_new):
+        """Make sure the memory-mapped matrices have room for n_new more rows."""
+        capacity = 0 if self._bits is None else self._bits.shape[0]
+        needed = self.n_rows + n_new
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, 2 * capacity, 1024)
+        self._bits = self._grow(self.bits_path, self._bits,
+                                (new_capacity, (self.nbits + 7) // 8), np.uint8)
+        self._descriptors = self._grow(self.descriptors_path, self._descriptors,
+                                       (new_capacity, self.n_descriptors), np.float64)
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'n_rows': self.n_rows, 'canonical': self.canonical_rows,
+                       'aliases': self.aliases}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _add_missing(self, predictor, missing, n_jobs, chunk_size):
+        X_new, valid = featurize_smiles(predictor, missing, n_jobs=n_jobs, chunk_size=chunk_size,
+                                        compact=True)
+        self._reserve(len(valid))
+        valid_set = set(valid)
+        for i, smiles in enumerate(missing):
+            if i not in valid_set:
+                self.aliases[smiles] = -1
+        for row, i in enumerate(valid):
+            canonical = Chem.MolToSmiles(Chem.MolFromSmiles(missing[i]))
+            if canonical not in self.canonical_rows:
+                self._bits[self.n_rows] = X_new.bits[row]
+                self._descriptors[self.n_rows] = X_new.descriptors[row]
+                self.canonical_rows[canonical] = self.n_rows
+                self.n_rows += 1
+            self.aliases[missing[i]] = self.canonical_rows[canonical]
+        if self._bits is not None:
+            self._bits.flush()
+            self._descriptors.flush()
+        self._save_index()
+
+    def lookup(self, predictor, smiles_list, n_jobs=-1, chunk_size=DEFAULT_CHUNK_SIZE, compact=False):
+        """
+        Return (X, valid_indices) for smiles_list, with the same semantics as
+        batch_featurizer.featurize_smiles, computing and persisting only missing rows.
+        """
+        if self.config_for(predictor) != self.config:
+            raise ValueError("Predictor featurizer config does not match this feature store.")
+        smiles_list = list(smiles_list)
+        missing = list(dict.fromkeys(s for s in smiles_list if s not in self.aliases))
+        if missing:
+            self._add_missing(predictor, missing, n_jobs, chunk_size)
+
+        valid_indices = [i for i, s in enumerate(smiles_list) if self.aliases[s] >= 0]
+        rows = np.array([self.aliases[smiles_list[i]] for i in valid_indices], dtype=np.int64)
+        if not len(rows):
+            X = CompactFeatures.empty(0, self.nbits, self.n_descriptors)
+        elif np.array_equal(rows, np.arange(len(rows))):
+            # 저장 순서 그대로 요청된 경우 복사 없이 memmap 뷰를 사용한다
+            X = CompactFeatures(self._bits[:len(rows)], self._descriptors[:len(rows)], self.nbits)
+        else:
+            X = CompactFeatures(self._bits[rows], self._descriptors[rows], self.nbits)
+        return (X if compact else X.to_dense()), valid_indices
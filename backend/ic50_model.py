@@ -1,13 +1,185 @@
 from ic50_predictor_class import SMILEStoIC50Predictor
+from model_registry import registry
+from metrics import metrics, ic50_stage_seconds
+from prediction_cache import cache_from_env
+from similarity_index import TanimotoIndex
+from serving_artifact import is_artifact, load_artifact
+from rdkit import Chem
 import joblib
+import os
+
+# 실행 위치와 상관없이 이 파일 옆의 모델을 기본값으로 사용.
+# 서빙용 아티팩트 디렉터리(serving_artifact.py)가 있으면 피클보다 우선한다.
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+_DEFAULT_ARTIFACT = os.path.join(_MODULE_DIR, 'ic50_model_artifact')
+MODEL_PATH = os.environ.get(
+    'IC50_MODEL_PATH',
+    _DEFAULT_ARTIFACT if is_artifact(_DEFAULT_ARTIFACT) else os.path.join(_MODULE_DIR, 'ic50_model.pkl')
+)
+# 설정하지 않으면(기본값) 모델을 저장할 때 고른 백엔드(save_ic50_model.py의 자동 선택 결과)를 그대로 쓴다.
+# 'flat': 트리를 NumPy 배열로 펼쳐 단건 예측 오버헤드 제거, 'sklearn': 기존 predict,
+# 'xgboost': train_xgboost로 학습한 부스터, 'auto': 검증 세트 정확도/지연시간 비교로 다시 선택
+# (아티팩트는 내보낼 때 정한 백엔드를 그대로 쓴다)
+INFERENCE_BACKEND = os.environ.get('IC50_INFERENCE_BACKEND') or None
+MODEL_VERSION = None
+
+
+def _model_version(path):
+    # 모델 파일이 바뀌면 캐시 키도 바뀌도록 크기+수정시각을 버전으로 사용
+    stat = os.stat(path)
+    return f"{stat.st_size}-{int(stat.st_mtime)}"
+
+
+def _load_model():
+    global MODEL_VERSION
+    if is_artifact(MODEL_PATH):
+        # 아티팩트는 펼쳐진 트리 배열만 담고 있으므로 항상 'flat' 백엔드로 동작한다
+        model = load_artifact(MODEL_PATH)
+    else:
+        model = joblib.load(MODEL_PATH)
+        if INFERENCE_BACKEND == 'auto':
+            backend, _ = model.select_inference_backend()
+            print(f"[ic50] 추론 백엔드 자동 선택: {backend}")
+        else:
+            # 저장된 백엔드도 다시 설정해 펼친 트리가 없는 예전 피클이면 새로 만든다
+            model.set_inference_backend(INFERENCE_BACKEND or getattr(model, 'inference_backend', 'sklearn'))
+    MODEL_VERSION = getattr(model, 'model_version', None) or _model_version(MODEL_PATH)
+    return model
+
+
+registry.register('ic50', _load_model)
+
+# 측정된 화합물(학습 CSV) 중 가장 비슷한 분자를 찾기 위한 Tanimoto 인덱스
+KNOWN_COMPOUNDS_CSV = os.path.join(_MODULE_DIR, 'sorted_f_avg_IC50.csv')
+SIMILARITY_INDEX_PATH = os.environ.get('SIMILARITY_INDEX_PATH')
+
+
+def _load_similarity_index():
+    if SIMILARITY_INDEX_PATH and os.path.exists(os.path.join(SIMILARITY_INDEX_PATH, 'meta.json')):
+        return TanimotoIndex.load(SIMILARITY_INDEX_PATH)
+    import pandas as pd
+    data = pd.read_csv(KNOWN_COMPOUNDS_CSV).dropna(subset=['f_avg_IC50'])
+    return TanimotoIndex.build(get_model(), data['SMILES'].tolist(), data['f_avg_IC50'].tolist(),
+                               path=SIMILARITY_INDEX_PATH)
+
+
+# 인덱스가 준비되기 전에는 nearest가 빈 목록이므로 준비 여부(/health)에는 포함하지 않는다
+registry.register('similarity', _load_similarity_index, required=False)
+prediction_cache = cache_from_env()
+
+cache_requests = metrics.counter('ic50_cache_requests_total', 'Prediction cache lookups.', ['result'])
+invalid_smiles = metrics.counter('ic50_invalid_smiles_total', 'SMILES that RDKit could not parse.')
+prediction_failures = metrics.counter('ic50_prediction_failures_total', 'IC50 predictions that raised an error.')
+
+
+def get_model():
+    """The IC50 predictor, loaded on first use."""
+    return registry.get('ic50')
+
+
+def canonicalize_smiles(smiles: str):
+    with ic50_stage_seconds.time(stage='canonicalize'):
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            invalid_smiles.inc()
+            return None
+        return Chem.MolToSmiles(mol)
+
+
+def _cache_get(key):
+    value = prediction_cache.get(key)
+    cache_requests.inc(result='miss' if value is None else 'hit')
+    return value
 
-# model = joblib.load('ic50_model.pkl')
 
-model = joblib.load('backend/ic50_model.pkl')
 def predict_ic50(smiles: str) -> float:
     try:
-        preds, _ = model.predict([smiles])
-        return float(preds[0]) if preds else -1
+        model = get_model()
+        canonical = canonicalize_smiles(smiles)
+        if canonical is None:
+            return -1
+        key = f"{MODEL_VERSION}:{canonical}"
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
+        preds, _ = model.predict([smiles], n_jobs=1)
+        if not preds:
+            return -1
+        ic50 = float(preds[0])
+        prediction_cache.set(key, ic50)
+        return ic50
     except Exception as e:
+        prediction_failures.inc()
         print(f"[ic50 예측 실패] {e}")
         return -1
+
+
+def predict_ic50_mol(mol, canonical=None) -> float:
+    """
+    IC50 for an already sanitized RDKit Mol (e.g. from a MolBlock). The Mol is
+    featurized directly instead of being written to SMILES and parsed again;
+    `canonical` (its canonical SMILES) is only used as the cache key.
+    """
+    try:
+        model = get_model()
+        key = f"{MODEL_VERSION}:{canonical or Chem.MolToSmiles(mol)}"
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
+        preds, _ = model.predict_mols([mol])
+        if not preds:
+            return -1
+        ic50 = float(preds[0])
+        prediction_cache.set(key, ic50)
+        return ic50
+    except Exception as e:
+        prediction_failures.inc()
+        print(f"[ic50 예측 실패] {e}")
+        return -1
+
+
+def predict_ic50_batch(smiles_list):
+    """
+    Predict IC50 for many SMILES in one vectorized forest call.
+    Returns a list aligned with smiles_list: the IC50 value, or None for invalid SMILES.
+    """
+    model = get_model()
+    results = [None] * len(smiles_list)
+    keys = {}
+    pending = []
+    for i, smiles in enumerate(smiles_list):
+        canonical = canonicalize_smiles(smiles) if smiles else None
+        if canonical is None:
+            continue
+        keys[i] = f"{MODEL_VERSION}:{canonical}"
+        cached = _cache_get(keys[i])
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    if pending:
+        preds, valid = model.predict_with_indices([smiles_list[i] for i in pending], n_jobs=1)
+        for pred, j in zip(preds, valid):
+            results[pending[j]] = float(pred)
+        # 디스크 계층은 배치 전체를 한 트랜잭션으로 쓴다 (항목마다 commit하면 fsync가 그만큼 반복된다)
+        prediction_cache.set_many((keys[pending[j]], results[pending[j]]) for j in valid)
+    return results
+
+
+def nearest_known_compounds(mol, k=1, threshold=None):
+    """
+    Measured compounds most similar to `mol` (RDKit Mol or SMILES) by Tanimoto similarity.
+    Returns [] while the index is still loading, so requests never wait on it.
+    """
+    if not registry.is_ready(['similarity']):
+        return []
+    with ic50_stage_seconds.time(stage='similarity_search'):
+        hits = registry.get('similarity').search(mol, k=k, threshold=threshold)
+    return [{'smiles': hit['smiles'], 'ic50': hit['value'], 'similarity': hit['similarity']} for hit in hits]
+
+
+def cache_stats():
+    return prediction_cache.stats()
@@ -1,17 +1,37 @@
-import pandas as pd
+import hashlib
+import json
+import os
+import time
+import joblib
 import numpy as np
+from joblib import Parallel, delayed
+from scipy import sparse
 from rdkit import Chem, DataStructs
-from rdkit.Chem import AllChem, Descriptors, Lipinski
-from rdkit.Chem.Descriptors import MolLogP, MolWt
-import matplotlib.pyplot as plt
-import seaborn as sns
+from rdkit.Chem import AllChem
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split, RandomizedSearchCV, cross_val_score, KFold
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
-import xgboost as xgb
+# pandas, matplotlib/seaborn, xgboost and sklearn.model_selection are imported inside
+# the training and plotting methods so that loading a model for serving does not pay for them.
+from batch_featurizer import featurize_smiles, featurize_mols, DEFAULT_CHUNK_SIZE
+from compact_features import CompactFeatures
+from descriptor_engine import DescriptorEngine
+from fast_forest import FlatForest
+from metrics import ic50_stage_seconds
+
+RF_PARAM_DIST = {
+    'n_estimators': [100, 200, 300, 400, 500],
+    'max_depth': [None, 10, 20, 30, 40],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4, 6],
+    'max_features': ['sqrt', 'log2', 0.3, 0.5],
+    'bootstrap': [True, False]
+}
+# update()가 전체 재학습 시간을 추정할 때 직렬로 특징화해 보는 행 수
+COST_SAMPLE_ROWS = 64
 
 class SMILEStoIC50Predictor:
     """
@@ -22,7 +42,8 @@ class SMILEStoIC50Predictor:
     
     def __init__(self, n_estimators=100, max_depth=None, random_state=42, 
                  fingerprint_radius=2, fingerprint_nbits=2048, use_descriptors=True,
-                 min_samples_split=2, min_samples_leaf=1, max_features='sqrt', bootstrap=True):
+                 min_samples_split=2, min_samples_leaf=1, max_features='sqrt', bootstrap=True,
+                 descriptor_names=None):
         self.n_estimators = n_estimators
         self.max_depth = max_depth
         self.random_state = random_state
@@ -46,57 +67,127 @@ class SMILEStoIC50Predictor:
             oob_score=bootstrap  # Enable OOB scoring if bootstrap is True
         )
         self.scaler = StandardScaler()
+        # 'dense': scaler over the full float64 matrix (older models)
+        # 'compact': packed bits + descriptors, scaler over the descriptor block only
+        self.feature_format = 'dense'
+        # 'sklearn': RandomForestRegressor.predict, 'flat': FlatForest node arrays (fast_forest.py),
+        # 'xgboost': in-place prediction with the booster from train_xgboost
+        self.inference_backend = 'sklearn'
+        self.xgb_model = None
+        # Fingerprint bits the model uses (None = all); set by build_reduced
+        self.selected_bits = None
         
-        self.descriptor_names = [
+        self.descriptor_names = list(descriptor_names) if descriptor_names is not None else [
             'MolWt', 'MolLogP', 'NumHDonors', 'NumHAcceptors', 'NumRotatableBonds',
             'NumAromaticRings', 'HeavyAtomCount', 'TPSA', 'LabuteASA', 'BalabanJ',
             'BertzCT', 'MolMR', 'FractionCSP3'
         ]
     
+    @property
+    def n_features(self):
+        """Length of the feature vector produced by _mol_to_features."""
+        n_descriptors = len(self.descriptor_names) if self.use_descriptors else 0
+        return self.fingerprint_nbits + n_descriptors
+    
+    @property
+    def n_model_features(self):
+        """Number of columns the model sees (fewer than n_features for a reduced model)."""
+        selected_bits = getattr(self, 'selected_bits', None)
+        n_bits = self.fingerprint_nbits if selected_bits is None else len(selected_bits)
+        return n_bits + self.n_features - self.fingerprint_nbits
+    
+    def feature_names(self):
+        """Names of the model input columns: Bit_i for fingerprint bits, then descriptor names."""
+        selected_bits = getattr(self, 'selected_bits', None)
+        bits = range(self.fingerprint_nbits) if selected_bits is None else selected_bits
+        names = [f'Bit_{i}' for i in bits]
+        if self.use_descriptors:
+            names.extend(self.descriptor_names)
+        return names
+    
+    def featurizer_config(self):
+        """Constructor arguments needed to rebuild this featurizer (e.g. in a worker process)."""
+        return {
+            'fingerprint_radius': self.fingerprint_radius,
+            'fingerprint_nbits': self.fingerprint_nbits,
+            'use_descriptors': self.use_descriptors,
+            'descriptor_names': list(self.descriptor_names),
+        }
+    
     def _smiles_to_mol(self, smiles):
-        """Convert SMILES string to RDKit molecule object."""
-        return Chem.MolFromSmiles(smiles)
+        """Convert SMILES string to RDKit molecule object (None if invalid or empty)."""
+        if not smiles:
+            return None
+        mol = Chem.MolFromSmiles(smiles)
+        # 빈 SMILES는 원자 없는 분자가 되고, BalabanJ 등 기술자 계산이 TypeError로 실패한다
+        return mol if mol is not None and mol.GetNumAtoms() else None
+    
+    def _morgan_fingerprint(self, mol):
+        return AllChem.GetMorganFingerprintAsBitVect(
+            mol, self.fingerprint_radius, nBits=self.fingerprint_nbits
+        )
     
-    def _mol_to_features(self, mol):
+    @property
+    def descriptor_engine(self):
+        """DescriptorEngine for descriptor_names, rebuilt if the list changes."""
+        engine = self.__dict__.get('_descriptor_engine')
+        if engine is None or engine.names != tuple(self.descriptor_names):
+            engine = self._descriptor_engine = DescriptorEngine(self.descriptor_names)
+        return engine
+    
+    def _mol_to_descriptors(self, mol, out=None):
+        """Compute the RDKit descriptors listed in descriptor_names."""
+        return self.descriptor_engine.compute(mol, out)
+    
+    def _mol_to_features(self, mol, out=None):
         """
         Convert molecule to feature vector, combining Morgan fingerprints
-        and RDKit descriptors.
+        and RDKit descriptors. If `out` is given, the features are written
+        into it in place instead of allocating a new array.
         """
         if mol is None:
             return None
         
         # Generate Morgan fingerprint
-        fingerprint = AllChem.GetMorganFingerprintAsBitVect(
-            mol, self.fingerprint_radius, nBits=self.fingerprint_nbits
-        )
-        features = np.zeros((1,))
-        DataStructs.ConvertToNumpyArray(fingerprint, features)
+        start = time.perf_counter()
+        fingerprint = self._morgan_fingerprint(mol)
+        ic50_stage_seconds.observe(time.perf_counter() - start, stage='fingerprint')
+        if out is None:
+            features = np.zeros((1,))
+            DataStructs.ConvertToNumpyArray(fingerprint, features)
+        else:
+            features = out
+            DataStructs.ConvertToNumpyArray(fingerprint, out[:self.fingerprint_nbits])
         
         if self.use_descriptors:
-            descriptors = []
-            descriptors.append(MolWt(mol))
-            descriptors.append(MolLogP(mol))
-            descriptors.append(Lipinski.NumHDonors(mol))
-            descriptors.append(Lipinski.NumHAcceptors(mol))
-            descriptors.append(Lipinski.NumRotatableBonds(mol))
-            descriptors.append(Chem.Descriptors.NumAromaticRings(mol))
-            descriptors.append(Chem.Lipinski.HeavyAtomCount(mol))
-            descriptors.append(Chem.Descriptors.TPSA(mol))
-            if hasattr(Descriptors, 'LabuteASA'):
-                descriptors.append(Descriptors.LabuteASA(mol))
-            if hasattr(Descriptors, 'BalabanJ'):
-                descriptors.append(Descriptors.BalabanJ(mol))
-            if hasattr(Descriptors, 'BertzCT'):
-                descriptors.append(Descriptors.BertzCT(mol))
-            if hasattr(Descriptors, 'MolMR'):
-                descriptors.append(Descriptors.MolMR(mol))
-            if hasattr(Descriptors, 'FractionCSP3'):
-                descriptors.append(Descriptors.FractionCSP3(mol))
-            
-            features = np.concatenate([features, descriptors])
+            start = time.perf_counter()
+            if out is None:
+                features = np.concatenate([features, self._mol_to_descriptors(mol)])
+            else:
+                self._mol_to_descriptors(mol, out[self.fingerprint_nbits:])
+            ic50_stage_seconds.observe(time.perf_counter() - start, stage='descriptors')
         
         return features
     
+    def _mol_to_compact(self, mol, bits_out, descriptors_out):
+        """
+        Write the packed fingerprint bits and the descriptor values of a molecule
+        into one row of a CompactFeatures block.
+        """
+        if mol is None:
+            return None
+        start = time.perf_counter()
+        fingerprint = self._morgan_fingerprint(mol)
+        on_bits = np.zeros(self.fingerprint_nbits, dtype=np.uint8)
+        on_bits[list(fingerprint.GetOnBits())] = 1
+        bits_out[:] = np.packbits(on_bits)
+        ic50_stage_seconds.observe(time.perf_counter() - start, stage='fingerprint')
+        if self.use_descriptors:
+            start = time.perf_counter()
+            self._mol_to_descriptors(mol, descriptors_out)
+            ic50_stage_seconds.observe(time.perf_counter() - start, stage='descriptors')
+        return bits_out
+    
     def _convert_to_pic50(self, ic50):
         """Convert IC50 values (in μM) to pIC50 scale: -log10(IC50 in M)."""
         return -np.log10(ic50 * 1e-6)
@@ -105,6 +196,123 @@ class SMILEStoIC50Predictor:
         """Convert pIC50 back to IC50 (in μM)."""
         return 10**(-pic50) * 1e6
     
+    @staticmethod
+    def _model_input(X, scaler, fit=False):
+        """
+        Scale features with `scaler` (fitting it first if fit=True) and return the
+        model input. For CompactFeatures only the descriptor block is scaled and the
+        result is a sparse CSR matrix.
+        """
+        if isinstance(X, CompactFeatures):
+            if X.descriptors.shape[1] == 0:
+                return X.to_model_input(X.descriptors)
+            descriptors = scaler.fit_transform(X.descriptors) if fit else scaler.transform(X.descriptors)
+            return X.to_model_input(descriptors)
+        return scaler.fit_transform(X) if fit else scaler.transform(X)
+    
+    @staticmethod
+    def _fit_matrix(X_scaled):
+        """
+        Forest fitting input. Sparse model input is densified to float32 (the dtype
+        the trees use internally) for the duration of the fit, since sklearn's sparse
+        splitter is about twice as slow on fingerprint bits.
+        """
+        if sparse.issparse(X_scaled):
+            return X_scaled.toarray()
+        return X_scaled
+    
+    def _select_bits(self, X_scaled):
+        """Drop the fingerprint columns a reduced model does not use."""
+        selected_bits = getattr(self, 'selected_bits', None)
+        if selected_bits is None:
+            return X_scaled
+        columns = np.concatenate([selected_bits, np.arange(self.fingerprint_nbits, X_scaled.shape[1])])
+        return X_scaled[:, columns]
+    
+    def _fit_transform(self, X):
+        """Fit the scaler and return the model input."""
+        self.feature_format = 'compact' if isinstance(X, CompactFeatures) else 'dense'
+        return self._select_bits(self._model_input(X, self.scaler, fit=True))
+    
+    def _transform(self, X):
+        """Scale features with the fitted scaler and return the model input."""
+        return self._select_bits(self._model_input(X, self.scaler))
+    
+    def set_inference_backend(self, backend):
+        """
+        Choose how the fitted forest is evaluated at prediction time:
+        'sklearn' (RandomForestRegressor.predict), 'flat' (exported FlatForest) or
+        'xgboost' (the booster fitted by train_xgboost).
+        """
+        fitted = hasattr(self.model, 'estimators_')
+        if backend == 'flat':
+            # 서빙 아티팩트에서 불러온 경우 sklearn 트리 없이 FlatForest만 있다
+            if fitted or getattr(self, '_flat_forest', None) is None:
+                self._flat_forest = FlatForest.from_sklearn(self.model)
+        elif backend == 'sklearn':
+            if not fitted:
+                raise ValueError("This predictor has no fitted sklearn forest (loaded from a serving artifact?).")
+        elif backend == 'xgboost':
+            if getattr(self, 'xgb_model', None) is None:
+                raise ValueError("No XGBoost model; call train_xgboost first.")
+        else:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        self.inference_backend = backend
+    
+    def _forest_predict(self, X_scaled, backend=None):
+        backend = backend or getattr(self, 'inference_backend', 'sklearn')
+        if backend == 'flat':
+            return self._flat_forest.predict(X_scaled)
+        if backend == 'xgboost':
+            # 학습 때와 같은 dense float32 입력으로 부스터를 직접 호출 (DMatrix 생성/검증 생략)
+            X = X_scaled.toarray() if sparse.issparse(X_scaled) else X_scaled
+            return self.xgb_model.get_booster().inplace_predict(np.asarray(X, dtype=np.float32))
+        return self.model.predict(X_scaled)
+    
+    def compare_backends(self, n_single=200):
+        """
+        Compare the available inference backends on the held-out split kept by train():
+        test r2/RMSE, batch latency over the whole split and median single-row latency.
+        """
+        if not hasattr(self, 'X_test'):
+            raise ValueError("No held-out split; call train() first.")
+        backends = ['sklearn', 'flat'] if hasattr(self.model, 'estimators_') else ['flat']
+        if getattr(self, 'xgb_model', None) is not None:
+            backends.append('xgboost')
+        if 'flat' in backends and getattr(self, '_flat_forest', None) is None:
+            self._flat_forest = FlatForest.from_sklearn(self.model)
+        
+        report = {}
+        n_rows = min(n_single, self.X_test.shape[0])
+        for backend in backends:
+            start = time.perf_counter()
+            y_pred = self._forest_predict(self.X_test, backend)
+            batch_seconds = time.perf_counter() - start
+            single_seconds = []
+            for row in range(n_rows):
+                start = time.perf_counter()
+                self._forest_predict(self.X_test[row:row + 1], backend)
+                single_seconds.append(time.perf_counter() - start)
+            report[backend] = {
+                'test_r2': r2_score(self.y_test, y_pred),
+                'test_rmse': np.sqrt(mean_squared_error(self.y_test, y_pred)),
+                'batch_ms': batch_seconds * 1000,
+                'single_p50_ms': float(np.median(single_seconds)) * 1000,
+            }
+        return report
+    
+    def select_inference_backend(self, max_r2_drop=0.01, n_single=200):
+        """
+        Pick the backend with the lowest single-row latency among those whose test r2
+        is within max_r2_drop of the best one, and switch to it. Returns (backend, report).
+        """
+        report = self.compare_backends(n_single=n_single)
+        best_r2 = max(result['test_r2'] for result in report.values())
+        eligible = [backend for backend, result in report.items() if result['test_r2'] >= best_r2 - max_r2_drop]
+        backend = min(eligible, key=lambda name: report[name]['single_p50_ms'])
+        self.set_inference_backend(backend)
+        return backend, report
+    
     def clean_data(self, smiles_list, ic50_list, multiplier=1.5):
         """
         Remove outliers based on pIC50 values using the IQR method.
@@ -123,27 +331,25 @@ class SMILEStoIC50Predictor:
         print(f"Data cleaning: removed {len(smiles_list)-len(cleaned_smiles)} outliers.")
         return cleaned_smiles, cleaned_ic50, valid_indices
     
-    def prepare_data(self, smiles_list, ic50_list, use_pic50=True):
+    def prepare_data(self, smiles_list, ic50_list, use_pic50=True, n_jobs=-1,
+                     chunk_size=DEFAULT_CHUNK_SIZE, feature_store=None, compact=False):
         """
         Process SMILES strings and IC50 values into feature vectors for modeling.
+        Large inputs are featurized in chunks across n_jobs worker processes.
+        If a FeatureStore is given, only molecules missing from it are featurized.
+        With compact=True, X is a CompactFeatures (packed bits + descriptor block).
         """
-        features_list = []
-        valid_indices = []
-        valid_ic50 = []
-        
-        for i, (smiles, ic50) in enumerate(zip(smiles_list, ic50_list)):
-            mol = self._smiles_to_mol(smiles)
-            if mol is not None:
-                features = self._mol_to_features(mol)
-                if features is not None:
-                    features_list.append(features)
-                    valid_indices.append(i)
-                    valid_ic50.append(ic50)
+        if feature_store is not None:
+            X, valid_indices = feature_store.lookup(self, smiles_list, n_jobs=n_jobs,
+                                                    chunk_size=chunk_size, compact=compact)
+        else:
+            X, valid_indices = featurize_smiles(self, smiles_list, n_jobs=n_jobs,
+                                                chunk_size=chunk_size, compact=compact)
         
-        if not features_list:
+        if not valid_indices:
             raise ValueError("No valid molecules found in the input data.")
         
-        X = np.vstack(features_list)
+        valid_ic50 = [ic50_list[i] for i in valid_indices]
         if use_pic50:
             y = np.array([self._convert_to_pic50(ic50) for ic50 in valid_ic50])
         else:
@@ -155,25 +361,18 @@ class SMILEStoIC50Predictor:
         """
         Optimize Random Forest hyperparameters using RandomizedSearchCV.
         """
-        X_scaled = self.scaler.fit_transform(X)
-        param_dist = {
-            'n_estimators': [100, 200, 300, 400, 500],
-            'max_depth': [None, 10, 20, 30, 40],
-            'min_samples_split': [2, 5, 10],
-            'min_samples_leaf': [1, 2, 4, 6],
-            'max_features': ['sqrt', 'log2', 0.3, 0.5],
-            'bootstrap': [True, False]
-        }
+        from sklearn.model_selection import RandomizedSearchCV
+        X_scaled = self._fit_transform(X)
         rand_search = RandomizedSearchCV(
             RandomForestRegressor(random_state=self.random_state, n_jobs=-1),
-            param_distributions=param_dist,
+            param_distributions=RF_PARAM_DIST,
             n_iter=n_iter,
             cv=cv,
             scoring='r2',
             random_state=self.random_state,
             verbose=1
         )
-        rand_search.fit(X_scaled, y)
+        rand_search.fit(self._fit_matrix(X_scaled), y)
         print("Best parameters (RandomizedSearchCV):", rand_search.best_params_)
         print("Best score:", rand_search.best_score_)
         best_params = rand_search.best_params_
@@ -190,23 +389,129 @@ class SMILEStoIC50Predictor:
         )
         return best_params
     
+    def find_optimal_params_halving(self, X, y, n_candidates=27, min_estimators=25, max_estimators=500,
+                                    eta=3, test_size=0.2, n_bins=5, checkpoint_dir=None):
+        """
+        Optimize Random Forest hyperparameters with successive halving over n_estimators.
+        
+        All candidates start with min_estimators trees and are scored (r2) on a stratified
+        hold-out split. After each rung the best 1/eta survive and are grown eta times
+        larger with warm_start, so trees fitted in earlier rungs are reused. With
+        checkpoint_dir, state and fitted candidates are saved after every fit and an
+        interrupted search resumes from there. The best fitted forest is kept as self.model.
+        """
+        import pandas as pd
+        from sklearn.model_selection import ParameterSampler, train_test_split
+        y_binned = pd.qcut(y, q=n_bins, labels=False, duplicates='drop')
+        train_idx, val_idx = train_test_split(
+            np.arange(len(y)), test_size=test_size, random_state=self.random_state, stratify=y_binned
+        )
+        X_train = self._fit_matrix(self._fit_transform(X[train_idx]))
+        X_val = self._transform(X[val_idx])
+        y_train, y_val = y[train_idx], y[val_idx]
+        
+        search_space = {k: v for k, v in RF_PARAM_DIST.items() if k != 'n_estimators'}
+        settings = {
+            'candidates': list(ParameterSampler(search_space, n_iter=n_candidates,
+                                                random_state=self.random_state)),
+            'min_estimators': min_estimators, 'max_estimators': max_estimators, 'eta': eta,
+            'data': hashlib.sha1(np.ascontiguousarray(y, dtype=np.float64).tobytes()).hexdigest()
+        }
+        state = {'settings': settings, 'rung': 0,
+                 'survivors': list(range(len(settings['candidates']))), 'scores': {}}
+        models = {}
+        state_path = os.path.join(checkpoint_dir, 'state.json') if checkpoint_dir else None
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                saved = json.load(f)
+            if saved['settings'] == json.loads(json.dumps(settings)):
+                state = saved
+                for cid in state['survivors']:
+                    model_path = os.path.join(checkpoint_dir, f'candidate_{cid}.joblib')
+                    if os.path.exists(model_path):
+                        models[cid] = joblib.load(model_path)
+                print(f"Resuming halving search at rung {state['rung']} "
+                      f"({len(state['survivors'])} candidates left).")
+        elif checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        
+        def save_state():
+            if state_path:
+                tmp_path = state_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(state, f, indent=2)
+                os.replace(tmp_path, state_path)
+        
+        while True:
+            rung = state['rung']
+            n_trees = min(min_estimators * eta ** rung, max_estimators)
+            rung_scores = state['scores'].setdefault(str(rung), {})
+            for cid in state['survivors']:
+                if str(cid) in rung_scores:
+                    continue
+                model = models.get(cid)
+                if model is None or model.n_estimators > n_trees:
+                    model = RandomForestRegressor(random_state=self.random_state, n_jobs=-1,
+                                                  warm_start=True, **settings['candidates'][cid])
+                model.set_params(n_estimators=n_trees)
+                model.fit(X_train, y_train)
+                models[cid] = model
+                rung_scores[str(cid)] = r2_score(y_val, model.predict(X_val))
+                if checkpoint_dir:
+                    joblib.dump(model, os.path.join(checkpoint_dir, f'candidate_{cid}.joblib'))
+                save_state()
+            
+            ranked = sorted(state['survivors'], key=lambda cid: rung_scores[str(cid)], reverse=True)
+            print(f"Rung {rung}: {len(ranked)} candidates x {n_trees} trees, "
+                  f"best r2 = {rung_scores[str(ranked[0])]:.4f}")
+            if len(ranked) == 1 or n_trees >= max_estimators:
+                best = ranked[0]
+                break
+            survivors = ranked[:max(1, int(np.ceil(len(ranked) / eta)))]
+            for cid in set(state['survivors']) - set(survivors):
+                models.pop(cid, None)
+                if checkpoint_dir:
+                    model_path = os.path.join(checkpoint_dir, f'candidate_{cid}.joblib')
+                    if os.path.exists(model_path):
+                        os.remove(model_path)
+            state['survivors'] = survivors
+            state['rung'] = rung + 1
+            save_state()
+        
+        best_model = models[best].set_params(warm_start=False)
+        best_params = dict(settings['candidates'][best], n_estimators=best_model.n_estimators)
+        print("Best parameters (successive halving):", best_params)
+        print("Best score:", state['scores'][str(state['rung'])][str(best)])
+        self.model = best_model
+        return best_params
+    
     def train(self, X, y, test_size=0.2, n_bins=5):
         """
         Train the Random Forest model using stratified splitting based on quantile bins of y.
         
         Parameters:
-            X (ndarray): Feature matrix.
+            X (ndarray or CompactFeatures): Feature matrix.
             y (ndarray): Target vector (pIC50).
             test_size (float): Proportion of the dataset to include in the test split.
             n_bins (int): Number of quantile bins for stratification.
+        
+        If the model is served by the XGBoost backend, the booster is retrained on the
+        same split and the inference backend is selected again.
         """
-        X_scaled = self.scaler.fit_transform(X)
+        X_scaled = self._fit_transform(X)
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
         # Use pd.qcut to create bins with roughly equal numbers of samples
         y_binned = pd.qcut(y, q=n_bins, labels=False, duplicates='drop')
         X_train, X_test, y_train, y_test = train_test_split(
             X_scaled, y, test_size=test_size, random_state=self.random_state, stratify=y_binned
         )
-        self.model.fit(X_train, y_train)
+        fit_start = time.perf_counter()
+        self.model.fit(self._fit_matrix(X_train), y_train)
+        self._record_lineage('full', n_rows=len(y), n_total_rows=len(y),
+                             seconds=time.perf_counter() - fit_start)
+        if getattr(self, 'inference_backend', 'sklearn') == 'flat':
+            self.set_inference_backend('flat')
         y_train_pred = self.model.predict(X_train)
         y_test_pred = self.model.predict(X_test)
         
@@ -224,20 +529,227 @@ class SMILEStoIC50Predictor:
         self.X_train, self.X_test = X_train, X_test
         self.y_train, self.y_test = y_train, y_test
         self.y_train_pred, self.y_test_pred = y_train_pred, y_test_pred
+        if getattr(self, 'inference_backend', 'sklearn') == 'xgboost':
+            # 이전 부스터는 새 스케일러/데이터와 맞지 않으므로 함께 다시 학습하고 백엔드를 다시 고른다
+            self.train_xgboost(X, y, test_size=test_size, n_bins=n_bins)
+            self.select_inference_backend()
         return metrics
     
-    def train_xgboost(self, X, y, test_size=0.2):
+    def _record_lineage(self, kind, n_rows, n_total_rows, seconds, **extra):
+        """Append an entry to self.lineage and give the model a new version."""
+        lineage = self.__dict__.setdefault('lineage', [])
+        entry = {
+            'version': len(lineage) + 1,
+            'kind': kind,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'n_rows': n_rows,
+            'n_total_rows': n_total_rows,
+            'n_trees': len(self.model.estimators_),
+            'seconds': seconds,
+        }
+        entry.update(extra)
+        lineage.append(entry)
+        self.model_version = f"v{entry['version']}-{kind}-{int(time.time())}"
+        return entry
+    
+    def _last_full_build(self):
+        return next((entry for entry in reversed(getattr(self, 'lineage', [])) if entry['kind'] == 'full'), None)
+    
+    def needs_rebuild(self, rebuild_every):
+        """True once `rebuild_every` incremental updates have been applied since the last full build."""
+        lineage = getattr(self, 'lineage', [])
+        n_updates = 0
+        for entry in reversed(lineage):
+            if entry['kind'] == 'full':
+                break
+            n_updates += 1
+        return not lineage or n_updates >= rebuild_every
+    
+    def update(self, smiles_list, ic50_list, n_new_trees=None, feature_store=None, n_jobs=-1,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Incrementally update the fitted forest with new measurements.
+        
+        Only the new rows are featurized (through feature_store if given). They are
+        scaled with the existing scaler, since refitting it would move the thresholds
+        the existing trees were grown on, and n_new_trees extra trees are fitted on
+        them with warm_start. By default the number of new trees is proportional to
+        the share of new rows, so each row keeps roughly the same weight in the average.
+        
+        Returns a report including the estimated time saved compared with a full
+        retrain from scratch (all rows featurized and the base forest refitted).
+        The featurization part of that estimate comes from a serial per-row timing
+        on a sample of the new rows, not from featurize_seconds, which includes
+        process-pool startup and is near zero when rows come from feature_store.
+        """
+        if not hasattr(self.model, 'estimators_'):
+            raise ValueError("update() needs a fitted forest; train the model first.")
+        start = time.perf_counter()
+        compact = getattr(self, 'feature_format', 'dense') == 'compact'
+        X, y, valid_indices = self.prepare_data(smiles_list, ic50_list, use_pic50=self.use_pic50,
+                                                n_jobs=n_jobs, chunk_size=chunk_size,
+                                                feature_store=feature_store, compact=compact)
+        featurize_seconds = time.perf_counter() - start
+        
+        last = getattr(self, 'lineage', [None])[-1]
+        # lineage가 없는 예전 모델은 스케일러가 본 샘플 수를 기존 데이터 크기로 쓴다
+        n_previous = last['n_total_rows'] if last else int(self.scaler.n_samples_seen_)
+        n_total = n_previous + len(y)
+        n_trees = len(self.model.estimators_)
+        if n_new_trees is None:
+            n_new_trees = max(1, int(round(n_trees * len(y) / n_previous)))
+        
+        fit_start = time.perf_counter()
+        # OOB 점수는 새 행만으로 다시 계산되어 의미가 없으므로 끈다
+        self.model.set_params(warm_start=True, oob_score=False, n_estimators=n_trees + n_new_trees)
+        self.model.fit(self._fit_matrix(self._transform(X)), y)
+        self.model.set_params(warm_start=False)
+        for stale in ('oob_score_', 'oob_prediction_'):
+            self.model.__dict__.pop(stale, None)
+        fit_seconds = time.perf_counter() - fit_start
+        backend = getattr(self, 'inference_backend', 'sklearn')
+        if backend == 'xgboost':
+            # 부스터는 새 데이터로 갱신되지 않으므로 갱신된 포레스트로 서빙한다
+            print("XGBoost model is not updated incrementally; switching the inference backend to 'flat'.")
+            backend = 'flat'
+        if backend == 'flat':
+            self.set_inference_backend('flat')
+        seconds = time.perf_counter() - start
+        
+        report = {'n_new_rows': len(y), 'n_new_trees': n_new_trees, 'n_trees': len(self.model.estimators_),
+                  'featurize_seconds': featurize_seconds, 'fit_seconds': fit_seconds, 'seconds': seconds,
+                  'full_retrain_estimate_seconds': None, 'seconds_saved': None}
+        base = self._last_full_build()
+        if base and base['seconds']:
+            # 전체 재학습 추정치: 모든 행 특징화 + 기존 크기 포레스트를 행 수에 비례해 다시 학습.
+            # 특징화는 풀 시작 비용 없이 워커 수만큼 완벽히 나눠진다고 보므로 절약 시간은 적게 잡힌다
+            sample = [smiles_list[i] for i in valid_indices[:COST_SAMPLE_ROWS]]
+            sample_start = time.perf_counter()
+            featurize_smiles(self, sample, n_jobs=1, compact=compact)
+            row_seconds = (time.perf_counter() - sample_start) / len(sample)
+            n_workers = min(joblib.effective_n_jobs(n_jobs or 1), -(-n_total // chunk_size))
+            estimate = row_seconds * n_total / n_workers + base['seconds'] * n_total / base['n_rows']
+            report['featurize_row_seconds'] = row_seconds
+            report['full_retrain_estimate_seconds'] = estimate
+            report['seconds_saved'] = estimate - seconds
+        self._record_lineage('incremental', n_rows=len(y), n_total_rows=n_total, seconds=seconds,
+                             n_new_trees=n_new_trees, seconds_saved=report['seconds_saved'])
+        if hasattr(self, 'training_smiles'):
+            self.training_smiles.extend(smiles_list[i] for i in valid_indices)
+        report['version'] = self.model_version
+        return report
+    
+    def rebuild(self, X, y, **train_kwargs):
+        """
+        Full retrain on all data (e.g. when needs_rebuild() says so). The forest is
+        reset to the size of the last full build before fitting, and an XGBoost
+        booster in use is retrained with it (see train()).
+        """
+        base = self._last_full_build()
+        if base:
+            self.model.set_params(n_estimators=base['n_trees'], warm_start=False,
+                                  oob_score=self.model.bootstrap)
+        return self.train(X, y, **train_kwargs)
+    
+    def build_reduced(self, X, y, k, max_descriptors=None, **train_kwargs):
+        """
+        Build and train a predictor that uses only the top-k features of this model by
+        forest importance, of which at most max_descriptors are descriptors (the most
+        important ones). X is the full feature matrix this model was trained on.
+        
+        Unselected fingerprint bits are dropped from the model input, and unselected
+        descriptors are not computed at all when featurizing. Hyperparameters and the
+        train/test split are the same as this model's, so train() metrics are comparable.
+        Returns (reduced predictor, train metrics).
+        """
+        top = np.argsort(self.model.feature_importances_)[::-1][:k]
+        selected_bits = getattr(self, 'selected_bits', None)
+        n_bits = self.fingerprint_nbits if selected_bits is None else len(selected_bits)
+        bits = np.sort(top[top < n_bits])
+        if selected_bits is not None:
+            bits = np.asarray(selected_bits)[bits]
+        # 중요도 순으로 자른 뒤 원래 열 순서로 되돌린다
+        descriptor_columns = np.sort((top[top >= n_bits] - n_bits)[:max_descriptors])
+        
+        reduced = SMILEStoIC50Predictor(
+            random_state=self.random_state, fingerprint_radius=self.fingerprint_radius,
+            fingerprint_nbits=self.fingerprint_nbits, use_descriptors=len(descriptor_columns) > 0,
+            descriptor_names=[self.descriptor_names[i] for i in descriptor_columns])
+        reduced.model = clone(self.model).set_params(warm_start=False)
+        reduced.selected_bits = bits.astype(np.intp)
+        reduced.inference_backend = getattr(self, 'inference_backend', 'sklearn')
+        if reduced.inference_backend == 'xgboost':
+            reduced.inference_backend = 'flat'
+        
+        # 선택된 기술자 열만 남긴 특징 행렬 (비트는 전체를 넘기고 _select_bits에서 고른다)
+        if isinstance(X, CompactFeatures):
+            X_reduced = CompactFeatures(X.bits, X.descriptors[:, descriptor_columns], X.nbits)
+        else:
+            X_reduced = X[:, np.concatenate([np.arange(self.fingerprint_nbits),
+                                             self.fingerprint_nbits + descriptor_columns])]
+        metrics = reduced.train(X_reduced, y, **train_kwargs)
+        reduced.use_pic50 = self.use_pic50
+        return reduced, metrics
+    
+    def reduced_model_report(self, X, y, ks=(64, 128, 256, 512), descriptor_counts=(None,),
+                             smiles_sample=None, n_latency=200):
+        """
+        Accuracy vs latency/memory of reduced models for each k in ks and each descriptor
+        cap in descriptor_counts (None = no cap), next to this model.
+        Latency is end-to-end single-molecule prediction (featurize + predict) over
+        smiles_sample; memory is the size of the flattened forest plus the model input row.
+        Returns (rows, {(k, max_descriptors): reduced predictor}).
+        """
+        def measure(predictor, label, k, metrics):
+            row = {'model': label, 'k': k,
+                   'n_descriptors': len(predictor.descriptor_names) if predictor.use_descriptors else 0,
+                   'test_r2': metrics['test_r2'], 'test_rmse': metrics['test_rmse']}
+            forest = getattr(predictor, '_flat_forest', None) or FlatForest.from_sklearn(predictor.model)
+            row['forest_mb'] = sum(getattr(forest, name).nbytes for name in
+                                   ('feature', 'threshold', 'left', 'right', 'value')) / 1e6
+            row['input_row_bytes'] = predictor.n_model_features * 4
+            if smiles_sample:
+                seconds = []
+                for smiles in smiles_sample[:n_latency]:
+                    start = time.perf_counter()
+                    predictor.predict_with_indices([smiles], n_jobs=1)
+                    seconds.append(time.perf_counter() - start)
+                row['single_p50_ms'] = float(np.median(seconds)) * 1000
+            return row
+        
+        y_pred = self._forest_predict(self.X_test, 'sklearn' if hasattr(self.model, 'estimators_') else None)
+        full_metrics = {'test_r2': r2_score(self.y_test, y_pred),
+                        'test_rmse': np.sqrt(mean_squared_error(self.y_test, y_pred))}
+        rows = [measure(self, 'full', self.n_model_features, full_metrics)]
+        reduced_models = {}
+        for k in ks:
+            for max_descriptors in descriptor_counts:
+                reduced, metrics = self.build_reduced(X, y, k, max_descriptors=max_descriptors)
+                reduced_models[(k, max_descriptors)] = reduced
+                label = f'top-{k}' if max_descriptors is None else f'top-{k}/d{max_descriptors}'
+                rows.append(measure(reduced, label, k, metrics))
+        return rows, reduced_models
+    
+    def train_xgboost(self, X, y, test_size=0.2, n_bins=5):
         """
         Train an XGBoost model and evaluate its performance.
+        The split is the same stratified split as train(), so the model can be compared
+        with the forest (compare_backends) and kept as self.xgb_model for serving.
         """
-        X_scaled = self.scaler.fit_transform(X)
+        import xgboost as xgb
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        X_scaled = self._fit_transform(X)
+        y_binned = pd.qcut(y, q=n_bins, labels=False, duplicates='drop')
         X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y, test_size=test_size, random_state=self.random_state
+            X_scaled, y, test_size=test_size, random_state=self.random_state, stratify=y_binned
         )
         model_xgb = xgb.XGBRegressor(random_state=self.random_state, n_jobs=-1)
-        model_xgb.fit(X_train, y_train)
-        y_train_pred = model_xgb.predict(X_train)
-        y_test_pred = model_xgb.predict(X_test)
+        # 희소 입력에서는 0이 결측값으로 취급되므로 dense float32로 학습한다
+        model_xgb.fit(self._fit_matrix(X_train), y_train)
+        self.xgb_model = model_xgb
+        y_train_pred = self._forest_predict(X_train, 'xgboost')
+        y_test_pred = self._forest_predict(X_test, 'xgboost')
         metrics = {
             'train_r2': r2_score(y_train, y_train_pred),
             'test_r2': r2_score(y_test, y_test_pred),
@@ -248,54 +760,115 @@ class SMILEStoIC50Predictor:
         }
         return metrics, model_xgb, X_train, X_test, y_train, y_test, y_train_pred, y_test_pred
     
-    def cross_validate(self, X, y, cv=5):
+    def cross_validate(self, X, y, cv=5, n_jobs=-1):
         """
         Perform cross-validation on the Random Forest model.
+        
+        Each fold is fitted once, with the scaler fitted on the training part of the
+        fold only, and r2/RMSE/MAE are all computed from the same predictions.
+        Folds run in parallel threads (tree building releases the GIL).
         """
-        X_scaled = self.scaler.fit_transform(X)
+        from sklearn.model_selection import KFold
+        start = time.perf_counter()
         kf = KFold(n_splits=cv, shuffle=True, random_state=self.random_state)
-        r2_scores = cross_val_score(self.model, X_scaled, y, cv=kf, scoring='r2')
-        neg_mse_scores = cross_val_score(self.model, X_scaled, y, cv=kf, scoring='neg_mean_squared_error')
-        rmse_scores = np.sqrt(-neg_mse_scores)
-        mae_scores = -cross_val_score(self.model, X_scaled, y, cv=kf, scoring='neg_mean_absolute_error')
+        n_workers = min(cv, os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        folds = Parallel(n_jobs=n_workers, prefer='threads')(
+            delayed(self._cross_validate_fold)(X, y, train_idx, test_idx, single_threaded=n_workers != 1)
+            for train_idx, test_idx in kf.split(np.arange(len(y)))
+        )
+        r2_scores = np.array([fold['r2'] for fold in folds])
+        rmse_scores = np.array([fold['rmse'] for fold in folds])
+        mae_scores = np.array([fold['mae'] for fold in folds])
         metrics = {
             'cv_r2_mean': np.mean(r2_scores),
             'cv_r2_std': np.std(r2_scores),
             'cv_rmse_mean': np.mean(rmse_scores),
             'cv_rmse_std': np.std(rmse_scores),
             'cv_mae_mean': np.mean(mae_scores),
-            'cv_mae_std': np.std(mae_scores)
+            'cv_mae_std': np.std(mae_scores),
+            'fold_fit_times': [fold['fit_time'] for fold in folds],
+            'fold_predict_times': [fold['predict_time'] for fold in folds],
+            'cv_wall_time': time.perf_counter() - start
         }
         return metrics
     
-    def predict(self, smiles_list):
+    def _cross_validate_fold(self, X, y, train_idx, test_idx, single_threaded=True):
+        """Fit one CV fold (scaler + forest) and score it on the held-out part."""
+        model = clone(self.model).set_params(oob_score=False)
+        if single_threaded:
+            # 폴드끼리 병렬로 돌기 때문에 각 forest는 스레드 하나만 사용
+            model.set_params(n_jobs=1)
+        scaler = StandardScaler()
+        start = time.perf_counter()
+        X_train = self._model_input(X[train_idx], scaler, fit=True)
+        model.fit(self._fit_matrix(X_train), y[train_idx])
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        y_pred = model.predict(self._model_input(X[test_idx], scaler))
+        predict_time = time.perf_counter() - start
+        y_test = y[test_idx]
+        return {
+            'r2': r2_score(y_test, y_pred),
+            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+            'mae': mean_absolute_error(y_test, y_pred),
+            'fit_time': fit_time,
+            'predict_time': predict_time
+        }
+    
+    def predict_with_indices(self, smiles_list, n_jobs=-1, chunk_size=DEFAULT_CHUNK_SIZE, pool=None):
         """
         Predict IC50 values for new SMILES strings.
+        Returns the predictions and the indices into smiles_list of the valid molecules.
+        `pool` (from batch_featurizer.featurizer_pool) is reused instead of starting one per call.
         """
-        valid_smiles = []
-        features_list = []
-        for smiles in smiles_list:
-            mol = self._smiles_to_mol(smiles)
-            if mol is not None:
-                features = self._mol_to_features(mol)
-                if features is not None:
-                    features_list.append(features)
-                    valid_smiles.append(smiles)
-        if not features_list:
+        smiles_list = list(smiles_list)
+        compact = getattr(self, 'feature_format', 'dense') == 'compact'
+        with ic50_stage_seconds.time(stage='featurize'):
+            X, valid_indices = featurize_smiles(self, smiles_list, n_jobs=n_jobs,
+                                                chunk_size=chunk_size, compact=compact, pool=pool)
+        if not valid_indices:
             return [], []
-        X = np.vstack(features_list)
-        X_scaled = self.scaler.transform(X)
+        return self._predict_features(X), valid_indices
+    
+    def predict_mols(self, mols):
+        """
+        Predict IC50 values for RDKit Mol objects that are already parsed and sanitized,
+        without a SMILES round trip. Returns the predictions and the indices of the
+        non-None molecules.
+        """
+        compact = getattr(self, 'feature_format', 'dense') == 'compact'
+        with ic50_stage_seconds.time(stage='featurize'):
+            X, valid_indices = featurize_mols(self, list(mols), compact=compact)
+        if not valid_indices:
+            return [], []
+        return self._predict_features(X), valid_indices
+    
+    def _predict_features(self, X):
+        with ic50_stage_seconds.time(stage='scale'):
+            X_scaled = self._transform(X)
+        with ic50_stage_seconds.time(stage='forest'):
+            raw_predictions = self._forest_predict(X_scaled)
         if self.use_pic50:
-            pic50_predictions = self.model.predict(X_scaled)
-            predictions = [self._convert_to_ic50(pic50) for pic50 in pic50_predictions]
-        else:
-            predictions = self.model.predict(X_scaled)
+            with ic50_stage_seconds.time(stage='ic50_conversion'):
+                return [self._convert_to_ic50(pic50) for pic50 in raw_predictions]
+        return raw_predictions
+    
+    def predict(self, smiles_list, n_jobs=-1, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Predict IC50 values for new SMILES strings.
+        """
+        smiles_list = list(smiles_list)
+        predictions, valid_indices = self.predict_with_indices(smiles_list, n_jobs=n_jobs,
+                                                               chunk_size=chunk_size)
+        valid_smiles = [smiles_list[i] for i in valid_indices]
         return predictions, valid_smiles
     
     def plot_actual_vs_predicted(self):
         """
         Plot actual vs. predicted values for training and test sets.
         """
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
         sns.scatterplot(x=self.y_train, y=self.y_train_pred, alpha=0.6, ax=ax1)
         ax1.set_xlabel('Actual')
@@ -319,13 +892,10 @@ class SMILEStoIC50Predictor:
         """
         Plot the top important features from the Random Forest model.
         """
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         importances = self.model.feature_importances_
-        if self.use_descriptors:
-            n_fingerprints = self.fingerprint_nbits
-            feature_names = [f'Bit_{i}' for i in range(n_fingerprints)]
-            feature_names.extend(self.descriptor_names)
-        else:
-            feature_names = [f'Bit_{i}' for i in range(len(importances))]
+        feature_names = self.feature_names()
         indices = np.argsort(importances)[::-1][:n_features]
         top_names = [feature_names[i] for i in indices]
         top_importances = importances[indices]
@@ -0,0 +1,139 @@
+# image_preprocess.py
+import time
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageOps
+
+MAX_SIDE = 1024
+INK_THRESHOLD = 200
+CROP_MARGIN = 0.05
+EXIF_ORIENTATION = 0x0112
+# OpenCV의 8비트 cv2.COLOR_BGR2GRAY 고정소수점 계수 (B, G, R 순서, 합이 1 << 15)
+BGR2GRAY_COEFFS = (3735, 19235, 9798)
+
+
+class StageTimer:
+    """Collects per-stage wall times in milliseconds."""
+
+    def __init__(self):
+        self.timings = {}
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self._last) * 1000, 3)
+        self._last = now
+
+    def total(self):
+        self.timings['total'] = round((time.perf_counter() - self._start) * 1000, 3)
+        return self.timings
+
+
+def ink_bounding_box(gray, threshold=INK_THRESHOLD, margin=CROP_MARGIN, min_fraction=0.002):
+    """
+    Bounding box (left, top, right, bottom) of the dark pixels in a grayscale array,
+    padded by `margin` of its size. Rows/columns with fewer than `min_fraction` dark
+    pixels are treated as noise. Returns None if no structure is found.
+    """
+    ink = gray < threshold
+    rows = np.flatnonzero(ink.sum(axis=1) > min_fraction * gray.shape[1])
+    cols = np.flatnonzero(ink.sum(axis=0) > min_fraction * gray.shape[0])
+    if not len(rows) or not len(cols):
+        return None
+    pad_y = int((rows[-1] - rows[0] + 1) * margin)
+    pad_x = int((cols[-1] - cols[0] + 1) * margin)
+    return (max(cols[0] - pad_x, 0), max(rows[0] - pad_y, 0),
+            min(cols[-1] + 1 + pad_x, gray.shape[1]), min(rows[-1] + 1 + pad_y, gray.shape[0]))
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def flatten_alpha(image, background=255):
+    """Composite an image with transparency onto a white background (RGB result)."""
+    rgba = image.convert('RGBA')
+    flat = Image.new('RGB', rgba.size, (background,) * 3)
+    flat.paste(rgba, mask=rgba.getchannel('A'))
+    return flat
+
+
+def to_grayscale(image):
+    """
+    Grayscale an image the way DECIMER does: cv2.COLOR_BGR2GRAY applied to the RGB
+    array (so red gets OpenCV's blue weight and blue its red weight), computed with
+    OpenCV's fixed-point coefficients so the values match cv2 exactly. DECIMER's own
+    conversion then leaves the result unchanged.
+    """
+    rgb = np.asarray(image.convert('RGB'), dtype=np.uint32)
+    first, second, third = BGR2GRAY_COEFFS
+    gray = (rgb[..., 0] * first + rgb[..., 1] * second + rgb[..., 2] * third + (1 << 14)) >> 15
+    return Image.fromarray(gray.astype(np.uint8))
+
+
+def preprocess_image(data, max_side=MAX_SIDE, grayscale=True, crop=True):
+    """
+    Prepare uploaded image bytes for DECIMER.
+
+    JPEGs are decoded with draft mode, so a multi-megapixel photo is scaled down
+    inside the decoder. The image is then EXIF-rotated, flattened onto white if it
+    has transparency, grayscaled with DECIMER's weights (to_grayscale),
+    downscaled to fit max_side and cropped to the ink bounding box. If none of that changes the image, the original bytes are
+    returned untouched (as a BytesIO) so nothing is re-encoded. Otherwise the
+    decoded uint8 array is returned.
+
+    Returns:
+        payload (BytesIO or ndarray): Input for DECIMER's predict_SMILES.
+        timings (dict): Milliseconds spent in each stage.
+    """
+    timer = StageTimer()
+    image = Image.open(BytesIO(data))
+    original_format, original_size = image.format, image.size
+    timer.mark('open')
+
+    if image.format == 'JPEG':
+        # 'L'로 디코딩하면 libjpeg의 휘도 가중치가 쓰이므로 색 공간은 그대로 두고 크기만 줄인다
+        image.draft(image.mode, (max_side, max_side))
+    image.load()
+    timer.mark('decode')
+
+    changed = image.size != original_size
+    # exif_transpose는 회전할 게 없어도 복사본을 돌려주므로 방향 태그가 있을 때만 부른다
+    if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+        image, changed = ImageOps.exif_transpose(image), True
+    if has_alpha(image):
+        # 투명 배경에 그린 구조식은 알파를 버리면 전부 검게 나오므로 흰 배경 위에 합성한다
+        image, changed = flatten_alpha(image), True
+    if grayscale and image.mode != 'L':
+        image, changed = to_grayscale(image), True
+    timer.mark('grayscale')
+
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        changed = True
+    timer.mark('downscale')
+
+    array = np.asarray(image)
+    if crop:
+        gray = array if array.ndim == 2 else np.asarray(to_grayscale(image))
+        box = ink_bounding_box(gray)
+        if box is not None and box != (0, 0, gray.shape[1], gray.shape[0]):
+            array = array[box[1]:box[3], box[0]:box[2]]
+            changed = True
+    timer.mark('crop')
+
+    if not changed and original_format in ('PNG', 'JPEG'):
+        # 바뀐 게 없으면 업로드된 바이트를 그대로 넘겨 재인코딩을 피한다
+        payload = BytesIO(data)
+    else:
+        payload = np.ascontiguousarray(array)
+    timer.mark('handoff')
+    return payload, timer.total()
+
+
+def encode_png(array):
+    """PNG-encode a decoded image array (fallback for DECIMER versions that only take files)."""
+    buf = BytesIO()
+    Image.fromarray(array).save(buf, format='PNG')
+    buf.seek(0)
+    return buf
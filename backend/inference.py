@@ -1,16 +1,100 @@
 # inference.py
+import os
+import threading
+import time
+import numpy as np
 from PIL import Image
 from io import BytesIO
-from DECIMER import predict_SMILES  # ✅ 올바른 함수 이름으로 불러오기
+from image_preprocess import preprocess_image, encode_png
+from model_registry import registry
+from metrics import metrics, image_stage_seconds
 
-def img_to_smiles(image: Image.Image) -> str:
+# IMAGE_MODEL=stub 이면 DECIMER(TensorFlow)를 불러오지 않고 고정 SMILES를 돌려주는 대체 모델을 사용 (로컬 테스트용)
+IMAGE_MODEL = os.environ.get('IMAGE_MODEL', 'decimer')
+STUB_SMILES = os.environ.get('IMAGE_MODEL_STUB_SMILES', 'c1ccccc1O')
+# DECIMER_RUNTIME=tflite 이면 양자화된 TFLite 모델(decimer_optimized.py export로 생성)을 사용.
+# 원본과의 비교(decimer_optimized.py check)를 통과한 모델만 로드되므로 기본값은 원본 TF 모델
+DECIMER_RUNTIME = os.environ.get('DECIMER_RUNTIME', 'tf')
+
+
+def _load_decimer():
+    # TensorFlow/DECIMER는 import만으로 수 초가 걸리므로 처음 쓸 때(또는 warm-up 때) 불러온다
+    from decimer_optimized import accepts_arrays, load_predictor
+    predict_SMILES = load_predictor(DECIMER_RUNTIME)  # ✅ predict_SMILES와 같은 방식으로 호출
+    if accepts_arrays(DECIMER_RUNTIME):
+        return predict_SMILES
+    # 배열 입력을 받지 못하는 DECIMER 버전이면 전처리한 배열을 PNG로 인코딩해서 넘긴다
+    print("⚠️ 설치된 DECIMER는 이미지 배열을 받지 않아 전처리 결과를 PNG로 다시 인코딩합니다.")
+    return lambda image: predict_SMILES(encode_png(image) if isinstance(image, np.ndarray) else image)
+
+
+registry.register('decimer', _load_decimer)
+
+
+def _decimer_predict(image):
+    return registry.get('decimer')(image)  # ✅ 여기서 get_prediction 말고 predict_SMILES 사용
+
+
+if IMAGE_MODEL == 'stub':
+    registry.register('decimer', lambda: lambda image: STUB_SMILES)
+
+# DECIMER의 SavedModel은 이미지 한 장(배치 1)으로 추적된 디코딩 루프라 여러 장을 묶어 넣을 수 없다.
+# 대신 디코딩을 한 번에 하나씩 돌려 요청 스레드들의 TF 연산이 코어를 두고 다투지 않게 한다
+# (TFLite 인터프리터는 스레드 안전하지도 않다).
+_decode_lock = threading.Lock()
+_waiting_lock = threading.Lock()
+_waiting = 0
+
+
+def _waiting_count():
+    return _waiting
+
+
+def _decode_one_at_a_time(image):
+    global _waiting
+    with _waiting_lock:
+        _waiting += 1
+    with _decode_lock:
+        with _waiting_lock:
+            _waiting -= 1
+        return _decimer_predict(image)
+
+
+decode_failures = metrics.counter('decimer_failures_total', 'Image decodes that failed or returned no SMILES.')
+metrics.gauge('decimer_queue_length', 'Images waiting for the DECIMER decoder.', function=_waiting_count)
+
+
+def img_to_smiles_with_timings(data: bytes):
+    """
+    Decode image bytes to SMILES via the preprocessing pipeline and DECIMER, one decode at a time.
+    Returns the SMILES and per-stage timings in milliseconds.
+    """
+    payload, timings = preprocess_image(data)
+    start = time.perf_counter()
     try:
-        # PIL 이미지를 BytesIO 객체로 변환해서 DECIMER에 전달
-        buf = BytesIO()
-        image.save(buf, format='PNG')
-        buf.seek(0)
+        smiles = _decode_one_at_a_time(payload)
+    except Exception:
+        decode_failures.inc()
+        raise
+    if not smiles:
+        decode_failures.inc()
+    timings['decimer'] = round((time.perf_counter() - start) * 1000, 3)
+    timings['total'] = round(timings['total'] + timings['decimer'], 3)
+    for stage, ms in timings.items():
+        image_stage_seconds.observe(ms / 1000, stage=stage)
+    return smiles, timings
 
-        smiles = predict_SMILES(buf)  # ✅ 여기서 get_prediction 말고 predict_SMILES 사용
+
+def img_to_smiles(image) -> str:
+    try:
+        if isinstance(image, Image.Image):
+            # PIL 이미지로 받은 경우(예전 호출 방식)만 PNG 바이트로 변환
+            buf = BytesIO()
+            image.save(buf, format='PNG')
+            data = buf.getvalue()
+        else:
+            data = image
+        smiles, _ = img_to_smiles_with_timings(data)
         return smiles
     except Exception as e:
         print(f"예측 중 오류 발생: {e}")
@@ -0,0 +1,173 @@
+# leaderboard_store.py
+import bisect
+import contextlib
+import fcntl
+import json
+import os
+import sys
+import threading
+
+
+class LeaderboardStore:
+    """
+    Leaderboard backed by an append-only JSON-lines log and an in-memory index
+    sorted by IC50 (lower is better, ties broken by submission order).
+
+    Every submission appends one line under an exclusive lock on a separate
+    `<log>.lock` file, so writes from several threads or worker processes never
+    overwrite each other (the log itself cannot carry the lock: compaction replaces
+    it, and a writer waiting on the old file would append to the unlinked copy).
+    Before reading or writing, the store picks up lines appended by other processes
+    since its last read. Periodic compaction rewrites the log without torn/invalid lines and in rank
+    order, so a fresh process can build its index in one pass.
+    """
+
+    def __init__(self, log_path, compact_every=1000):
+        self.log_path = log_path
+        self.lock_path = log_path + '.lock'
+        self.compact_every = compact_every
+        self._entries = []
+        self._order = []
+        self._offset = 0
+        self._inode = None
+        self._generation = None
+        self._appends = 0
+        self._lock = threading.RLock()
+        with self._lock:
+            self._refresh()
+
+    def _reset(self):
+        self._entries = []
+        self._order = []
+        self._offset = 0
+
+    def _index(self, entry):
+        seq = len(self._entries)
+        self._entries.append(entry)
+        key = (float(entry['ic50']), seq)
+        if not self._order or key >= self._order[-1]:
+            self._order.append(key)
+        else:
+            bisect.insort(self._order, key)
+
+    def _read_generation(self):
+        # compaction 횟수. 교체된 로그가 예전 inode 번호를 다시 받을 수 있어 inode만으로는 부족하다
+        try:
+            with open(self.lock_path, 'rb') as f:
+                return f.read().strip() or b'0'
+        except FileNotFoundError:
+            return b'0'
+
+    def _refresh(self):
+        """Index log lines written since the last read (by this or another process)."""
+        generation = self._read_generation()
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._reset()
+            self._inode = None
+            return
+        if stat.st_ino != self._inode or generation != self._generation or stat.st_size < self._offset:
+            # 다른 프로세스가 compaction으로 파일을 교체했으면 처음부터 다시 읽는다
+            self._reset()
+            self._inode = stat.st_ino
+            self._generation = generation
+        if stat.st_size == self._offset:
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # 아직 쓰는 중인 줄
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line)
+                    float(entry['ic50'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self._index(entry)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, 'ab') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add(self, entry):
+        """Append an entry and return its 0-based rank."""
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            with self._file_lock():
+                self._refresh()
+                with open(self.log_path, 'ab') as f:
+                    f.write(line)
+                    f.flush()
+                    self._inode = os.fstat(f.fileno()).st_ino
+                self._offset += len(line)
+                self._index(entry)
+            rank = bisect.bisect_left(self._order, (float(entry['ic50']), len(self._entries) - 1))
+            self._appends += 1
+            if self.compact_every and self._appends >= self.compact_every:
+                self.compact()
+            return rank
+
+    def top(self, n=None, offset=0):
+        """Entries ranked offset..offset+n (all remaining if n is None)."""
+        with self._lock:
+            self._refresh()
+            end = None if n is None else offset + n
+            return [self._entries[seq] for _, seq in self._order[offset:end]]
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    def compact(self):
+        """Rewrite the log in rank order without invalid lines, atomically."""
+        with self._lock:
+            with self._file_lock():
+                self._refresh()
+                tmp_path = self.log_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    for _, seq in self._order:
+                        f.write((json.dumps(self._entries[seq], ensure_ascii=False) + '\n').encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                # 교체 전에 세대를 올린다: 그 사이에 읽는 쪽은 기존 로그를 처음부터 다시 읽을 뿐이다
+                generation = str(int(self._read_generation()) + 1).encode()
+                with open(self.lock_path, 'wb') as f:
+                    f.write(generation)
+                os.replace(tmp_path, self.log_path)
+                self._reset()
+                self._inode = None
+                self._refresh()
+            self._appends = 0
+
+
+def migrate_json(json_path, log_path):
+    """
+    Import the old leaderboard.json (one JSON list) into a new append-only log.
+    Does nothing if the log already exists. Returns the number of imported entries.
+    """
+    if os.path.exists(log_path) or not os.path.exists(json_path):
+        return 0
+    with open(json_path, 'r') as f:
+        entries = json.load(f)
+    tmp_path = log_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, log_path)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    # 사용법: python leaderboard_store.py leaderboard.json leaderboard.jsonl
+    if len(sys.argv) != 3:
+        print("usage: python leaderboard_store.py <leaderboard.json> <leaderboard.jsonl>")
+        sys.exit(1)
+    print(f"✅ {migrate_json(sys.argv[1], sys.argv[2])}개 기록을 옮겼습니다.")
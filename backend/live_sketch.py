@@ -0,0 +1,155 @@
+# live_sketch.py
+import json
+import threading
+import time
+from metrics import metrics
+from serving_limits import Overloaded
+
+SESSION_TTL = 300
+HEARTBEAT_SECONDS = 15
+
+superseded_total = metrics.counter('live_sketch_superseded_total',
+                                   'Sketch versions dropped because a newer edit arrived.', ['stage'])
+
+
+class Superseded(Exception):
+    """A newer edit arrived for the session while this version was being computed."""
+
+
+class SketchSession:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.version = 0
+        self.mol_block = None
+        self.result = None
+        self.scheduled = False
+        self.listeners = 0
+        self.last_seen = time.monotonic()
+        self.condition = threading.Condition()
+
+
+class LiveSketchHub:
+    """
+    Per-session live prediction for the molecule sketcher.
+
+    Each edit bumps the session's version. While an SSE stream for the session is
+    open in this process, edits are computed in the background on `executor`: at
+    most one job per session is queued or running, and it always picks up the
+    latest MolBlock when it starts, so rapid edits collapse into one computation.
+    A running job checks between stages whether it has been superseded and drops
+    its work if so; only results for the current version are published.
+
+    `compute(mol_block, check)` does the work and calls `check()` between stages.
+    """
+
+    def __init__(self, compute, executor, session_ttl=SESSION_TTL):
+        self.compute = compute
+        self.executor = executor
+        self.session_ttl = session_ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+        metrics.gauge('live_sketch_sessions', 'Live sketch sessions in this process.',
+                      function=lambda: len(self._sessions))
+
+    def _session(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            for sid, session in list(self._sessions.items()):
+                if session.listeners == 0 and now - session.last_seen > self.session_ttl:
+                    del self._sessions[sid]
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = SketchSession(session_id)
+            session.last_seen = now
+            return session
+
+    def has_listener(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session is not None and session.listeners > 0
+
+    def submit(self, session_id, mol_block):
+        """Record a new edit and schedule it for the open stream. Returns its version."""
+        session = self._session(session_id)
+        with session.condition:
+            session.version += 1
+            session.mol_block = mol_block
+            version = session.version
+            if session.scheduled:
+                return version
+            session.scheduled = True
+        try:
+            self.executor.submit(self._run, session)
+        except Overloaded:
+            with session.condition:
+                session.scheduled = False
+                session.result = {'version': version, 'error': 'overloaded'}
+                session.condition.notify_all()
+        return version
+
+    def compute_now(self, session_id, mol_block):
+        """
+        Compute an edit synchronously (used when the stream lives in another worker
+        process). Raises Superseded if a newer edit for the session arrives first.
+        """
+        session = self._session(session_id)
+        with session.condition:
+            session.version += 1
+            session.mol_block = mol_block
+            version = session.version
+        result = self.compute(mol_block, lambda stage: self._check(session, version, stage))
+        result['version'] = version
+        return result
+
+    def _check(self, session, version, stage):
+        if session.version != version:
+            superseded_total.inc(stage=stage)
+            raise Superseded()
+
+    def _run(self, session):
+        while True:
+            with session.condition:
+                version, mol_block = session.version, session.mol_block
+            try:
+                result = self.compute(mol_block, lambda stage: self._check(session, version, stage))
+            except Superseded:
+                result = None
+            except Exception as e:
+                result = {'error': str(e)}
+            with session.condition:
+                if result is not None and session.version == version:
+                    result['version'] = version
+                    session.result = result
+                    session.condition.notify_all()
+                if session.version == version:
+                    session.scheduled = False
+                    return
+            # 계산하는 동안 새 편집이 들어왔으면 최신 버전으로 다시 계산한다
+
+    def events(self, session_id, heartbeat=HEARTBEAT_SECONDS):
+        """
+        Server-sent events for the session: one 'prediction' event per published result
+        ({version, smiles, ic50, nearest}, or {version, error} if the MolBlock failed).
+        """
+        session = self._session(session_id)
+        with session.condition:
+            session.listeners += 1
+            sent = None
+        try:
+            yield f"event: ready\ndata: {json.dumps({'session': session_id})}\n\n"
+            while True:
+                with session.condition:
+                    if session.result is sent:
+                        session.condition.wait(timeout=heartbeat)
+                    result = session.result
+                session.last_seen = time.monotonic()
+                if result is sent:
+                    # 연결 유지용 주석 (프록시가 끊지 않도록)
+                    yield ": keepalive\n\n"
+                    continue
+                sent = result
+                # 실패도 'prediction' 이벤트로 보낸다 ('error'는 EventSource의 연결 오류 이벤트 이름)
+                yield f"event: prediction\ndata: {json.dumps(result)}\n\n"
+        finally:
+            with session.condition:
+                session.listeners -= 1
@@ -0,0 +1,290 @@
+# metrics.py
+# serve.py처럼 워커가 여러 프로세스이면 share()로 공유 디렉터리를 지정한다. 각 워커가 자기 값을
+# 주기적으로 파일에 써 두고, /metrics를 받은 워커가 모든 워커의 값을 합쳐서 보여준다.
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 초 단위 지연 시간 버킷 (0.5ms ~ 30s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 공유 디렉터리에 각 워커의 값을 쓰는 주기 (다른 워커의 값은 이만큼 늦게 보인다)
+SHARE_INTERVAL = float(os.environ.get('METRICS_SHARE_INTERVAL', 1.0))
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self, data=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples(self.snapshot() if data is None else data))
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values = {} if self.labelnames else {(): 0}
+
+    def snapshot(self):
+        """Current values as {label values: value}."""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+    def _samples(self, data):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in data.items()]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {} if labelnames else {(): 0}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Gauge set explicitly, via inc/dec, or read from `function` at scrape time."""
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {} if labelnames else {(): 0}
+        self.function = function
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def snapshot(self):
+        if self.function is not None:
+            return {(): self.function()}
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self):
+        """{label values: [bucket counts, sum, count]}."""
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._series.items()}
+
+    @staticmethod
+    def merge(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def _samples(self, data):
+        lines = []
+        for key, (counts, total, count) in data.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics, rendered in the Prometheus text format. By default they are the
+    values of this process; after share(directory) they are summed over every process
+    sharing that directory.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._shared_dir = None
+        self._snapshot_name = None
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._get_or_create(Gauge, name, documentation, labelnames, function=function)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def _snapshot_path(self, directory):
+        # pid가 재사용돼도 끝난 프로세스의 파일을 덮어쓰지 않도록 시작 시각을 붙인다 (fork 후엔 새 이름)
+        if self._snapshot_name is None or self._snapshot_name[0] != os.getpid():
+            self._snapshot_name = (os.getpid(), f'metrics-{os.getpid()}-{time.time_ns()}.json')
+        return os.path.join(directory, self._snapshot_name[1])
+
+    def write_snapshot(self, directory):
+        """Write this process's values to `directory` (atomically replacing its previous file)."""
+        data = {name: [[list(key), value] for key, value in values.items()]
+                for name, values in self.snapshot().items()}
+        path = self._snapshot_path(directory)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'pid': os.getpid(), 'metrics': data}, f)
+        os.replace(path + '.tmp', path)
+
+    def share(self, directory, interval=None):
+        """
+        Aggregate with the other processes that share `directory` (e.g. pre-forked
+        workers). Call it in each worker after fork: values inherited from the parent
+        are reset (the parent should write_snapshot() them once before forking), and
+        a daemon thread writes this process's values every `interval` seconds.
+        Counters and histograms of processes that have exited still count; gauges
+        only of the ones still running.
+        """
+        interval = SHARE_INTERVAL if interval is None else interval
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+        self._shared_dir = directory
+        self.write_snapshot(directory)
+
+        def flush():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot(directory)
+                except OSError as e:
+                    print(f"[metrics] 공유 디렉터리에 쓰지 못했습니다: {e}")
+
+        threading.Thread(target=flush, name='metrics-share', daemon=True).start()
+
+    def _other_processes(self):
+        """(alive, {name: {key: value}}) for the other processes in the shared directory."""
+        own_path = self._snapshot_path(self._shared_dir)
+        for path in glob.glob(os.path.join(self._shared_dir, 'metrics-*.json')):
+            if path == own_path:
+                continue
+            try:
+                with open(path) as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield _is_alive(saved['pid']), {name: {tuple(key): value for key, value in values}
+                                         for name, values in saved['metrics'].items()}
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        data = {metric.name: metric.snapshot() for metric in metrics}
+        if self._shared_dir is not None:
+            by_name = {metric.name: metric for metric in metrics}
+            for alive, values in self._other_processes():
+                for name, series in values.items():
+                    metric = by_name.get(name)
+                    if metric is None or (isinstance(metric, Gauge) and not alive):
+                        continue
+                    merged = data[name]
+                    for key, value in series.items():
+                        merged[key] = metric.merge(merged[key], value) if key in merged else value
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(data[metric.name]))
+        return '\n'.join(lines) + '\n'
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+metrics = MetricsRegistry()
+
+# 여러 모듈에서 같이 쓰는 지표
+ic50_stage_seconds = metrics.histogram(
+    'ic50_stage_seconds', 'Time spent in each stage of IC50 prediction.', ['stage'])
+image_stage_seconds = metrics.histogram(
+    'image_stage_seconds', 'Time spent in each stage of image-to-SMILES conversion.', ['stage'])
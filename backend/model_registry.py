@@ -0,0 +1,101 @@
+# model_registry.py
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, named models for the serving path.
+
+    Each model is registered with a loader function and is loaded on first use
+    (or ahead of time by warm()). Loads are serialized per model, so concurrent
+    first requests load it only once. Load times and failures are recorded for
+    the health endpoint, which reports ready once every required model is loaded
+    (optional models are listed but do not block readiness).
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._status = {}
+        self._locks = {}
+        self._required = set()
+        self._lock = threading.Lock()
+        self.startup_stages = {}
+
+    def register(self, name, loader, required=True):
+        with self._lock:
+            self._loaders[name] = loader
+            if required:
+                self._required.add(name)
+            else:
+                self._required.discard(name)
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {'state': 'unloaded'})
+
+    def record_stage(self, stage, seconds):
+        """Record the duration of a startup stage (e.g. module imports)."""
+        self.startup_stages[stage] = round(seconds * 1000, 3)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            self._status[name] = {'state': 'loading'}
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._status[name] = {'state': 'error', 'error': str(e),
+                                      'load_ms': round((time.perf_counter() - start) * 1000, 3)}
+                raise
+            self._models[name] = model
+            self._status[name] = {'state': 'ready',
+                                  'load_ms': round((time.perf_counter() - start) * 1000, 3)}
+            return model
+
+    def is_ready(self, names=None):
+        names = self._required if names is None else names
+        return all(name in self._models for name in names)
+
+    def warm(self, names=None, background=True):
+        """Load the given models (all by default), in a background thread unless background=False."""
+        names = list(self._loaders if names is None else names)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"[모델 로드 실패] {name}: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def wait_ready(self, names=None, timeout=None):
+        """Block until the given models are loaded or failed; returns is_ready(names)."""
+        names = list(self._loaders if names is None else names)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(self._status[name]['state'] in ('ready', 'error') for name in names):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        return self.is_ready(names)
+
+    def status(self):
+        with self._lock:
+            return {
+                'ready': all(name in self._models for name in self._required),
+                'models': {name: dict(status) for name, status in self._status.items()},
+                'startup_ms': dict(self.startup_stages),
+            }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,130 @@
+# prediction_cache.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a time-to-live for IC50 predictions.
+
+    Keys are strings (e.g. "<model version>:<canonical SMILES>") and values are floats.
+    An optional SQLite file acts as a second, on-disk tier so entries survive restarts.
+    The SQLite connection is opened lazily in each process (a connection must not be
+    used across fork(), and serve.py forks its workers after importing this module).
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, disk_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def _connection(self):
+        """This process's SQLite connection (None without a disk tier). Call with _lock held."""
+        if not self.disk_path:
+            return None
+        if self._db_pid != os.getpid():
+            # fork로 물려받은 부모의 연결은 건드리지 않고 (닫지도 않고) 새로 연다
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, value REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            db = self._connection()
+            if db is not None:
+                row = db.execute(
+                    "SELECT value, created FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store (key, value) pairs; the disk tier is written in a single transaction."""
+        items = list(items)
+        now = time.time()
+        with self._lock:
+            for key, value in items:
+                self._store(key, value, now)
+            db = self._connection()
+            if db is not None and items:
+                db.executemany(
+                    "INSERT OR REPLACE INTO predictions (key, value, created) VALUES (?, ?, ?)",
+                    [(key, value, now) for key, value in items],
+                )
+                db.commit()
+
+    def _store(self, key, value, created):
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM predictions")
+                db.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'hit_rate': self.hits / total if total else 0.0,
+                'disk_path': self.disk_path,
+            }
+
+
+def cache_from_env():
+    """Build a PredictionCache configured by IC50_CACHE_SIZE / IC50_CACHE_TTL / IC50_CACHE_PATH."""
+    ttl = os.environ.get('IC50_CACHE_TTL')
+    return PredictionCache(
+        maxsize=int(os.environ.get('IC50_CACHE_SIZE', 4096)),
+        ttl=float(ttl) if ttl else None,
+        disk_path=os.environ.get('IC50_CACHE_PATH') or None,
+    )
@@ -0,0 +1,53 @@
+# reduce_ic50_model.py
+# 특징 중요도 상위 K개만 쓰는 축소 모델을 여러 K에 대해 학습하고 정확도/지연시간/메모리를 비교한다.
+# --descriptors 로 남길 기술자 수 상한을 함께 비교할 수 있다 (BertzCT/BalabanJ 같은 비싼 기술자를
+# 빼면 특징화 시간이 줄어든다). --save K [D] 를 주면 그 축소 모델을 서빙 아티팩트로 저장한다.
+#
+#   python reduce_ic50_model.py --ks 128 256 512 --descriptors 13 6 3 --save 256 6
+import argparse
+import joblib
+import pandas as pd
+from feature_store import FeatureStore
+from serving_artifact import export_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="중요도 기반 축소 모델 비교")
+    parser.add_argument('--csv', default='sorted_f_avg_IC50.csv')
+    parser.add_argument('--model', default='ic50_model.pkl', help="기준이 되는 전체 모델 피클")
+    parser.add_argument('--ks', type=int, nargs='+', default=[64, 128, 256, 512])
+    parser.add_argument('--latency-samples', type=int, default=200)
+    parser.add_argument('--descriptors', type=int, nargs='+', help="비교할 기술자 수 상한 (기본값: 상한 없음)")
+    parser.add_argument('--save', type=int, nargs='+', metavar=('K', 'D'),
+                        help="이 K (와 기술자 상한 D)의 축소 모델을 아티팩트로 저장")
+    parser.add_argument('--artifact', default='ic50_model_reduced_artifact')
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    data = pd.read_csv(args.csv).dropna(subset=['f_avg_IC50'])
+    cleaned_smiles, cleaned_ic50, _ = model.clean_data(data['SMILES'].tolist(), data['f_avg_IC50'].tolist())
+    # 전체 모델과 같은 특징 행렬 (feature_store 캐시 사용)
+    X, y, _ = model.prepare_data(cleaned_smiles, cleaned_ic50, feature_store=FeatureStore('feature_store', model),
+                                 compact=model.feature_format == 'compact')
+    model.train(X, y)
+    model.set_inference_backend('flat')
+    descriptor_counts = args.descriptors or [None]
+    save_key = (args.save[0], args.save[1] if len(args.save) > 1 else None) if args.save else None
+    ks = sorted(set(args.ks) | ({save_key[0]} if save_key else set()))
+    if save_key and save_key[1] not in descriptor_counts:
+        descriptor_counts.append(save_key[1])
+    rows, reduced_models = model.reduced_model_report(X, y, ks=ks, descriptor_counts=descriptor_counts,
+                                                      smiles_sample=cleaned_smiles,
+                                                      n_latency=args.latency_samples)
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    if args.save:
+        reduced = reduced_models[save_key]
+        reduced.set_inference_backend('flat')
+        export_artifact(reduced, args.artifact)
+        print(f"✅ 축소 모델(top-{save_key[0]}) 아티팩트 저장: {args.artifact} "
+              f"(기술자 {len(reduced.descriptor_names)}개: {', '.join(reduced.descriptor_names)})")
+
+
+if __name__ == '__main__':
+    main()
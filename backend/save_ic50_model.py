@@ -1,5 +1,7 @@
 # save_ic50_model.py
 from ic50_predictor_class import SMILEStoIC50Predictor
+from feature_store import FeatureStore
+from serving_artifact import export_artifact
 import joblib
 import pandas as pd
 
@@ -12,9 +14,25 @@ ic50_list = data['f_avg_IC50'].tolist()
 # 모델 정의 및 훈련
 model = SMILEStoIC50Predictor()
 cleaned_smiles, cleaned_ic50, _ = model.clean_data(smiles_list, ic50_list)
-X, y, _ = model.prepare_data(cleaned_smiles, cleaned_ic50)
+# 특징 벡터는 feature_store/ 에 캐시되어 재실행 시 새 분자만 계산한다
+feature_store = FeatureStore('feature_store', model)
+X, y, valid_indices = model.prepare_data(cleaned_smiles, cleaned_ic50, feature_store=feature_store,
+                                         compact=True)
 model.train(X, y)
+# XGBoost도 같은 분할로 학습하고, 검증 세트 정확도/지연시간을 비교해 서빙 백엔드를 고른다
+model.train_xgboost(X, y)
+backend, report = model.select_inference_backend()
+for name, result in report.items():
+    print(f"  {name:<8} test r2={result['test_r2']:.4f}  single={result['single_p50_ms']:.2f}ms"
+          f"  batch={result['batch_ms']:.1f}ms")
+print(f"서빙 백엔드: {backend}")
+# update_ic50_model.py가 CSV에서 새 행만 골라낼 수 있도록 학습에 쓴 SMILES를 함께 저장
+model.training_smiles = [cleaned_smiles[i] for i in valid_indices]
 
 # 저장! (이제는 __main__이 아니라 모듈로부터 불러온 상태라 OK!)
 joblib.dump(model, 'ic50_model.pkl')
 print("✅ 모델 저장 완료!")
+
+# 서빙용 아티팩트: 학습 데이터 없이 스케일러와 트리 배열만 저장 (api가 mmap으로 불러온다)
+export_artifact(model, 'ic50_model_artifact')
+print("✅ 서빙 아티팩트 저장 완료!")
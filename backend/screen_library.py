@@ -0,0 +1,283 @@
+# screen_library.py
+# 대용량 SMILES/SDF 라이브러리를 학습된 모델로 스트리밍 스크리닝한다.
+# 입력은 한 번에 --chunk 개씩만 메모리에 올려 여러 코어로 특징화/예측하고, 결과는 청크마다
+# CSV(또는 Parquet 조각 파일)에 이어서 쓴다. 청크마다 체크포인트를 남기므로 중단된 작업은
+# 같은 명령으로 다시 실행하면 이어서 진행된다.
+#
+#   python screen_library.py library.smi -o scores.csv
+#   python screen_library.py library.sdf.gz -o scores.parquet --top 1000
+import argparse
+import csv
+import gzip
+import heapq
+import itertools
+import json
+import os
+import time
+from rdkit import Chem, RDLogger
+from batch_featurizer import featurizer_pool
+
+DEFAULT_CHUNK = 10000
+OUTPUT_COLUMNS = ['record', 'id', 'smiles', 'ic50', 'pic50']
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace')
+    return open(path, errors='replace')
+
+
+def read_smiles_file(path):
+    """(id, smiles) per line of a .smi file: 'SMILES [id ...]', '#' comments skipped."""
+    with _open_text(path) as f:
+        for line_no, line in enumerate(f):
+            parts = line.split(maxsplit=1)
+            if not parts or parts[0].startswith('#'):
+                continue
+            yield (parts[1].strip() if len(parts) > 1 else str(line_no)), parts[0]
+
+
+def read_csv_file(path, smiles_column='SMILES', id_column=None):
+    with _open_text(path) as f:
+        for row_no, row in enumerate(csv.DictReader(f)):
+            yield (row[id_column] if id_column else str(row_no)), row[smiles_column]
+
+
+def read_sdf_file(path):
+    """
+    (id, smiles) per SDF record. Records are split on '$$$$' as text and only then
+    parsed, so skipping records when resuming is cheap.
+    """
+    block = []
+    record_no = 0
+    with _open_text(path) as f:
+        for line in f:
+            if not line.startswith('$$$$'):
+                block.append(line)
+                continue
+            mol_block = ''.join(block)
+            block = []
+            name = mol_block.split('\n', 1)[0].strip() or str(record_no)
+            record_no += 1
+            yield name, mol_block
+        if 'M  END' in ''.join(block):
+            # 마지막 레코드 뒤에 '$$$$'가 빠진 파일
+            mol_block = ''.join(block)
+            yield mol_block.split('\n', 1)[0].strip() or str(record_no), mol_block
+
+
+def iter_records(path, smiles_column='SMILES', id_column=None):
+    """Lazily yield (id, smiles or MolBlock) for a library file, by extension."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.sdf') or name.endswith('.sd'):
+        return read_sdf_file(path)
+    if name.endswith('.csv'):
+        return read_csv_file(path, smiles_column, id_column)
+    return read_smiles_file(path)
+
+
+def _to_smiles(value):
+    """
+    SDF records arrive as MolBlocks; turn them into SMILES. None if RDKit cannot read
+    the record or it has no atoms; such records are skipped and counted as invalid.
+    """
+    if '\n' not in value:
+        return value
+    mol = Chem.MolFromMolBlock(value)
+    return Chem.MolToSmiles(mol) if mol is not None and mol.GetNumAtoms() else None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_predictor(path, backend=None):
+    import joblib
+    from serving_artifact import is_artifact, load_artifact
+    predictor = load_artifact(path) if is_artifact(path) else joblib.load(path)
+    if backend:
+        predictor.set_inference_backend(backend)
+    return predictor
+
+
+class CsvSink:
+    """Appends result rows to a CSV file; resumes by truncating to the last checkpointed size."""
+
+    def __init__(self, path, state):
+        self.path = path
+        if state.get('output_bytes') is not None and os.path.exists(path):
+            # 체크포인트 이후에 쓰다 만 행은 잘라낸다
+            with open(path, 'r+b') as f:
+                f.truncate(state['output_bytes'])
+        elif os.path.exists(path):
+            os.remove(path)
+        self.file = open(path, 'a', newline='')
+        self.writer = csv.writer(self.file)
+        if self.file.tell() == 0:
+            self.writer.writerow(OUTPUT_COLUMNS)
+
+    def write(self, rows, state):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        state['output_bytes'] = self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Writes one part-NNNNN.parquet file per chunk into directory `path` (read back as a dataset)."""
+
+    def __init__(self, path, state):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        n_parts = state.get('parts', 0)
+        for name in os.listdir(path):
+            # 체크포인트에 기록되지 않은 조각은 중단된 청크의 것이므로 지운다
+            if name.startswith('part-') and int(name[5:10]) >= n_parts:
+                os.remove(os.path.join(path, name))
+
+    def write(self, rows, state):
+        import pandas as pd
+        part = state.get('parts', 0)
+        tmp_path = os.path.join(self.path, f'.part-{part:05d}.parquet.tmp')
+        pd.DataFrame(rows, columns=OUTPUT_COLUMNS).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.path, f'part-{part:05d}.parquet'))
+        state['parts'] = part + 1
+
+    def close(self):
+        pass
+
+
+def _write_rows(path, rows):
+    """Write rows in one go (for the top-N result), replacing `path` atomically."""
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(rows, columns=OUTPUT_COLUMNS).to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(OUTPUT_COLUMNS)
+            writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def _input_signature(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def _save_checkpoint(path, state):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def screen(input_path, output_path, model_path, top=None, chunk=DEFAULT_CHUNK, n_jobs=-1,
+           smiles_column='SMILES', id_column=None, backend=None, restart=False):
+    """
+    Score every molecule in `input_path` and write the results to `output_path`.
+    With `top`, only the `top` best molecules by predicted pIC50 are kept (in a heap)
+    and written at the end. Returns the final checkpoint state.
+    """
+    predictor = load_predictor(model_path, backend)
+    checkpoint_path = output_path.rstrip('/') + '.checkpoint.json'
+    settings = {'input': _input_signature(input_path), 'model': os.path.abspath(model_path),
+                'top': top, 'smiles_column': smiles_column, 'id_column': id_column}
+    state = {'settings': settings, 'records': 0, 'scored': 0, 'invalid': 0, 'heap': []}
+    if not restart and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            saved = json.load(f)
+        if saved['settings'] == settings:
+            state = saved
+            print(f"체크포인트에서 이어서 진행: {state['records']:,}개 처리됨")
+        else:
+            print("입력/모델/옵션이 바뀌어 처음부터 다시 시작합니다.")
+
+    sink = None
+    if top is None:
+        sink = ParquetSink(output_path, state) if output_path.endswith('.parquet') else CsvSink(output_path, state)
+    heap = [tuple(entry) for entry in state['heap']]
+
+    records = iter_records(input_path, smiles_column, id_column)
+    records = itertools.islice(records, state['records'], None)
+    start_time = time.perf_counter()
+    start_records = state['records']
+    # 청크마다 풀을 새로 띄우면 워커마다 featurizer를 다시 만들므로 한 번 띄워 계속 쓴다
+    pool = featurizer_pool(predictor, n_jobs)
+    try:
+        for batch in chunked(records, chunk):
+            first = state['records']
+            ids = [record_id for record_id, _ in batch]
+            smiles = [_to_smiles(value) for _, value in batch]
+            predictions, valid_indices = predictor.predict_with_indices(smiles, n_jobs=n_jobs, pool=pool)
+            rows = []
+            for i, ic50 in zip(valid_indices, predictions):
+                ic50 = float(ic50)
+                rows.append([first + i, ids[i], smiles[i], ic50, float(predictor._convert_to_pic50(ic50))])
+            if top is None:
+                sink.write(rows, state)
+            else:
+                for row in rows:
+                    entry = (row[4], row[0], row[1], row[2], row[3])
+                    if len(heap) < top:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                state['heap'] = heap
+            state['records'] += len(batch)
+            state['scored'] += len(rows)
+            state['invalid'] += len(batch) - len(rows)
+            _save_checkpoint(checkpoint_path, state)
+            rate = (state['records'] - start_records) / (time.perf_counter() - start_time)
+            print(f"  {state['records']:,}개 처리 (유효 {state['scored']:,}, 실패 {state['invalid']:,}) "
+                  f"{rate:,.0f} mol/s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if sink is not None:
+            sink.close()
+
+    if top is not None:
+        best = sorted(heap, reverse=True)
+        _write_rows(output_path, [[record, record_id, smiles, ic50, pic50]
+                                  for pic50, record, record_id, smiles, ic50 in best])
+    state['done'] = True
+    _save_checkpoint(checkpoint_path, state)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMILES/SDF 라이브러리 IC50 스크리닝")
+    parser.add_argument('input', help=".smi/.csv/.sdf 파일 (.gz 가능)")
+    parser.add_argument('-o', '--output', required=True, help="결과 .csv 또는 .parquet (Parquet은 조각 파일 디렉터리)")
+    parser.add_argument('--model', default='ic50_model_artifact' if os.path.isdir('ic50_model_artifact')
+                        else 'ic50_model.pkl', help="서빙 아티팩트 디렉터리 또는 모델 피클")
+    parser.add_argument('--backend', choices=['flat', 'sklearn', 'xgboost'], help="추론 백엔드 (기본값: 모델에 저장된 값)")
+    parser.add_argument('--top', type=int, help="예측 pIC50 상위 N개만 유지")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="한 번에 메모리에 올릴 분자 수")
+    parser.add_argument('--jobs', type=int, default=-1, help="특징화 프로세스 수")
+    parser.add_argument('--smiles-column', default='SMILES')
+    parser.add_argument('--id-column')
+    parser.add_argument('--restart', action='store_true', help="체크포인트를 무시하고 처음부터")
+    args = parser.parse_args()
+
+    RDLogger.DisableLog('rdApp.*')
+    start = time.perf_counter()
+    state = screen(args.input, args.output, args.model, top=args.top, chunk=args.chunk, n_jobs=args.jobs,
+                   smiles_column=args.smiles_column, id_column=args.id_column, backend=args.backend,
+                   restart=args.restart)
+    print(f"✅ 스크리닝 완료: {state['records']:,}개 중 {state['scored']:,}개 예측 "
+          f"({time.perf_counter() - start:.1f}초) → {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# serve.py
+# 운영용 서버: 모델을 부모 프로세스에서 한 번 불러온 뒤 fork 해서 워커끼리 메모리를 공유(copy-on-write)한다.
+# 사용법: python serve.py --workers 4 --port 5001
+#        IMAGE_MODEL=stub python serve.py   (DECIMER 없이 로컬에서 돌려보기)
+import argparse
+import gc
+import glob
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+# 부모에서는 워밍업 스레드를 띄우지 않는다 (fork 전에 스레드/TensorFlow가 있으면 안 됨)
+os.environ.setdefault('MODEL_WARMUP', '0')
+
+from werkzeug.serving import make_server
+
+
+def run_worker(app, registry, sock, host, port, metrics_dir):
+    from metrics import metrics
+    # /metrics 요청은 아무 워커에게나 가므로 모든 워커의 값을 합쳐서 보여준다
+    metrics.share(metrics_dir)
+    # DECIMER(TensorFlow)는 fork 이후 각 워커에서 따로 불러온다
+    registry.warm(['decimer'])
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    server.serve_forever()
+
+
+def spawn(app, registry, sock, host, port, metrics_dir):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, registry, sock, host, port, metrics_dir)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked worker processes.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVE_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--metrics-dir', default=os.environ.get('METRICS_DIR'),
+                        help="워커들이 지표를 공유할 디렉터리 (기본값: 임시 디렉터리)")
+    args = parser.parse_args()
+
+    # 워커마다 TensorFlow가 코어 수만큼 스레드를 띄우면 서로 경쟁하므로 코어를 워커 수로 나눈다
+    os.environ.setdefault('DECIMER_INTRA_OP_THREADS', str(max(1, (os.cpu_count() or 1) // args.workers)))
+    os.environ.setdefault('DECIMER_INTER_OP_THREADS', '1')
+
+    start = time.perf_counter()
+    from api import app
+    from model_registry import registry
+    registry.get('ic50')
+    # 유사도 인덱스도 fork 전에 올려 워커끼리 공유한다 (실패해도 서버는 nearest 없이 동작)
+    try:
+        registry.get('similarity')
+    except Exception as e:
+        print(f"[모델 로드 실패] similarity: {e}")
+    print(f"✅ IC50 모델/유사도 인덱스 로드 완료 ({time.perf_counter() - start:.2f}s), 워커 {args.workers}개 시작")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    metrics_dir = args.metrics_dir or tempfile.mkdtemp(prefix='ic50-metrics-')
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.json')):
+        os.remove(path)  # 이전 실행의 값은 버린다
+    from metrics import metrics
+    # 모델 로드 중에 쌓인 값은 부모의 몫으로 한 번 써 둔다 (워커는 0부터 센다)
+    metrics.write_snapshot(metrics_dir)
+
+    # 불러온 객체를 GC 대상에서 빼서, GC가 refcount 영역을 건드려 페이지가 복사되는 것을 줄인다
+    gc.freeze()
+    workers = {spawn(app, registry, sock, args.host, args.port, metrics_dir) for _ in range(args.workers)}
+
+    def shutdown(*_):
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        if not args.metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # 죽은 워커는 다시 띄운다
+    while True:
+        pid, status = os.wait()
+        if pid in workers:
+            workers.discard(pid)
+            print(f"[워커 종료] pid={pid} status={status}, 다시 시작합니다")
+            time.sleep(0.5)
+            workers.add(spawn(app, registry, sock, args.host, args.port, metrics_dir))
+
+
+if __name__ == "__main__":
+    main()
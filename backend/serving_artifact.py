@@ -0,0 +1,153 @@
+# serving_artifact.py
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+import rdkit
+import sklearn
+from sklearn.preprocessing import StandardScaler
+from fast_forest import FlatForest
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+# 배열 구성이나 헤더 의미가 바뀌면 올린다 (읽는 쪽은 같은 버전만 받아들인다)
+FORMAT_VERSION = 1
+FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+SCALER_ARRAYS = ('mean', 'scale', 'var')
+
+
+class IncompatibleArtifact(ValueError):
+    """The artifact was written in a format or for a featurizer this code cannot serve."""
+
+
+def export_artifact(predictor, path):
+    """
+    Write the parts of a trained predictor needed for serving into directory `path`:
+    header.json (format version, featurizer config, library versions) plus one .npy
+    file per scaler and FlatForest array, plus the XGBoost booster if the predictor has
+    one. Training data and the sklearn estimators are left out. The artifact serves with
+    the predictor's current backend if that is 'xgboost', otherwise 'flat'.
+    Returns the header.
+    """
+    forest = getattr(predictor, '_flat_forest', None) or FlatForest.from_sklearn(predictor.model)
+    os.makedirs(path, exist_ok=True)
+    digest = hashlib.sha1()
+    for name in FOREST_ARRAYS:
+        array = np.ascontiguousarray(getattr(forest, name))
+        np.save(os.path.join(path, f'forest_{name}.npy'), array)
+        digest.update(array.tobytes())
+    for name in SCALER_ARRAYS:
+        # 기술자를 하나도 쓰지 않는 축소 모델(compact)은 스케일러를 학습하지 않는다
+        array = np.ascontiguousarray(getattr(predictor.scaler, f'{name}_', np.zeros(0)), dtype=np.float64)
+        np.save(os.path.join(path, f'scaler_{name}.npy'), array)
+        digest.update(array.tobytes())
+    selected_bits = getattr(predictor, 'selected_bits', None)
+    if selected_bits is not None:
+        np.save(os.path.join(path, 'selected_bits.npy'), np.asarray(selected_bits, dtype=np.intp))
+        digest.update(np.asarray(selected_bits, dtype=np.intp).tobytes())
+    xgb_model = getattr(predictor, 'xgb_model', None)
+    if xgb_model is not None:
+        booster_path = os.path.join(path, 'xgboost.ubj')
+        xgb_model.get_booster().save_model(booster_path)
+        with open(booster_path, 'rb') as f:
+            digest.update(f.read())
+    backend = 'xgboost' if getattr(predictor, 'inference_backend', None) == 'xgboost' else 'flat'
+    header = {
+        'format_version': FORMAT_VERSION,
+        'model_version': digest.hexdigest()[:16],
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'featurizer': predictor.featurizer_config(),
+        'descriptor_names': list(predictor.descriptor_names),
+        'feature_format': getattr(predictor, 'feature_format', 'dense'),
+        'use_pic50': predictor.use_pic50,
+        'n_features': int(forest.n_features),
+        'n_estimators': int(forest.n_estimators),
+        'n_samples_seen': int(getattr(predictor.scaler, 'n_samples_seen_', 0)),
+        'selected_bits': selected_bits is not None,
+        'inference_backend': backend,
+        'has_xgboost': xgb_model is not None,
+        'versions': {'rdkit': rdkit.__version__, 'sklearn': sklearn.__version__, 'numpy': np.__version__,
+                     'xgboost': _xgboost_version() if xgb_model is not None else None},
+    }
+    # 헤더를 마지막에 써서, 헤더가 있으면 배열이 모두 기록된 상태임을 보장한다
+    tmp_path = os.path.join(path, 'header.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, 'header.json'))
+    return header
+
+
+def _xgboost_version():
+    import xgboost
+    return xgboost.__version__
+
+
+def read_header(path):
+    with open(os.path.join(path, 'header.json')) as f:
+        return json.load(f)
+
+
+def check_compatible(header, predictor):
+    """Raise IncompatibleArtifact if `predictor` cannot reproduce the artifact's features."""
+    if header.get('format_version') != FORMAT_VERSION:
+        raise IncompatibleArtifact(
+            f"Artifact format {header.get('format_version')} is not supported (expected {FORMAT_VERSION}).")
+    if header['descriptor_names'] != list(predictor.descriptor_names):
+        raise IncompatibleArtifact("Artifact was trained on a different descriptor set.")
+    if header['n_features'] != predictor.n_model_features:
+        raise IncompatibleArtifact(
+            f"Artifact expects {header['n_features']} features, featurizer produces {predictor.n_model_features}.")
+    # RDKit 버전이 다르면 지문/기술자 값이 미세하게 달라질 수 있어 경고만 한다
+    if header['versions'].get('rdkit') != rdkit.__version__:
+        print(f"[serving artifact] RDKit {header['versions'].get('rdkit')}로 만든 모델을 "
+              f"{rdkit.__version__}에서 불러옵니다.")
+
+
+def load_artifact(path, mmap_mode='r'):
+    """
+    Load a serving artifact as a predictor using the backend recorded at export
+    ('flat' or 'xgboost'). Arrays are memory-mapped by default, so loading is nearly
+    instant and forked workers share the same pages.
+    """
+    header = read_header(path)
+    predictor = SMILEStoIC50Predictor(**header['featurizer'])
+
+    def load(name):
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    if header.get('selected_bits'):
+        predictor.selected_bits = np.array(load('selected_bits'))
+    check_compatible(header, predictor)
+
+    scaler = StandardScaler()
+    scaler.mean_, scaler.scale_, scaler.var_ = (load(f'scaler_{name}') for name in SCALER_ARRAYS)
+    scaler.n_features_in_ = len(scaler.mean_)
+    scaler.n_samples_seen_ = header['n_samples_seen']
+    predictor.scaler = scaler
+    predictor._flat_forest = FlatForest(
+        n_features=header['n_features'], **{name: load(f'forest_{name}') for name in FOREST_ARRAYS})
+    predictor.inference_backend = 'flat'
+    if header.get('has_xgboost'):
+        import xgboost as xgb
+        predictor.xgb_model = xgb.XGBRegressor()
+        predictor.xgb_model.load_model(os.path.join(path, 'xgboost.ubj'))
+        predictor.inference_backend = header.get('inference_backend', 'flat')
+    predictor.feature_format = header['feature_format']
+    predictor.use_pic50 = header['use_pic50']
+    predictor.model_version = header['model_version']
+    predictor.artifact_header = header
+    return predictor
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, 'header.json'))
+
+
+if __name__ == '__main__':
+    # 기존 피클을 서빙용 아티팩트로 변환: python serving_artifact.py ic50_model.pkl ic50_model_artifact
+    import joblib
+    if len(sys.argv) != 3:
+        sys.exit("usage: python serving_artifact.py <model.pkl> <artifact_dir>")
+    header = export_artifact(joblib.load(sys.argv[1]), sys.argv[2])
+    print(f"✅ 아티팩트 저장 완료: {sys.argv[2]} (version {header['model_version']})")
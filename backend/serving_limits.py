@@ -0,0 +1,92 @@
+# serving_limits.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class Overloaded(Exception):
+    """Raised when an executor's queue is full; the API turns this into a 503."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a cap on queued work.
+
+    At most max_workers tasks run at once and at most max_queue more may wait;
+    beyond that submit() raises Overloaded immediately instead of letting latency
+    pile up. run() waits for the result with a timeout. A task that times out
+    keeps its slot until it actually finishes, so a stuck backend sheds load
+    instead of accepting more work.
+    """
+
+    def __init__(self, max_workers, max_queue, name):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        self.rejected = 0
+        self.timeouts = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"{self.name} queue is full")
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'max_workers': self.max_workers,
+                    'max_queue': self.max_queue, 'rejected': self.rejected, 'timeouts': self.timeouts}
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+# RDKit 파싱 + forest 예측용 (짧은 작업)
+cpu_executor = BoundedExecutor(
+    max_workers=_env_int('CPU_EXECUTOR_THREADS', 4),
+    max_queue=_env_int('CPU_QUEUE_LIMIT', 64),
+    name='cpu',
+)
+# DECIMER 이미지 디코딩용 (수 초 걸리는 작업이라 대기열을 짧게 둔다)
+image_executor = BoundedExecutor(
+    max_workers=_env_int('IMAGE_EXECUTOR_THREADS', 2),
+    max_queue=_env_int('IMAGE_QUEUE_LIMIT', 8),
+    name='image',
+)
+
+ROUTE_TIMEOUTS = {
+    'mol-to-smiles': _env_float('MOL_TO_SMILES_TIMEOUT', 5),
+    'image-to-smiles': _env_float('IMAGE_TO_SMILES_TIMEOUT', 60),
+    'predict-batch-chunk': _env_float('PREDICT_BATCH_CHUNK_TIMEOUT', 30),
+}
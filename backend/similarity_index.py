@@ -0,0 +1,143 @@
+# similarity_index.py
+import heapq
+import json
+import os
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+
+BLOCK_ROWS = 65536
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+
+def popcount_rows(packed):
+    """Number of set bits in each row of a packed uint8 matrix."""
+    if hasattr(np, 'bitwise_count') and packed.shape[1] % 8 == 0:
+        return np.bitwise_count(np.ascontiguousarray(packed).view(np.uint64)).sum(axis=1, dtype=np.uint32)
+    return _POPCOUNT_TABLE[packed].sum(axis=1, dtype=np.uint32)
+
+
+class TanimotoIndex:
+    """
+    Nearest-neighbour search over Morgan fingerprints by Tanimoto similarity.
+
+    Fingerprints are stored packed (np.packbits rows) together with their popcounts,
+    and queries scan them in blocks of BLOCK_ROWS rows, so memory use is bounded by
+    the block size no matter how many rows there are. Saved indexes are loaded
+    memory-mapped.
+    """
+
+    def __init__(self, bits, popcounts, smiles, values, radius, nbits):
+        self.bits = bits
+        self.popcounts = popcounts
+        self.smiles = smiles
+        self.values = values
+        self.radius = radius
+        self.nbits = nbits
+
+    def __len__(self):
+        return self.bits.shape[0]
+
+    @classmethod
+    def build(cls, predictor, smiles_list, values, path=None):
+        """
+        Build an index of smiles_list (invalid SMILES are skipped) with the predictor's
+        fingerprint settings. With `path`, rows are written straight to memory-mapped
+        files there and the saved index is returned.
+        """
+        radius, nbits = predictor.fingerprint_radius, predictor.fingerprint_nbits
+        n = len(smiles_list)
+        shape = (n, (nbits + 7) // 8)
+        if path:
+            os.makedirs(path, exist_ok=True)
+            bits = np.lib.format.open_memmap(os.path.join(path, 'bits.tmp.npy'), mode='w+',
+                                             dtype=np.uint8, shape=shape)
+        else:
+            bits = np.zeros(shape, dtype=np.uint8)
+        kept_smiles, kept_values = [], []
+        for smiles, value in zip(smiles_list, values):
+            mol = Chem.MolFromSmiles(smiles)
+            if mol is None:
+                continue
+            bits[len(kept_smiles)] = cls._packed_fingerprint(mol, radius, nbits)
+            kept_smiles.append(smiles)
+            kept_values.append(value)
+        index = cls(bits[:len(kept_smiles)], None, kept_smiles,
+                    np.asarray(kept_values, dtype=np.float64), radius, nbits)
+        index.popcounts = np.concatenate([popcount_rows(index.bits[start:start + BLOCK_ROWS])
+                                          for start in range(0, len(index), BLOCK_ROWS)] or
+                                         [np.zeros(0, dtype=np.uint32)])
+        if path:
+            index.save(path)
+            del bits, index
+            os.remove(os.path.join(path, 'bits.tmp.npy'))
+            return cls.load(path)
+        return index
+
+    @staticmethod
+    def _packed_fingerprint(mol, radius, nbits):
+        fingerprint = AllChem.GetMorganFingerprintAsBitVect(mol, radius, nBits=nbits)
+        on_bits = np.zeros(nbits, dtype=np.uint8)
+        on_bits[list(fingerprint.GetOnBits())] = 1
+        return np.packbits(on_bits)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'bits.npy'), self.bits)
+        np.save(os.path.join(path, 'popcounts.npy'), self.popcounts)
+        np.save(os.path.join(path, 'values.npy'), self.values)
+        with open(os.path.join(path, 'smiles.txt'), 'w') as f:
+            f.writelines(smiles + '\n' for smiles in self.smiles)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'radius': self.radius, 'nbits': self.nbits, 'rows': len(self)}, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, 'smiles.txt')) as f:
+            smiles = [line.rstrip('\n') for line in f]
+        return cls(np.load(os.path.join(path, 'bits.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, 'popcounts.npy'), mmap_mode=mmap_mode),
+                   smiles, np.load(os.path.join(path, 'values.npy'), mmap_mode=mmap_mode),
+                   meta['radius'], meta['nbits'])
+
+    def _similarities(self, query):
+        """Yield (start row, Tanimoto similarities) for each block of the index."""
+        query_count = int(popcount_rows(query[None, :])[0])
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = self.bits[start:start + BLOCK_ROWS]
+            common = popcount_rows(block & query)
+            union = self.popcounts[start:start + BLOCK_ROWS] + query_count - common
+            with np.errstate(invalid='ignore', divide='ignore'):
+                similarity = np.where(union > 0, common / union, 1.0)
+            yield start, similarity
+
+    def _result(self, row, similarity):
+        return {'index': int(row), 'smiles': self.smiles[row],
+                'value': float(self.values[row]), 'similarity': float(similarity)}
+
+    def search(self, mol, k=5, threshold=None):
+        """
+        Most similar indexed compounds to `mol` (RDKit Mol or SMILES), best first.
+        Returns up to k results; with `threshold`, only those with similarity >= threshold
+        (and all of them if k is None).
+        """
+        if isinstance(mol, str):
+            mol = Chem.MolFromSmiles(mol)
+        if mol is None or not len(self):
+            return []
+        query = self._packed_fingerprint(mol, self.radius, self.nbits)
+        candidates = []
+        for start, similarity in self._similarities(query):
+            if threshold is not None:
+                rows = np.flatnonzero(similarity >= threshold)
+            else:
+                rows = np.arange(len(similarity))
+            if k is not None and len(rows) > k:
+                rows = rows[np.argpartition(-similarity[rows], k - 1)[:k]]
+            candidates.extend((float(similarity[row]), -(start + int(row))) for row in rows)
+            if k is not None and len(candidates) > k:
+                candidates = heapq.nlargest(k, candidates)
+        best = sorted(candidates, reverse=True)
+        return [self._result(-neg_row, similarity) for similarity, neg_row in best[:k]]
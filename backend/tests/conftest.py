@@ -0,0 +1,25 @@
+# 백엔드 모듈은 backend/ 에서 바로 import 하는 구조이므로 테스트도 같은 경로를 쓴다
+import os
+import sys
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope='session')
+def known_compounds():
+    """(SMILES, IC50) of the first 150 measured compounds in the bundled CSV."""
+    import pandas as pd
+    data = pd.read_csv(os.path.join(BACKEND_DIR, 'sorted_f_avg_IC50.csv')).dropna(subset=['f_avg_IC50']).head(150)
+    return data['SMILES'].tolist(), data['f_avg_IC50'].tolist()
+
+
+@pytest.fixture(scope='session')
+def trained_predictor(known_compounds):
+    """A small predictor trained on known_compounds (few trees, short fingerprints)."""
+    from ic50_predictor_class import SMILEStoIC50Predictor
+    predictor = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=512)
+    X, y, _ = predictor.prepare_data(*known_compounds, n_jobs=1)
+    predictor.train(X, y)
+    return predictor
@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import threading
+import pytest
+from PIL import Image
+from rdkit import Chem
+from serving_artifact import export_artifact
+from serving_limits import BoundedExecutor
+
+
+@pytest.fixture(scope='module')
+def api(trained_predictor, tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('api')
+    export_artifact(trained_predictor, str(workdir / 'artifact'))
+    env = dict(IMAGE_MODEL='stub', MODEL_WARMUP='0', IC50_MODEL_PATH=str(workdir / 'artifact'))
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    cwd = os.getcwd()
+    os.chdir(workdir)  # 리더보드 로그가 임시 폴더에 쓰이도록
+    try:
+        import api
+        yield api
+    finally:
+        os.chdir(cwd)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+def _mol_block(smiles):
+    return Chem.MolToMolBlock(Chem.MolFromSmiles(smiles))
+
+
+def test_mol_to_smiles_predicts(client):
+    response = client.post('/mol-to-smiles', json={'mol': _mol_block('c1ccccc1O')})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['smiles'] == 'Oc1ccccc1' and body['ic50'] > 0
+    assert body['nearest'] is None  # 유사도 인덱스는 요청이 기다리지 않도록 따로 불러온다
+    assert client.post('/mol-to-smiles', json={}).status_code == 400
+    assert client.post('/mol-to-smiles', json={'mol': 'garbage'}).status_code == 500
+
+
+def test_nearest_known_compound_once_the_index_is_loaded(api, client):
+    api.registry.get('similarity')
+    body = client.post('/mol-to-smiles', json={'mol': _mol_block('c1ccccc1O')}).get_json()
+    assert 0 < body['nearest']['similarity'] <= 1.0 and body['nearest']['ic50'] > 0
+
+
+def test_full_executor_returns_503(api, client, monkeypatch):
+    busy = BoundedExecutor(max_workers=1, max_queue=0, name='test')
+    release = threading.Event()
+    busy.submit(release.wait, 5)
+    monkeypatch.setattr(api, 'cpu_executor', busy)
+    try:
+        response = client.post('/mol-to-smiles', json={'mol': _mol_block('CCO')})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        release.set()
+
+
+def test_slow_prediction_returns_504(api, client, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(api, 'cpu_executor', BoundedExecutor(max_workers=1, max_queue=0, name='test'))
+    monkeypatch.setitem(api.ROUTE_TIMEOUTS, 'mol-to-smiles', 0.05)
+    monkeypatch.setattr(api, '_predict_mol_block', lambda mol_block: release.wait(5))
+    try:
+        assert client.post('/mol-to-smiles', json={'mol': _mol_block('CCO')}).status_code == 504
+    finally:
+        release.set()
+
+
+def test_image_to_smiles_with_the_stub_model(client):
+    buf = io.BytesIO()
+    Image.new('L', (64, 64), 255).save(buf, format='PNG')
+    response = client.post('/image-to-smiles', data={'image': (io.BytesIO(buf.getvalue()), 'blank.png')})
+    assert response.status_code == 200
+    assert response.get_json()['smiles'] == 'c1ccccc1O'
+    assert client.post('/image-to-smiles', data={}).status_code == 400
+
+
+def test_predict_batch_streams_one_record_per_item(client):
+    response = client.post('/predict-batch', json={'smiles': ['CCO', 'not a smiles', 'c1ccccc1O']})
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['index'] for record in records] == [0, 1, 2]
+    assert 'error' in records[1] and 'ic50' in records[0] and 'ic50' in records[2]
+    assert client.post('/predict-batch', json={'smiles': []}).status_code == 400
+
+
+def test_sketch_without_a_stream_is_computed_inline(client):
+    response = client.post('/sketch/s1', json={'mol': _mol_block('CCO')})
+    assert response.status_code == 200
+    assert response.get_json()['smiles'] == 'CCO'
+    assert client.post('/sketch/s1', json={'mol': 'garbage'}).status_code == 400
+
+
+def test_submit_score_and_leaderboard(client):
+    assert client.post('/submit-score', json={'nickname': 'a', 'smiles': 'CCO', 'ic50': 'x'}).status_code == 400
+    assert client.post('/submit-score', json={'nickname': 'a', 'smiles': 'CCO', 'ic50': 3}).get_json()['rank'] == 0
+    assert client.post('/submit-score', json={'nickname': 'b', 'smiles': 'CCN', 'ic50': 1}).get_json()['rank'] == 0
+    body = client.get('/leaderboard?top=1').get_json()
+    assert body['total'] == 2 and body['leaderboard'][0]['nickname'] == 'b'
+    assert client.get('/leaderboard?top=-1').status_code == 400
+
+
+def test_health_reports_ready_once_required_models_are_loaded(api, client):
+    api.registry.get('ic50')
+    api.registry.get('decimer')
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json()['ready'] is True
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from rdkit import Chem
+from batch_featurizer import featurize_mols, featurize_smiles, featurizer_pool
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return SMILEStoIC50Predictor(fingerprint_nbits=256)
+
+
+@pytest.fixture(scope='module')
+def library(known_compounds):
+    # 잘못된 SMILES를 chunk 경계(7의 배수) 양쪽과 맨 앞/끝에 섞는다
+    smiles = list(known_compounds[0][:40])
+    for position in (0, 6, 7, 21, len(smiles) + 4):
+        smiles.insert(position, 'not a smiles')
+    return smiles
+
+
+def _one_by_one(predictor, smiles_list):
+    rows, valid = [], []
+    for i, smiles in enumerate(smiles_list):
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is not None:
+            rows.append(predictor._mol_to_features(mol))
+            valid.append(i)
+    return np.array(rows), valid
+
+
+@pytest.mark.parametrize('chunk_size', [7, 16, 1000])
+@pytest.mark.parametrize('compact', [False, True])
+def test_parallel_chunks_equal_the_serial_path(predictor, library, chunk_size, compact):
+    expected, expected_valid = _one_by_one(predictor, library)
+    serial, serial_valid = featurize_smiles(predictor, library, n_jobs=1, chunk_size=chunk_size, compact=compact)
+    parallel, parallel_valid = featurize_smiles(predictor, library, n_jobs=2, chunk_size=chunk_size, compact=compact)
+    assert serial_valid == parallel_valid == expected_valid
+    if compact:
+        serial, parallel = serial.to_dense(), parallel.to_dense()
+    np.testing.assert_array_equal(serial, expected)
+    np.testing.assert_array_equal(parallel, expected)
+
+
+def test_each_chunk_matches_featurizing_it_alone(predictor, library):
+    X, valid = featurize_smiles(predictor, library, n_jobs=2, chunk_size=7)
+    row = 0
+    for start in range(0, len(library), 7):
+        chunk_X, chunk_valid = featurize_smiles(predictor, library[start:start + 7], n_jobs=1)
+        assert valid[row:row + len(chunk_valid)] == [start + i for i in chunk_valid]
+        np.testing.assert_array_equal(X[row:row + len(chunk_valid)], chunk_X)
+        row += len(chunk_valid)
+    assert row == len(valid)
+
+
+def test_shared_pool_is_reused_across_calls(predictor, library):
+    expected, expected_valid = featurize_smiles(predictor, library, n_jobs=1)
+    pool = featurizer_pool(predictor, n_jobs=2)
+    try:
+        for _ in range(2):
+            X, valid = featurize_smiles(predictor, library, chunk_size=7, pool=pool)
+            assert valid == expected_valid
+            np.testing.assert_array_equal(X, expected)
+    finally:
+        pool.shutdown()
+    assert featurizer_pool(predictor, n_jobs=1) is None
+
+
+def test_mols_path_matches_smiles_path(predictor, library):
+    X, valid = featurize_smiles(predictor, library, n_jobs=1)
+    X_mols, valid_mols = featurize_mols(predictor, [Chem.MolFromSmiles(s) for s in library])
+    assert valid_mols == valid
+    np.testing.assert_array_equal(X_mols, X)
+
+
+def test_empty_input(predictor):
+    X, valid = featurize_smiles(predictor, [], n_jobs=2)
+    assert X.shape == (0, predictor.n_features) and valid == []
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from compact_features import CompactFeatures, concat
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+@pytest.fixture(scope='module')
+def dense_and_compact(known_compounds):
+    dense = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=512)
+    compact = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=512)
+    X, y, _ = dense.prepare_data(*known_compounds, n_jobs=1)
+    X_compact, y_compact, _ = compact.prepare_data(*known_compounds, n_jobs=1, compact=True)
+    return dense, compact, X, y, X_compact, y_compact
+
+
+def test_packed_bits_unpack_to_the_dense_matrix(dense_and_compact):
+    _, _, X, y, X_compact, y_compact = dense_and_compact
+    assert isinstance(X_compact, CompactFeatures)
+    np.testing.assert_array_equal(y_compact, y)
+    assert X_compact.shape == X.shape
+    np.testing.assert_array_equal(X_compact.to_dense(), X)
+    assert X_compact.nbytes * 20 < X.nbytes
+
+
+def test_row_selection_and_concat(dense_and_compact):
+    _, _, X, _, X_compact, _ = dense_and_compact
+    rows = np.array([5, 0, 17])
+    np.testing.assert_array_equal(X_compact.take(rows).to_dense(), X[rows])
+    mask = np.zeros(len(X), dtype=bool)
+    mask[::7] = True
+    np.testing.assert_array_equal(X_compact[mask].to_dense(), X[mask])
+    joined = concat([X_compact[:10], X_compact[10:25]])
+    np.testing.assert_array_equal(joined.to_dense(), X[:25])
+
+
+def test_model_input_keeps_bits_unscaled():
+    bits = np.packbits(np.array([[1, 0, 1], [0, 1, 0]], dtype=np.uint8), axis=1)
+    features = CompactFeatures(bits, np.array([[1.0], [2.0]]), nbits=3)
+    model_input = features.to_model_input(np.array([[-1.0], [1.0]]))
+    np.testing.assert_array_equal(model_input.toarray(), [[1, 0, 1, -1], [0, 1, 0, 1]])
+    assert features.to_model_input(np.empty((2, 0))).shape == (2, 3)
+
+
+def test_compact_training_predicts_like_dense(dense_and_compact, known_compounds):
+    dense, compact, X, y, X_compact, y_compact = dense_and_compact
+    dense.train(X, y)
+    compact.train(X_compact, y_compact)
+    assert compact.feature_format == 'compact'
+    smiles = known_compounds[0][:40]
+    expected, _ = dense.predict(smiles, n_jobs=1)
+    predicted, _ = compact.predict(smiles, n_jobs=1)
+    np.testing.assert_allclose(predicted, expected, rtol=1e-9)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from sklearn.model_selection import KFold, cross_validate as sklearn_cross_validate
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+@pytest.fixture(scope='module')
+def data(known_compounds):
+    predictor = SMILEStoIC50Predictor(n_estimators=15, fingerprint_nbits=256)
+    X, y, _ = predictor.prepare_data(*known_compounds, n_jobs=1)
+    return predictor, X, y
+
+
+def test_matches_sklearn_cross_validate_with_a_scaler_per_fold(data):
+    predictor, X, y = data
+    metrics = predictor.cross_validate(X, y, cv=3, n_jobs=1)
+
+    pipeline = make_pipeline(StandardScaler(), predictor.model.set_params(oob_score=False))
+    expected = sklearn_cross_validate(
+        pipeline, X, y, cv=KFold(n_splits=3, shuffle=True, random_state=predictor.random_state),
+        scoring=('r2', 'neg_root_mean_squared_error', 'neg_mean_absolute_error'))
+    assert metrics['cv_r2_mean'] == pytest.approx(expected['test_r2'].mean())
+    assert metrics['cv_rmse_mean'] == pytest.approx(-expected['test_neg_root_mean_squared_error'].mean())
+    assert metrics['cv_mae_mean'] == pytest.approx(-expected['test_neg_mean_absolute_error'].mean())
+    assert len(metrics['fold_fit_times']) == 3
+
+
+def test_parallel_folds_give_the_serial_scores(data):
+    predictor, X, y = data
+    serial = predictor.cross_validate(X, y, cv=3, n_jobs=1)
+    parallel = predictor.cross_validate(X, y, cv=3, n_jobs=3)
+    for key in ('cv_r2_mean', 'cv_r2_std', 'cv_rmse_mean', 'cv_mae_mean'):
+        assert parallel[key] == pytest.approx(serial[key])
+    # 폴드는 복제본으로 학습하므로 예측기 자신의 forest는 그대로다
+    assert not hasattr(predictor.model, 'estimators_')
@@ -0,0 +1,60 @@
+import json
+import pytest
+import decimer_optimized
+from decimer_optimized import _TokenDecoder
+
+
+def test_token_decoder_strips_markers_and_restores_ring_digits():
+    decoder = _TokenDecoder({1: '<start>', 2: '<end>', 3: 'C', 4: '!', 5: '=', 6: 'c', 7: '$'})
+    assert decoder([[1, 3, 4, 5, 3, 6, 7, 6, 4, 2]]) == 'C1=Cc2c1'
+
+
+def test_unknown_runtime_is_rejected():
+    with pytest.raises(ValueError, match='Unknown DECIMER runtime'):
+        decimer_optimized.load_predictor('onnx')
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    stock = str(tmp_path / 'DECIMER_model')
+    monkeypatch.setattr(decimer_optimized, 'default_saved_model_path', lambda: stock)
+    model_dir = tmp_path / 'tflite'
+    model_dir.mkdir()
+    (model_dir / 'header.json').write_text(json.dumps({'quantization': 'float16', 'source': stock}))
+    return model_dir
+
+
+def _fake_measure(predictions):
+    def run(runtime, path, images, repeats):
+        return {'smiles': predictions[runtime], 'load_s': 1.0, 'load_rss_mb': 100.0, 'peak_rss_mb': 200.0,
+                'p50_ms': {name: 100.0 if runtime == 'tf' else 50.0 for name in predictions[runtime]}}
+    return run
+
+
+def test_check_compares_against_stock_decimer(exported, monkeypatch):
+    predictions = {
+        'tf': {'a.png': 'c1ccccc1O', 'b.png': 'CCO', 'c.png': 'CC(=O)O'},
+        # b는 같은 분자를 다르게 쓴 것, c는 다른 분자
+        'tflite': {'a.png': 'c1ccccc1O', 'b.png': 'OCC', 'c.png': 'CC(=O)OC'},
+    }
+    runtimes = []
+    fake = _fake_measure(predictions)
+    monkeypatch.setattr(decimer_optimized, '_run_measure',
+                        lambda runtime, *args: runtimes.append(runtime) or fake(runtime, *args))
+    report = decimer_optimized.check(str(exported), ['a.png', 'b.png', 'c.png'], min_match=0.6)
+
+    assert runtimes == ['tf', 'tflite']
+    assert report['reference'].startswith('DECIMER.predict_SMILES')
+    assert report['exact_match_rate'] == pytest.approx(1 / 3)
+    assert report['match_rate'] == pytest.approx(2 / 3)
+    assert [row['tanimoto'] == 1.0 for row in report['images']] == [True, True, False]
+    assert report['min_tanimoto'] < 1.0 and report['speedup'] == pytest.approx(2.0)
+    assert report['passed']
+    assert decimer_optimized.read_check(str(exported)) == report
+
+
+def test_check_refuses_an_export_of_another_model(exported, monkeypatch):
+    (exported / 'header.json').write_text(json.dumps({'quantization': 'int8', 'source': '/elsewhere'}))
+    monkeypatch.setattr(decimer_optimized, '_run_measure', pytest.fail)
+    with pytest.raises(ValueError, match='stock DECIMER'):
+        decimer_optimized.check(str(exported), ['a.png'])
@@ -0,0 +1,50 @@
+import pickle
+import numpy as np
+import pytest
+from rdkit import Chem
+from rdkit.Chem import Descriptors
+from descriptor_engine import DescriptorEngine
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+NAMES = SMILEStoIC50Predictor().descriptor_names
+
+
+@pytest.fixture(scope='module')
+def mols(known_compounds):
+    return [Chem.MolFromSmiles(smiles) for smiles in known_compounds[0][:40]]
+
+
+def test_matches_rdkit_descriptors(mols):
+    engine = DescriptorEngine(NAMES)
+    reference = dict(Descriptors.descList)
+    for mol in mols:
+        expected = [reference[name](mol) for name in NAMES]
+        np.testing.assert_allclose(engine.compute(mol), expected, rtol=1e-12)
+
+
+def test_writes_into_out_in_schema_order(mols):
+    engine = DescriptorEngine(['TPSA', 'MolWt'])
+    out = np.zeros(2)
+    assert engine.compute(mols[0], out) is out
+    np.testing.assert_allclose(out, [Descriptors.TPSA(mols[0]), Descriptors.MolWt(mols[0])])
+
+
+def test_names_outside_the_registry_fall_back_to_rdkit_and_unknown_names_fail():
+    engine = DescriptorEngine(['MolWt', 'qed'])
+    mol = Chem.MolFromSmiles('CCO')
+    np.testing.assert_allclose(engine.compute(mol)[1], Descriptors.qed(mol))
+    with pytest.raises(ValueError, match='Unknown descriptor'):
+        DescriptorEngine(['MolWt', 'NotADescriptor'])
+
+
+def test_survives_pickling(mols):
+    engine = pickle.loads(pickle.dumps(DescriptorEngine(NAMES)))
+    assert engine.names == tuple(NAMES)
+    np.testing.assert_allclose(engine.compute(mols[0]), DescriptorEngine(NAMES).compute(mols[0]))
+
+
+def test_cost_report_covers_every_descriptor(mols):
+    report = DescriptorEngine(NAMES).cost_report(mols[:5] + [None])
+    assert sorted(name for name, _ in report) == sorted(NAMES)
+    costs = [us for _, us in report]
+    assert costs == sorted(costs, reverse=True) and all(us > 0 for us in costs)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor
+import fast_forest
+from fast_forest import FlatForest
+
+
+@pytest.fixture(scope='module')
+def forest_and_data():
+    rng = np.random.default_rng(0)
+    # 이진 지문 + 연속값 기술자처럼 섞인 입력
+    X = np.hstack([rng.integers(0, 2, (400, 64)), rng.normal(size=(400, 8))])
+    y = X[:, 0] * 2 + X[:, 64] + rng.normal(scale=0.1, size=400)
+    forest = RandomForestRegressor(n_estimators=25, max_features='sqrt', random_state=0).fit(X, y)
+    return forest, rng.permutation(X)
+
+
+def test_matches_sklearn_predictions(forest_and_data):
+    forest, X = forest_and_data
+    flat = FlatForest.from_sklearn(forest)
+    assert flat.n_estimators == 25
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(flat.predict(X[:1]), forest.predict(X[:1]), rtol=0, atol=1e-12)
+
+
+def test_sparse_input_and_row_blocks(forest_and_data, monkeypatch):
+    forest, X = forest_and_data
+    flat = FlatForest.from_sklearn(forest)
+    monkeypatch.setattr(fast_forest, 'ROW_BLOCK', 64)
+    np.testing.assert_allclose(flat.predict(sparse.csr_matrix(X)), forest.predict(X), rtol=0, atol=1e-12)
+
+
+def test_rejects_wrong_feature_count(forest_and_data):
+    forest, X = forest_and_data
+    with pytest.raises(ValueError, match='features'):
+        FlatForest.from_sklearn(forest).predict(X[:, :10])
+
+
+def test_predictor_backends_agree(trained_predictor, known_compounds):
+    smiles = known_compounds[0][:40]
+    trained_predictor.set_inference_backend('sklearn')
+    expected, _ = trained_predictor.predict(smiles, n_jobs=1)
+    trained_predictor.set_inference_backend('flat')
+    actual, _ = trained_predictor.predict(smiles, n_jobs=1)
+    np.testing.assert_allclose(actual, expected, rtol=1e-12)
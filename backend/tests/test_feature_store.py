@@ -0,0 +1,43 @@
+import numpy as np
+from feature_store import FeatureStore
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+def _predictor():
+    return SMILEStoIC50Predictor(fingerprint_nbits=256)
+
+
+def test_reopen_serves_stored_rows_without_featurizing(tmp_path, monkeypatch):
+    predictor = _predictor()
+    store = FeatureStore(str(tmp_path), predictor)
+    X, valid = store.lookup(predictor, ['CCO', 'not a smiles', 'c1ccccc1O'], n_jobs=1)
+    assert valid == [0, 2]
+
+    import feature_store
+    monkeypatch.setattr(feature_store, 'featurize_smiles', None)  # 다시 계산하면 실패한다
+    reopened = FeatureStore(str(tmp_path), predictor)
+    assert len(reopened) == 2
+    X_again, valid_again = reopened.lookup(predictor, ['CCO', 'not a smiles', 'c1ccccc1O'], n_jobs=1)
+    assert valid_again == valid
+    np.testing.assert_array_equal(X_again, X)
+
+
+def test_reopen_after_a_first_run_with_only_invalid_smiles(tmp_path):
+    predictor = _predictor()
+    store = FeatureStore(str(tmp_path), predictor)
+    X, valid = store.lookup(predictor, ['not a smiles', 'C1CC'], n_jobs=1)
+    assert valid == [] and X.shape[0] == 0
+
+    reopened = FeatureStore(str(tmp_path), predictor)
+    assert len(reopened) == 0
+    X, valid = reopened.lookup(predictor, ['not a smiles', 'CCO'], n_jobs=1)
+    assert valid == [1] and X.shape[0] == 1
+    assert len(FeatureStore(str(tmp_path), predictor)) == 1
+
+
+def test_canonical_duplicates_share_a_row(tmp_path):
+    predictor = _predictor()
+    store = FeatureStore(str(tmp_path), predictor)
+    X, valid = store.lookup(predictor, ['OCC', 'CCO'], n_jobs=1)
+    assert valid == [0, 1] and len(store) == 1
+    np.testing.assert_array_equal(X[0], X[1])
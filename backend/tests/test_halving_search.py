@@ -0,0 +1,66 @@
+import json
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+SEARCH = dict(n_candidates=4, min_estimators=3, max_estimators=9, eta=2)
+
+
+@pytest.fixture(scope='module')
+def data(known_compounds):
+    predictor = SMILEStoIC50Predictor(fingerprint_nbits=256)
+    X, y, _ = predictor.prepare_data(*known_compounds, n_jobs=1)
+    return X, y
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    """Counts forest fits; set fits['fail_at'] to interrupt the search at that fit."""
+    fits = {'n': 0, 'fail_at': None}
+    original = RandomForestRegressor.fit
+
+    def fit(self, *args, **kwargs):
+        fits['n'] += 1
+        if fits['n'] == fits['fail_at']:
+            raise KeyboardInterrupt
+        return original(self, *args, **kwargs)
+    monkeypatch.setattr(RandomForestRegressor, 'fit', fit)
+    return fits
+
+
+def test_survivors_are_grown_with_warm_start(data, fits):
+    predictor = SMILEStoIC50Predictor(fingerprint_nbits=256)
+    best_params = predictor.find_optimal_params_halving(*data, **SEARCH)
+    # 4 x 3 trees -> 2 x 6 trees -> 1 x 9 trees
+    assert fits['n'] == 4 + 2 + 1
+    assert best_params['n_estimators'] == 9
+    assert len(predictor.model.estimators_) == 9
+    assert not predictor.model.warm_start
+
+
+def test_interrupted_search_resumes_from_checkpoint(data, fits, tmp_path):
+    expected = SMILEStoIC50Predictor(fingerprint_nbits=256)
+    expected_params = expected.find_optimal_params_halving(*data, **SEARCH)
+
+    checkpoint_dir = str(tmp_path / 'halving')
+    fits.update(n=0, fail_at=6)
+    with pytest.raises(KeyboardInterrupt):
+        SMILEStoIC50Predictor(fingerprint_nbits=256).find_optimal_params_halving(
+            *data, checkpoint_dir=checkpoint_dir, **SEARCH)
+    # 두 번째 단계에서 중단됐고 탈락한 후보의 모델은 지워졌다
+    with open(os.path.join(checkpoint_dir, 'state.json')) as f:
+        state = json.load(f)
+    assert state['rung'] == 1 and len(state['survivors']) == 2
+    assert sorted(os.listdir(checkpoint_dir)) == sorted(
+        [f'candidate_{cid}.joblib' for cid in state['survivors']] + ['state.json'])
+
+    fits.update(n=0, fail_at=None)
+    resumed = SMILEStoIC50Predictor(fingerprint_nbits=256)
+    params = resumed.find_optimal_params_halving(*data, checkpoint_dir=checkpoint_dir, **SEARCH)
+    assert fits['n'] == 2  # 남은 후보 하나의 두 번째 단계와 마지막 단계만 학습
+    assert params == expected_params
+    X_val = resumed._transform(data[0][:20])
+    np.testing.assert_allclose(resumed.model.predict(X_val), expected.model.predict(X_val))
+
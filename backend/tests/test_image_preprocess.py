@@ -0,0 +1,90 @@
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageDraw
+import pytest
+from image_preprocess import preprocess_image, ink_bounding_box, to_grayscale
+
+
+def _png(image):
+    buf = BytesIO()
+    image.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _transparent_structure(mode='RGBA'):
+    # 투명 배경 위에 검은 선으로 그린 "구조식"
+    image = Image.new('RGBA', (300, 200), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.line([(50, 100), (150, 50), (250, 100)], fill=(0, 0, 0, 255), width=6)
+    return image if mode == 'RGBA' else image.convert(mode)
+
+
+def test_transparent_png_is_flattened_onto_white():
+    payload, _ = preprocess_image(_png(_transparent_structure()))
+    assert isinstance(payload, np.ndarray)
+    assert payload.ndim == 2
+    # 배경은 흰색, 선은 검은색으로 남아야 한다 (알파를 버리면 전부 0이 된다)
+    assert payload.mean() > 200
+    assert payload.min() < 50
+
+
+def test_transparent_la_png_is_flattened_onto_white():
+    payload, _ = preprocess_image(_png(_transparent_structure('LA')))
+    assert payload.mean() > 200
+    assert payload.min() < 50
+
+
+def test_transparent_png_is_cropped_to_the_drawing():
+    payload, _ = preprocess_image(_png(_transparent_structure()))
+    assert payload.shape[0] < 200 and payload.shape[1] < 300
+
+
+def test_unchanged_png_is_passed_through():
+    image = Image.new('L', (100, 100), 255)
+    ImageDraw.Draw(image).rectangle([0, 0, 99, 99], outline=0, width=3)
+    data = _png(image)
+    payload, timings = preprocess_image(data)
+    assert payload.getvalue() == data
+    assert 'total' in timings
+
+
+def test_ink_bounding_box_on_blank_image():
+    assert ink_bounding_box(np.full((50, 50), 255, dtype=np.uint8)) is None
+
+
+def test_exif_orientation_is_applied():
+    image = Image.new('L', (120, 60), 255)
+    ImageDraw.Draw(image).rectangle([0, 0, 119, 59], outline=0, width=3)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 90도 회전
+    buf = BytesIO()
+    image.save(buf, format='JPEG', exif=exif)
+    payload, _ = preprocess_image(buf.getvalue(), crop=False)
+    assert payload.shape == (120, 60)
+
+
+def test_grayscale_uses_decimers_bgr2gray_weights():
+    colors = Image.new('RGB', (3, 1))
+    colors.putdata([(255, 0, 0), (0, 255, 0), (0, 0, 255)])
+    # DECIMER는 RGB 배열에 BGR2GRAY를 쓰므로 빨강이 파랑의 가중치(0.114)를 받는다
+    assert list(np.asarray(to_grayscale(colors))[0]) == [29, 150, 76]
+    gray = Image.new('L', (4, 4), 123)
+    assert (np.asarray(to_grayscale(gray)) == 123).all()
+
+
+def test_grayscale_matches_opencv():
+    cv2 = pytest.importorskip('cv2')
+    rgb = np.random.default_rng(0).integers(0, 256, (64, 48, 3), dtype=np.uint8)
+    expected = cv2.cvtColor(rgb, cv2.COLOR_BGR2GRAY)
+    np.testing.assert_array_equal(np.asarray(to_grayscale(Image.fromarray(rgb))), expected)
+
+
+def test_color_jpeg_is_grayscaled_with_decimers_weights():
+    image = Image.new('RGB', (200, 200), (255, 255, 255))
+    ImageDraw.Draw(image).rectangle([40, 40, 160, 160], fill=(200, 30, 30))
+    buf = BytesIO()
+    image.save(buf, format='JPEG', quality=95)
+    payload, _ = preprocess_image(buf.getvalue(), crop=False)
+    # 빨간 사각형은 PIL 가중치(약 84)가 아니라 BGR2GRAY 가중치로 약 49가 된다
+    assert abs(int(payload[100, 100]) - 49) <= 4
+
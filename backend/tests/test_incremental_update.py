@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+@pytest.fixture
+def base(known_compounds):
+    """A predictor trained on the first 100 compounds; the other 50 arrive as an update."""
+    smiles, ic50 = known_compounds
+    predictor = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=256)
+    X, y, _ = predictor.prepare_data(smiles[:100], ic50[:100], n_jobs=1)
+    predictor.train(X, y)
+    return predictor, X, y, (smiles[100:], ic50[100:])
+
+
+def test_update_adds_trees_in_proportion_to_the_new_rows(base):
+    predictor, _, _, new_rows = base
+    old_trees = list(predictor.model.estimators_)
+    scaler_mean = predictor.scaler.mean_.copy()
+
+    report = predictor.update(*new_rows, n_jobs=1)
+    assert report['n_new_rows'] == 50
+    assert report['n_new_trees'] == 10  # 20 trees * 50 / 100 rows
+    assert len(predictor.model.estimators_) == 30
+    # 기존 트리와 스케일러는 그대로 두고 새 트리만 붙는다
+    assert predictor.model.estimators_[:20] == old_trees
+    np.testing.assert_array_equal(predictor.scaler.mean_, scaler_mean)
+    assert not predictor.model.warm_start
+    assert not hasattr(predictor.model, 'oob_score_')
+    assert report['full_retrain_estimate_seconds'] > 0
+
+
+def test_update_records_lineage_and_asks_for_rebuilds(base):
+    predictor, _, _, (smiles, ic50) = base
+    assert not predictor.needs_rebuild(2)
+    predictor.update(smiles[:25], ic50[:25], n_jobs=1)
+    report = predictor.update(smiles[25:], ic50[25:], n_jobs=1)
+
+    assert [entry['kind'] for entry in predictor.lineage] == ['full', 'incremental', 'incremental']
+    assert [entry['n_total_rows'] for entry in predictor.lineage] == [100, 125, 150]
+    assert report['version'] == predictor.model_version and predictor.model_version.startswith('v3-incremental')
+    assert predictor.needs_rebuild(2)
+
+
+def test_rebuild_resets_the_forest_size(base, known_compounds):
+    predictor, _, _, new_rows = base
+    predictor.update(*new_rows, n_jobs=1)
+    X, y, _ = predictor.prepare_data(*known_compounds, n_jobs=1)
+    predictor.rebuild(X, y)
+    assert len(predictor.model.estimators_) == 20
+    assert predictor.lineage[-1]['kind'] == 'full'
+    assert not predictor.needs_rebuild(1)
+
+
+def test_xgboost_backend_falls_back_to_the_updated_forest(base):
+    predictor, X, y, new_rows = base
+    predictor.train_xgboost(X, y)
+    predictor.set_inference_backend('xgboost')
+    predictor.update(*new_rows, n_jobs=1)
+    assert predictor.inference_backend == 'flat'
+    np.testing.assert_allclose(predictor._forest_predict(predictor.X_test),
+                               predictor.model.predict(predictor.X_test), rtol=1e-5)
+
+
+def test_update_needs_a_fitted_forest(known_compounds):
+    with pytest.raises(ValueError):
+        SMILEStoIC50Predictor().update(*known_compounds)
@@ -0,0 +1,73 @@
+import threading
+import time
+import numpy as np
+import pytest
+import decimer_optimized
+
+
+@pytest.fixture
+def inference(monkeypatch):
+    # api 테스트와 같은 프로세스에서 처음 import될 수 있으므로 대체 모델 설정으로 불러온다
+    monkeypatch.setenv('IMAGE_MODEL', 'stub')
+    import inference
+    return inference
+
+
+def test_decodes_run_one_at_a_time(inference, monkeypatch):
+    running = []
+    overlaps = []
+
+    def slow_predict(image):
+        running.append(image)
+        overlaps.append(len(running))
+        time.sleep(0.02)
+        running.remove(image)
+        return f'C{image}'
+
+    monkeypatch.setattr(inference, '_decimer_predict', slow_predict)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.update({i: inference._decode_one_at_a_time(i)}))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    assert inference._waiting_count() >= 1
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1, 1, 1, 1]
+    assert results == {i: f'C{i}' for i in range(4)}
+    assert inference._waiting_count() == 0
+
+
+def test_a_failed_decode_releases_the_decoder(inference, monkeypatch):
+    def failing_predict(image):
+        raise RuntimeError('bad image')
+
+    monkeypatch.setattr(inference, '_decimer_predict', failing_predict)
+    with pytest.raises(RuntimeError):
+        inference._decode_one_at_a_time('x')
+    monkeypatch.setattr(inference, '_decimer_predict', lambda image: 'CCO')
+    assert inference._decode_one_at_a_time('y') == 'CCO'
+    assert inference._waiting_count() == 0
+
+
+@pytest.mark.parametrize('installed, accepts', [('2.7.1', True), ('2.8.0', True), ('2.6.0', False), (None, False)])
+def test_array_input_follows_the_installed_decimer(monkeypatch, installed, accepts):
+    monkeypatch.setattr(decimer_optimized, 'installed_decimer_version', lambda: installed)
+    assert decimer_optimized.accepts_arrays('tf') is accepts
+    assert decimer_optimized.accepts_arrays('tflite') is True
+
+
+def test_arrays_are_png_encoded_only_for_a_decimer_without_array_input(inference, monkeypatch):
+    seen = []
+    monkeypatch.setattr(decimer_optimized, 'load_predictor', lambda runtime: seen.append)
+    array = np.full((8, 8), 255, dtype=np.uint8)
+
+    monkeypatch.setattr(decimer_optimized, 'accepts_arrays', lambda runtime: True)
+    inference._load_decimer()(array)
+    assert seen[-1] is array
+
+    monkeypatch.setattr(decimer_optimized, 'accepts_arrays', lambda runtime: False)
+    inference._load_decimer()(array)
+    assert seen[-1].getvalue().startswith(b'\x89PNG')
+
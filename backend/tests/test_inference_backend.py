@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+@pytest.fixture
+def xgboost_predictor(known_compounds):
+    predictor = SMILEStoIC50Predictor(n_estimators=10, fingerprint_nbits=256)
+    X, y, _ = predictor.prepare_data(*known_compounds, n_jobs=1)
+    predictor.train(X, y)
+    predictor.train_xgboost(X, y)
+    predictor.set_inference_backend('xgboost')
+    return predictor, X, y
+
+
+def test_rebuild_retrains_the_xgboost_booster(xgboost_predictor):
+    predictor, X, y = xgboost_predictor
+    stale = predictor.xgb_model
+    predictor.rebuild(X[:100], y[:100])
+
+    assert predictor.xgb_model is not stale
+    assert predictor.inference_backend in ('sklearn', 'flat', 'xgboost')
+    # 새 부스터는 새 스케일러로 변환된 검증 세트에서 학습 때와 같은 예측을 낸다
+    expected = predictor.xgb_model.predict(predictor._fit_matrix(predictor.X_test))
+    np.testing.assert_allclose(predictor._forest_predict(predictor.X_test, 'xgboost'), expected, rtol=1e-5)
+
+
+def test_flat_backend_survives_retraining(xgboost_predictor):
+    predictor, X, y = xgboost_predictor
+    predictor.set_inference_backend('flat')
+    predictor.train(X[:100], y[:100])
+    assert predictor.inference_backend == 'flat'
+    np.testing.assert_allclose(predictor._forest_predict(predictor.X_test),
+                               predictor.model.predict(predictor.X_test))
@@ -0,0 +1,62 @@
+import json
+import multiprocessing
+from leaderboard_store import LeaderboardStore, migrate_json
+
+
+def test_ranks_by_ic50_with_ties_in_submission_order(tmp_path):
+    store = LeaderboardStore(str(tmp_path / 'lb.jsonl'))
+    assert store.add({'nickname': 'a', 'ic50': 5.0}) == 0
+    assert store.add({'nickname': 'b', 'ic50': 1.0}) == 0
+    assert store.add({'nickname': 'c', 'ic50': 5.0}) == 2
+    assert [entry['nickname'] for entry in store.top()] == ['b', 'a', 'c']
+    assert [entry['nickname'] for entry in store.top(1, offset=1)] == ['a']
+
+
+def test_skips_invalid_and_torn_lines(tmp_path):
+    path = tmp_path / 'lb.jsonl'
+    path.write_text('{"nickname": "a", "ic50": 2}\nnot json\n{"nickname": "b"}\n{"nickname": "c", "ic50": 1}\n'
+                    '{"nickname": "torn", "ic5')
+    store = LeaderboardStore(str(path))
+    assert [entry['nickname'] for entry in store.top()] == ['c', 'a']
+    store.compact()
+    assert [json.loads(line)['nickname'] for line in path.read_text().splitlines()] == ['c', 'a']
+
+
+def test_sees_entries_added_by_another_store(tmp_path):
+    path = str(tmp_path / 'lb.jsonl')
+    first, second = LeaderboardStore(path), LeaderboardStore(path)
+    first.add({'nickname': 'a', 'ic50': 3.0})
+    second.add({'nickname': 'b', 'ic50': 2.0})
+    first.compact()
+    second.add({'nickname': 'c', 'ic50': 1.0})
+    assert [entry['nickname'] for entry in first.top()] == ['c', 'b', 'a']
+    assert len(second) == 3
+
+
+def _add_many(path, worker, n):
+    store = LeaderboardStore(path, compact_every=7)
+    for i in range(n):
+        store.add({'nickname': f'{worker}-{i}', 'ic50': (worker * n + i) % 13})
+
+
+def test_concurrent_processes_with_compaction_lose_nothing(tmp_path):
+    path = str(tmp_path / 'lb.jsonl')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_add_many, args=(path, worker, 60)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+    entries = LeaderboardStore(path).top()
+    assert sorted(entry['nickname'] for entry in entries) == sorted(
+        f'{worker}-{i}' for worker in range(4) for i in range(60))
+    assert [entry['ic50'] for entry in entries] == sorted(entry['ic50'] for entry in entries)
+
+
+def test_migrates_the_old_json_once(tmp_path):
+    json_path, log_path = tmp_path / 'lb.json', str(tmp_path / 'lb.jsonl')
+    json_path.write_text(json.dumps([{'nickname': 'a', 'ic50': 2}, {'nickname': 'b', 'ic50': 1}]))
+    assert migrate_json(str(json_path), log_path) == 2
+    assert migrate_json(str(json_path), log_path) == 0
+    assert [entry['nickname'] for entry in LeaderboardStore(log_path).top()] == ['b', 'a']
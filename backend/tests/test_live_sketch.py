@@ -0,0 +1,90 @@
+import threading
+from live_sketch import LiveSketchHub, Superseded
+from serving_limits import BoundedExecutor
+
+
+class _BlockingCompute:
+    """compute(mol_block, check) that records its inputs and can be held mid-computation."""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, mol_block, check):
+        self.calls.append(mol_block)
+        self.started.set()
+        self.release.wait(5)
+        check('predict')
+        return {'smiles': mol_block}
+
+
+def _next_prediction(stream):
+    for event in stream:
+        if event.startswith('event: prediction'):
+            return event
+
+
+def test_rapid_edits_collapse_into_the_latest_version():
+    compute = _BlockingCompute()
+    hub = LiveSketchHub(compute, BoundedExecutor(max_workers=1, max_queue=4, name='test'))
+    stream = hub.events('s1', heartbeat=0.05)
+    assert next(stream).startswith('event: ready')
+    assert hub.has_listener('s1')
+
+    hub.submit('s1', 'v1')
+    assert compute.started.wait(5)
+    for edit in ('v2', 'v3', 'v4'):
+        hub.submit('s1', edit)
+    compute.release.set()
+    assert '"version": 4' in _next_prediction(stream)
+    assert compute.calls == ['v1', 'v4']  # v1은 도중에 버려지고 v2, v3는 계산되지 않는다
+    stream.close()
+    assert not hub.has_listener('s1')
+
+
+def test_compute_now_raises_when_a_newer_edit_arrives():
+    compute = _BlockingCompute()
+    hub = LiveSketchHub(compute, BoundedExecutor(max_workers=1, max_queue=0, name='test'))
+    outcome = {}
+
+    def first():
+        try:
+            outcome['first'] = hub.compute_now('s1', 'v1')
+        except Superseded:
+            outcome['first'] = 'superseded'
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert compute.started.wait(5)
+    compute.release.set()
+    second = hub.compute_now('s1', 'v2')
+    thread.join(5)
+    assert outcome['first'] == 'superseded'
+    assert second == {'smiles': 'v2', 'version': 2}
+
+
+def test_full_executor_publishes_an_overloaded_result():
+    busy = BoundedExecutor(max_workers=1, max_queue=0, name='test')
+    release = threading.Event()
+    busy.submit(release.wait, 5)
+    hub = LiveSketchHub(lambda mol_block, check: {'smiles': mol_block}, busy)
+    stream = hub.events('s1', heartbeat=0.05)
+    next(stream)
+    hub.submit('s1', 'v1')
+    assert '"error": "overloaded"' in _next_prediction(stream)
+    release.set()
+    stream.close()
+
+
+def test_failed_molblock_is_sent_as_a_prediction_event():
+    def compute(mol_block, check):
+        raise ValueError('Invalid MolBlock')
+
+    hub = LiveSketchHub(compute, BoundedExecutor(max_workers=1, max_queue=1, name='test'))
+    stream = hub.events('s1', heartbeat=0.05)
+    next(stream)
+    hub.submit('s1', 'bad')
+    event = _next_prediction(stream)
+    assert '"error": "Invalid MolBlock"' in event and '"version": 1' in event
+    stream.close()
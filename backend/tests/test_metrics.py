@@ -0,0 +1,77 @@
+import os
+from metrics import MetricsRegistry
+
+
+def _registry():
+    registry = MetricsRegistry()
+    registry.counter('requests_total', 'Requests.', ['route'])
+    registry.gauge('in_flight', 'In flight.')
+    registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    return registry
+
+
+def _sample(text, name):
+    return next(float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(name + ' '))
+
+
+def test_renders_prometheus_text():
+    registry = _registry()
+    registry.counter('requests_total', '').inc(route='/predict')
+    registry.gauge('in_flight', '').set(2)
+    registry.histogram('latency_seconds', '').observe(0.5)
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/predict"} 1' in text
+    assert _sample(text, 'in_flight') == 2
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+
+
+def test_shared_directory_sums_every_process(tmp_path):
+    directory = str(tmp_path)
+    # 끝난 워커: 카운터/히스토그램은 남고 게이지는 빠진다
+    pid = os.fork()
+    if pid == 0:
+        dead = _registry()
+        dead.counter('requests_total', '').inc(3, route='/predict')
+        dead.gauge('in_flight', '').set(5)
+        dead.histogram('latency_seconds', '').observe(2.0)
+        dead.write_snapshot(directory)
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    other = _registry()
+    other.share(directory, interval=3600)
+    other.counter('requests_total', '').inc(route='/predict')
+    other.counter('requests_total', '').inc(route='/health')
+    other.gauge('in_flight', '').set(1)
+    other.write_snapshot(directory)
+
+    this = _registry()
+    this.share(directory, interval=3600)
+    this.counter('requests_total', '').inc(route='/predict')
+    this.gauge('in_flight', '').set(2)
+    this.histogram('latency_seconds', '').observe(0.05)
+
+    text = this.render()
+    assert 'requests_total{route="/predict"} 5' in text
+    assert 'requests_total{route="/health"} 1' in text
+    assert _sample(text, 'in_flight') == 3
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert _sample(text, 'latency_seconds_count') == 2
+
+
+def test_forked_worker_does_not_count_the_parents_values_twice(tmp_path):
+    registry = _registry()
+    registry.counter('requests_total', '').inc(7, route='/predict')
+    registry.write_snapshot(str(tmp_path))
+    pid = os.fork()
+    if pid == 0:
+        registry.share(str(tmp_path), interval=3600)
+        registry.counter('requests_total', '').inc(route='/predict')
+        ok = 'requests_total{route="/predict"} 8' in registry.render()
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
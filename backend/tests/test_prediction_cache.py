@@ -0,0 +1,72 @@
+import os
+import time
+from prediction_cache import PredictionCache
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    PredictionCache(disk_path=path).set('v1:CCO', 1.5)
+    cache = PredictionCache(disk_path=path)
+    assert cache.get('v1:CCO') == 1.5
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_sqlite_connection_is_reopened_after_fork(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = PredictionCache(disk_path=path)
+    cache.set('v1:CCO', 1.5)
+    parent_db = cache._db
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # 자식: 메모리 계층을 비우고, 부모의 연결이 아닌 새 연결로 디스크 계층을 읽고 쓴다
+        cache._entries.clear()
+        ok = cache.get('v1:CCO') == 1.5 and cache._db is not parent_db
+        cache.set('v1:CCN', 2.5)
+        os.write(write_fd, b'1' if ok else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b'1'
+    assert cache._db is parent_db
+    assert PredictionCache(disk_path=path).get('v1:CCN') == 2.5
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2)
+    cache.set('a', 1.0)
+    cache.set('b', 2.0)
+    assert cache.get('a') == 1.0  # b가 가장 오래 안 쓰인 항목이 된다
+    cache.set('c', 3.0)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1.0, 3.0)
+    assert cache.stats()['size'] == 2
+
+
+def test_entries_expire_after_the_ttl_in_both_tiers(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    path = str(tmp_path / 'cache.sqlite')
+    cache = PredictionCache(ttl=60, disk_path=path)
+    cache.set('v1:CCO', 1.5)
+    now[0] += 59
+    assert cache.get('v1:CCO') == 1.5
+    assert PredictionCache(ttl=60, disk_path=path).get('v1:CCO') == 1.5
+    now[0] += 2
+    assert cache.get('v1:CCO') is None
+    assert PredictionCache(ttl=60, disk_path=path).get('v1:CCO') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_set_many_writes_the_disk_tier_in_one_transaction(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = PredictionCache(maxsize=2, disk_path=path)
+    cache.get('warm-up')  # 연결과 테이블 생성은 세지 않는다
+    commits = []
+    cache._db.set_trace_callback(lambda sql: commits.append(sql) if sql.strip().upper() == 'COMMIT' else None)
+    cache.set_many([('v1:C', 1.0), ('v1:CC', 2.0), ('v1:CCC', 3.0)])
+    assert len(commits) == 1
+    assert cache.stats()['size'] == 2  # 메모리 계층은 maxsize를 지킨다
+    reopened = PredictionCache(disk_path=path)
+    assert [reopened.get(key) for key in ('v1:C', 'v1:CC', 'v1:CCC')] == [1.0, 2.0, 3.0]
+    cache.set_many([])
+    assert len(commits) == 1
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from ic50_predictor_class import SMILEStoIC50Predictor
+
+
+@pytest.fixture(scope='module')
+def full(known_compounds):
+    predictor = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=256)
+    X, y, _ = predictor.prepare_data(*known_compounds, n_jobs=1)
+    predictor.train(X, y)
+    return predictor, X, y
+
+
+def _top_k_names(predictor, k):
+    names = predictor.feature_names()
+    return {names[i] for i in np.argsort(predictor.model.feature_importances_)[::-1][:k]}
+
+
+def test_reduced_model_uses_the_top_k_features(full):
+    predictor, X, y = full
+    reduced, metrics = predictor.build_reduced(X, y, 32)
+    assert set(reduced.feature_names()) == _top_k_names(predictor, 32)
+    assert reduced.n_model_features == 32
+    assert list(reduced.selected_bits) == sorted(reduced.selected_bits)
+    # 하이퍼파라미터와 분할이 같아 지표를 그대로 비교할 수 있다
+    assert reduced.model.get_params()['max_features'] == predictor.model.get_params()['max_features']
+    np.testing.assert_array_equal(reduced.y_test, predictor.y_test)
+    assert {'train_r2', 'test_r2', 'test_rmse'} <= metrics.keys()
+
+
+def test_descriptor_cap_keeps_the_most_important_descriptors(full):
+    predictor, X, y = full
+    ranked = [name for name in (predictor.feature_names()[i] for i in
+                                np.argsort(predictor.model.feature_importances_)[::-1][:64])
+              if name in predictor.descriptor_names]
+    reduced, _ = predictor.build_reduced(X, y, 64, max_descriptors=2)
+    assert set(reduced.descriptor_names) == set(ranked[:2])
+
+    bits_only, _ = predictor.build_reduced(X, y, 64, max_descriptors=0)
+    assert not bits_only.use_descriptors
+    assert bits_only.n_model_features == 64 - len(ranked)
+
+
+def test_reduced_model_featurizes_only_what_it_uses(full, known_compounds):
+    predictor, X, y = full
+    reduced, _ = predictor.build_reduced(X, y, 48, max_descriptors=3)
+    smiles = known_compounds[0][:20]
+    predictions, valid_indices = reduced.predict_with_indices(smiles, n_jobs=1)
+
+    # 선택된 기술자만 계산한 결과가 전체 특징 행렬의 해당 열과 같아야 한다
+    columns = [predictor.descriptor_names.index(name) for name in reduced.descriptor_names]
+    X_reduced = X[:, np.concatenate([np.arange(predictor.fingerprint_nbits),
+                                     predictor.fingerprint_nbits + np.array(columns, dtype=np.intp)])]
+    expected = reduced._predict_features(X_reduced[valid_indices])
+    np.testing.assert_allclose(predictions, expected)
+
+
+def test_compact_features_select_the_same_columns(known_compounds):
+    dense = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=256)
+    X, y, _ = dense.prepare_data(*known_compounds, n_jobs=1)
+    dense.train(X, y)
+    compact = SMILEStoIC50Predictor(n_estimators=20, fingerprint_nbits=256)
+    X_compact, _, _ = compact.prepare_data(*known_compounds, n_jobs=1, compact=True)
+    compact.train(X_compact, y)
+
+    reduced_dense, _ = dense.build_reduced(X, y, 32)
+    reduced_compact, _ = compact.build_reduced(X_compact, y, 32)
+    assert reduced_compact.feature_format == 'compact'
+    assert reduced_compact.feature_names() == reduced_dense.feature_names()
+
+
+def test_report_compares_each_reduced_model_with_the_full_one(full, known_compounds):
+    predictor, X, y = full
+    rows, models = predictor.reduced_model_report(X, y, ks=(16, 32), descriptor_counts=(None, 0),
+                                                  smiles_sample=known_compounds[0][:5], n_latency=5)
+    assert [row['model'] for row in rows] == ['full', 'top-16', 'top-16/d0', 'top-32', 'top-32/d0']
+    assert set(models) == {(16, None), (16, 0), (32, None), (32, 0)}
+    assert all(row['single_p50_ms'] > 0 and row['forest_mb'] > 0 for row in rows)
+    assert rows[0]['input_row_bytes'] > rows[-1]['input_row_bytes']
@@ -0,0 +1,83 @@
+import csv
+import pytest
+from rdkit import Chem
+import batch_featurizer
+import screen_library
+from serving_artifact import export_artifact
+
+
+@pytest.fixture(scope='module')
+def model_path(trained_predictor, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('screen') / 'artifact')
+    export_artifact(trained_predictor, path)
+    return path
+
+
+def _read_csv(path):
+    with open(path) as f:
+        return list(csv.DictReader(f))
+
+
+def test_malformed_sdf_record_is_skipped(model_path, tmp_path):
+    malformed = 'broken\n  junk\n\n  2  1  0  0  0  0  0  0  0  0999 V2000\nnot an atom line\nM  END\n'
+    records = [Chem.MolToMolBlock(Chem.MolFromSmiles('CCO')), malformed,
+               Chem.MolToMolBlock(Chem.MolFromSmiles('c1ccccc1O'))]
+    library = tmp_path / 'library.sdf'
+    library.write_text(''.join(record + '$$$$\n' for record in records))
+    output = str(tmp_path / 'scores.csv')
+
+    state = screen_library.screen(str(library), output, model_path, n_jobs=1)
+    assert (state['records'], state['scored'], state['invalid']) == (3, 2, 1)
+    assert [(row['record'], row['smiles']) for row in _read_csv(output)] == [('0', 'CCO'), ('2', 'Oc1ccccc1')]
+
+
+def test_empty_smiles_count_as_invalid(trained_predictor):
+    predictions, valid = trained_predictor.predict_with_indices(['CCO', '', None, 'c1ccccc1O'], n_jobs=1)
+    assert valid == [0, 3] and len(predictions) == 2
+
+
+def test_one_featurizer_pool_serves_every_chunk(model_path, known_compounds, tmp_path, monkeypatch):
+    started = []
+    real_pool = batch_featurizer.ProcessPoolExecutor
+    monkeypatch.setattr(batch_featurizer, 'ProcessPoolExecutor',
+                        lambda *args, **kwargs: started.append(1) or real_pool(*args, **kwargs))
+    library = tmp_path / 'library.smi'
+    smiles = known_compounds[0][:60]
+    library.write_text(''.join(f'{s} mol{i}\n' for i, s in enumerate(smiles)))
+    output = str(tmp_path / 'scores.csv')
+
+    state = screen_library.screen(str(library), output, model_path, chunk=20, n_jobs=2)
+    assert started == [1]
+    assert state['scored'] == 60
+    expected, _ = screen_library.load_predictor(model_path).predict(smiles, n_jobs=1)
+    assert [float(row['ic50']) for row in _read_csv(output)] == pytest.approx(expected)
+
+
+def test_interrupted_run_resumes_without_duplicates(model_path, known_compounds, tmp_path, monkeypatch):
+    library = tmp_path / 'library.smi'
+    library.write_text(''.join(f'{s} mol{i}\n' for i, s in enumerate(known_compounds[0][:30])))
+    output = str(tmp_path / 'scores.csv')
+    real_load = screen_library.load_predictor
+
+    def load_failing_on_second_chunk(path, backend=None):
+        predictor = real_load(path, backend)
+        predict = predictor.predict_with_indices
+        calls = []
+
+        def predict_then_fail(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return predict(*args, **kwargs)
+        predictor.predict_with_indices = predict_then_fail
+        return predictor
+
+    monkeypatch.setattr(screen_library, 'load_predictor', load_failing_on_second_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        screen_library.screen(str(library), output, model_path, chunk=10, n_jobs=1)
+    assert len(_read_csv(output)) == 10
+
+    monkeypatch.setattr(screen_library, 'load_predictor', real_load)
+    state = screen_library.screen(str(library), output, model_path, chunk=10, n_jobs=1)
+    rows = _read_csv(output)
+    assert state['records'] == 30 and [row['record'] for row in rows] == [str(i) for i in range(30)]
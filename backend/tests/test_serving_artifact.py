@@ -0,0 +1,52 @@
+import json
+import os
+import numpy as np
+import pytest
+from serving_artifact import IncompatibleArtifact, export_artifact, is_artifact, load_artifact
+
+
+def test_round_trip_gives_the_same_predictions(trained_predictor, known_compounds, tmp_path):
+    path = str(tmp_path / 'artifact')
+    header = export_artifact(trained_predictor, path)
+    assert is_artifact(path)
+
+    loaded = load_artifact(path)
+    assert loaded.model_version == header['model_version']
+    assert loaded.inference_backend == 'flat'
+    assert not hasattr(loaded.model, 'estimators_')  # sklearn 트리는 담기지 않는다
+    smiles = known_compounds[0][:40] + ['not a smiles']
+    expected, expected_valid = trained_predictor.predict(smiles, n_jobs=1)
+    actual, actual_valid = loaded.predict(smiles, n_jobs=1)
+    assert actual_valid == expected_valid
+    np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+
+def test_same_model_exports_the_same_version(trained_predictor, tmp_path):
+    first = export_artifact(trained_predictor, str(tmp_path / 'a'))
+    second = export_artifact(trained_predictor, str(tmp_path / 'b'))
+    assert first['model_version'] == second['model_version']
+
+
+def _rewrite_header(path, **changes):
+    header_path = os.path.join(path, 'header.json')
+    with open(header_path) as f:
+        header = json.load(f)
+    header.update(changes)
+    with open(header_path, 'w') as f:
+        json.dump(header, f)
+
+
+def test_rejects_other_format_versions(trained_predictor, tmp_path):
+    path = str(tmp_path / 'artifact')
+    export_artifact(trained_predictor, path)
+    _rewrite_header(path, format_version=999)
+    with pytest.raises(IncompatibleArtifact, match='format'):
+        load_artifact(path)
+
+
+def test_rejects_a_different_descriptor_set(trained_predictor, tmp_path):
+    path = str(tmp_path / 'artifact')
+    header = export_artifact(trained_predictor, path)
+    _rewrite_header(path, descriptor_names=header['descriptor_names'][:-1])
+    with pytest.raises(IncompatibleArtifact, match='descriptor'):
+        load_artifact(path)
@@ -0,0 +1,50 @@
+import threading
+import time
+from concurrent.futures import TimeoutError
+import pytest
+from serving_limits import BoundedExecutor, Overloaded
+
+
+def _wait_idle(executor, timeout=5):
+    # 슬롯은 future의 완료 콜백에서 반납되므로 result()가 돌아온 직후에는 아직 남아 있을 수 있다
+    deadline = time.monotonic() + timeout
+    while executor.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_rejects_work_beyond_workers_plus_queue():
+    executor = BoundedExecutor(max_workers=1, max_queue=1, name='test')
+    release = threading.Event()
+    running = [executor.submit(release.wait, 5) for _ in range(2)]
+    with pytest.raises(Overloaded):
+        executor.submit(lambda: None)
+    assert executor.stats()['rejected'] == 1
+
+    release.set()
+    for future in running:
+        future.result(timeout=5)
+    _wait_idle(executor)
+    assert executor.stats()['pending'] == 0
+    assert executor.run(lambda: 'ok', timeout=5) == 'ok'
+
+
+def test_timed_out_task_keeps_its_slot_until_it_finishes():
+    executor = BoundedExecutor(max_workers=1, max_queue=0, name='test')
+    release = threading.Event()
+    with pytest.raises(TimeoutError):
+        executor.run(release.wait, 5, timeout=0.05)
+    assert executor.stats()['timeouts'] == 1
+    with pytest.raises(Overloaded):
+        executor.submit(lambda: None)
+
+    release.set()
+    _wait_idle(executor)
+    assert executor.run(lambda: 'ok', timeout=5) == 'ok'
+
+
+def test_exceptions_reach_the_caller_and_free_the_slot():
+    executor = BoundedExecutor(max_workers=1, max_queue=0, name='test')
+    with pytest.raises(ZeroDivisionError):
+        executor.run(lambda: 1 / 0, timeout=5)
+    _wait_idle(executor)
+    assert executor.run(lambda: 'ok', timeout=5) == 'ok'
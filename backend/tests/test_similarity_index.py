@@ -0,0 +1,43 @@
+import numpy as np
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem
+import similarity_index
+from similarity_index import TanimotoIndex, popcount_rows
+
+
+def _brute_force(smiles_list, query, radius, nbits):
+    fingerprint = lambda smiles: AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(smiles), radius, nBits=nbits)
+    return np.array(DataStructs.BulkTanimotoSimilarity(fingerprint(query), [fingerprint(s) for s in smiles_list]))
+
+
+def test_popcount_matches_unpacked_bits():
+    packed = np.random.default_rng(0).integers(0, 256, (50, 64), dtype=np.uint8)
+    expected = np.unpackbits(packed, axis=1).sum(axis=1)
+    np.testing.assert_array_equal(popcount_rows(packed), expected)
+    np.testing.assert_array_equal(popcount_rows(packed[:, :63]), np.unpackbits(packed[:, :63], axis=1).sum(axis=1))
+
+
+def test_search_matches_rdkit_tanimoto_across_blocks(trained_predictor, known_compounds, monkeypatch):
+    monkeypatch.setattr(similarity_index, 'BLOCK_ROWS', 16)
+    smiles, values = known_compounds
+    index = TanimotoIndex.build(trained_predictor, smiles + ['not a smiles'], values + [0.0])
+    assert len(index) == len(smiles)
+
+    query = smiles[7]
+    expected = _brute_force(smiles, query, trained_predictor.fingerprint_radius, trained_predictor.fingerprint_nbits)
+    results = index.search(query, k=5)
+    assert results[0]['smiles'] == query and results[0]['similarity'] == 1.0
+    np.testing.assert_allclose([r['similarity'] for r in results], np.sort(expected)[::-1][:5])
+    assert all(values[r['index']] == r['value'] for r in results)
+
+    above = index.search(query, k=None, threshold=0.4)
+    assert len(above) == int((expected >= 0.4).sum())
+
+
+def test_saved_index_loads_memory_mapped(trained_predictor, known_compounds, tmp_path):
+    smiles, values = known_compounds
+    built = TanimotoIndex.build(trained_predictor, smiles, values, path=str(tmp_path))
+    loaded = TanimotoIndex.load(str(tmp_path))
+    assert isinstance(loaded.bits, np.memmap)
+    assert loaded.search(smiles[3], k=3) == built.search(smiles[3], k=3)
+    assert loaded.search('not a smiles') == []
@@ -0,0 +1,65 @@
+# update_ic50_model.py
+# 새 측정값이 추가된 CSV로 기존 모델을 갱신한다.
+# 평소에는 새 행만 특징화해서 트리를 추가하고(warm start),
+# REBUILD_EVERY번 갱신마다 또는 --rebuild 옵션이 있으면 전체를 다시 학습한다.
+import argparse
+import joblib
+import pandas as pd
+from feature_store import FeatureStore
+from serving_artifact import export_artifact
+
+REBUILD_EVERY = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IC50 모델 증분 갱신")
+    parser.add_argument('--csv', default='sorted_f_avg_IC50.csv')
+    parser.add_argument('--model', default='ic50_model.pkl')
+    parser.add_argument('--artifact', default='ic50_model_artifact')
+    parser.add_argument('--rebuild-every', type=int, default=REBUILD_EVERY,
+                        help="이 횟수만큼 증분 갱신한 뒤에는 전체 재학습")
+    parser.add_argument('--rebuild', action='store_true', help="전체 재학습 강제")
+    parser.add_argument('--new-trees', type=int, default=None,
+                        help="추가할 트리 수 (기본값: 새 데이터 비율에 비례)")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    if not hasattr(model, 'training_smiles'):
+        raise SystemExit("학습에 쓴 SMILES 목록이 없는 모델입니다. save_ic50_model.py로 다시 학습하세요.")
+
+    data = pd.read_csv(args.csv).dropna(subset=['f_avg_IC50'])
+    # 이상치 기준은 전체 데이터로 계산하고, 특징화는 새 행만 한다
+    cleaned_smiles, cleaned_ic50, _ = model.clean_data(data['SMILES'].tolist(), data['f_avg_IC50'].tolist())
+    known = set(model.training_smiles)
+    new_rows = [i for i, smiles in enumerate(cleaned_smiles) if smiles not in known]
+    feature_store = FeatureStore('feature_store', model)
+
+    if args.rebuild or model.needs_rebuild(args.rebuild_every):
+        print(f"전체 재학습: {len(cleaned_smiles)}개 행")
+        X, y, valid_indices = model.prepare_data(cleaned_smiles, cleaned_ic50, feature_store=feature_store,
+                                                 compact=model.feature_format == 'compact')
+        metrics = model.rebuild(X, y)
+        model.training_smiles = [cleaned_smiles[i] for i in valid_indices]
+        print(f"  test r2 = {metrics['test_r2']:.4f}, {model.lineage[-1]['seconds']:.1f}초")
+    elif not new_rows:
+        print("새 데이터가 없습니다.")
+        return
+    else:
+        report = model.update([cleaned_smiles[i] for i in new_rows], [cleaned_ic50[i] for i in new_rows],
+                              n_new_trees=args.new_trees, feature_store=feature_store)
+        print(f"증분 갱신: 새 행 {report['n_new_rows']}개, 트리 {report['n_new_trees']}개 추가 "
+              f"(총 {report['n_trees']}개), {report['seconds']:.1f}초")
+        if report['seconds_saved'] is not None:
+            print(f"  전체 재학습 추정 {report['full_retrain_estimate_seconds']:.1f}초 대비 "
+                  f"{report['seconds_saved']:.1f}초 절약")
+
+    joblib.dump(model, args.model)
+    export_artifact(model, args.artifact)
+    print(f"✅ 모델 갱신 완료! (version {model.model_version})")
+    for entry in model.lineage[-5:]:
+        print(f"  v{entry['version']} {entry['kind']:<11} {entry['created']}  "
+              f"rows={entry['n_total_rows']} trees={entry['n_trees']} {entry['seconds']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -24,3 +24,40 @@ export async function getLeaderboard() {
   const res = await fetch(`${API_URL}/leaderboard`);
   return await res.json();
 }
+
+export interface LivePrediction {
+  version: number;
+  smiles: string;
+  ic50: number;
+  nearest?: { smiles: string; ic50: number; similarity: number } | null;
+  error?: string;
+}
+
+// 실시간 스케치 채널: 편집마다 /sketch/<session>에 보내고 결과는 SSE 스트림으로 받는다.
+// 서버는 세션별로 가장 최근 편집만 계산하고, 계산 중에 새 편집이 오면 이전 작업을 버린다.
+export function createLiveSketch(onPrediction: (prediction: LivePrediction) => void) {
+  const sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  const events = new EventSource(`${API_URL}/sketch/${sessionId}/events`);
+  events.addEventListener("prediction", (event) => {
+    onPrediction(JSON.parse((event as MessageEvent).data));
+  });
+  let sent = 0;
+
+  return {
+    async update(mol: string) {
+      const seq = ++sent;
+      const res = await fetch(`${API_URL}/sketch/${sessionId}`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ mol }),
+      });
+      // 스트림이 다른 서버 워커에 연결돼 있으면 결과(또는 에러)가 응답으로 바로 온다 (더 새 편집이 있으면 무시)
+      if ((res.status === 200 || res.status === 400) && seq === sent) {
+        onPrediction(await res.json());
+      }
+    },
+    close() {
+      events.close();
+    },
+  };
+}
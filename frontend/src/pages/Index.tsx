@@ -5,7 +5,7 @@ import MarvinJSEditor from "@/components/MarvinJSEditor";
 import Leaderboard from "@/components/Leaderboard";
 import PredictionForm from "@/components/PredictionForm";
 import { CompoundEntry, MarvinEditorRef } from "@/types";
-import { predictFromMol, submitToLeaderboard, getLeaderboard } from "@/lib/api";
+import { predictFromMol, submitToLeaderboard, getLeaderboard, createLiveSketch } from "@/lib/api";
 import { Beaker, Braces, Trophy } from "lucide-react";
 import atlasLogo from "./atlas.png"
 import uiucLogo from "./uiuc.png"
@@ -18,6 +18,16 @@ const Index = () => {
   const [predictedIC50, setPredictedIC50] = useState<number | null>(null);
   const [leaderboardEntries, setLeaderboardEntries] = useState<CompoundEntry[]>([]);
   const marvinEditorRef = useRef<MarvinEditorRef>(null);
+  const liveSketchRef = useRef<ReturnType<typeof createLiveSketch> | null>(null);
+
+  // 실시간 SMILES 채널 (편집이 빠르게 이어지면 서버가 마지막 것만 계산한다)
+  useEffect(() => {
+    const liveSketch = createLiveSketch((prediction) => {
+      setCurrentSmiles(prediction.smiles || null); // ✅ 실시간 SMILES 업데이트!
+    });
+    liveSketchRef.current = liveSketch;
+    return () => liveSketch.close();
+  }, []);
 
   // 리더보드 자동 로딩
   useEffect(() => {
@@ -48,21 +58,9 @@ const Index = () => {
       return;
     }
   
-    // Flask 서버로 mol 전송 → SMILES 변환 요청
+    // Flask 서버로 mol 전송 → 결과는 실시간 채널로 도착
     try {
-      const res = await fetch(`${API_URL}/mol-to-smiles`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ mol })
-      });
-  
-      const result = await res.json();
-  
-      if (result.smiles) {
-        setCurrentSmiles(result.smiles); // ✅ 실시간 SMILES 업데이트!
-      } else {
-        setCurrentSmiles(null);
-      }
+      await liveSketchRef.current?.update(mol);
     } catch (err) {
       console.error("실시간 SMILES 변환 실패", err);
       setCurrentSmiles(null);